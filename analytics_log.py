@@ -0,0 +1,234 @@
+import copy
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO
+from data_manager import DataManager
+from stats_aggregator import StatsAggregator
+
+
+class AnalyticsLog:
+    """
+    Append-only answer log layered on top of the analytics snapshot file.
+
+    Every answer is appended as one compact JSON line to ``<filename>.log``
+    instead of rewriting the whole analytics document. Each record carries a
+    sequence number; the snapshot stores the last sequence number it contains
+    under ``log_seq`` so replay can skip records that were already compacted,
+    even if the process died between writing the snapshot and truncating the log.
+
+    With a ``writer`` (a PersistenceWorker) all file I/O runs on its thread and
+    the in-memory analytics are updated synchronously; snapshots are coalesced.
+
+    ``stats`` is a StatsAggregator kept up to date with ``data``.
+    """
+
+    def __init__(self, filename: str, fsync_every: int = 32, fsync_interval: float = 2.0,
+                 compact_every: int = 1000, writer: Optional[Any] = None) -> None:
+        """
+        Args:
+            filename (str): The path to the analytics snapshot JSON file.
+            fsync_every (int): Number of appended records per fsync batch.
+            fsync_interval (float): Maximum seconds between fsyncs while answering.
+            compact_every (int): Number of log records that triggers a compaction.
+            writer (Optional[Any]): A PersistenceWorker to run file I/O on. Defaults
+                                    to writing on the calling thread.
+        """
+        self.filename = filename
+        self.log_filename = f"{filename}.log"
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.writer = writer
+        self.data: Dict[str, Any] = {"streak": 0, "performance": {}}
+        self.stats = StatsAggregator()
+        self.seq = 0
+        self._log: Optional[TextIO] = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._since_compact = 0
+
+    @staticmethod
+    def apply_answer(data: Dict[str, Any], category: str, is_correct: bool) -> None:
+        """
+        Applies a single answer to an aggregate analytics dict in place.
+        """
+        if is_correct:
+            data["streak"] = data.get("streak", 0) + 1
+        else:
+            data["streak"] = 0
+
+        performance = data.setdefault("performance", {})
+        cat_stats = performance.get(category)
+        if cat_stats is None:
+            cat_stats = performance[category] = {"correct": 0, "total": 0}
+        cat_stats["total"] += 1
+        if is_correct:
+            cat_stats["correct"] += 1
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Loads the analytics snapshot and replays the log tail written since it.
+
+        Returns:
+            Dict[str, Any]: The analytics data including every logged answer.
+        """
+        data = DataManager.load_analytics(self.filename)
+        data.setdefault("streak", 0)
+        data.setdefault("performance", {})
+        self.seq = data.get("log_seq", 0)
+        self._since_compact = self._replay(data)
+        self.data = data
+        self.stats.load(data["performance"])
+        return data
+
+    def _replay(self, data: Dict[str, Any]) -> int:
+        """
+        Applies log records newer than the snapshot to ``data``.
+
+        Returns:
+            int: The number of records replayed.
+        """
+        if not os.path.exists(self.log_filename):
+            return 0
+
+        replayed = 0
+        try:
+            with open(self.log_filename, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final line from a crash mid-append; nothing after it is valid.
+                        break
+                    seq = record.get("s", 0)
+                    if seq <= self.seq:
+                        continue
+                    self.apply_answer(data, record["c"], bool(record["ok"]))
+                    self.seq = seq
+                    replayed += 1
+        except (IOError, KeyError) as e:
+            print(f"Error replaying analytics log '{self.log_filename}': {e}")
+        return replayed
+
+    def _io(self, job: Callable[[], Any], key: Optional[str] = None) -> None:
+        if self.writer is not None:
+            self.writer.submit(job, key=key)
+        else:
+            job()
+
+    def _open_log(self) -> TextIO:
+        if self._log is None:
+            self._log = open(self.log_filename, 'a')
+        return self._log
+
+    def _append(self, line: str) -> None:
+        try:
+            self._open_log().write(line)
+        except IOError as e:
+            print(f"Error appending to analytics log '{self.log_filename}': {e}")
+
+    def _fsync(self) -> None:
+        if self._log is not None:
+            try:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+            except (IOError, OSError) as e:
+                print(f"Error syncing analytics log '{self.log_filename}': {e}")
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        if not DataManager.save_json_atomic(self.filename, snapshot):
+            # Keep the log; it still holds everything the snapshot is missing.
+            self._fsync()
+            return
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        try:
+            open(self.log_filename, 'w').close()
+        except IOError as e:
+            print(f"Error truncating analytics log '{self.log_filename}': {e}")
+
+    def record_answer(self, category: str, is_correct: bool, question_key: Optional[str] = None) -> None:
+        """
+        Applies an answer to the in-memory analytics and appends it to the log.
+
+        Args:
+            category (str): The category of the answered question.
+            is_correct (bool): Whether the answer was correct.
+            question_key (Optional[str]): Stable question identifier, kept in the log record.
+        """
+        self.apply_answer(self.data, category, is_correct)
+        self.stats.record(category, is_correct)
+        self.seq += 1
+        record = {"s": self.seq, "c": category, "ok": int(is_correct)}
+        if question_key is not None:
+            record["q"] = question_key
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self._io(lambda: self._append(line))
+
+        self._unsynced += 1
+        self._since_compact += 1
+        if self._since_compact >= self.compact_every:
+            self.compact()
+        elif (self._unsynced >= self.fsync_every
+              or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+    def add_categories(self, categories: Iterable[str]) -> List[str]:
+        """
+        Adds empty counters for the categories not in the analytics yet and writes
+        them out. Existing counters are left alone.
+
+        Returns:
+            List[str]: The categories that were added.
+        """
+        performance = self.data.setdefault("performance", {})
+        added = [cat for cat in categories if cat not in performance]
+        if added:
+            for cat in added:
+                performance[cat] = {"correct": 0, "total": 0}
+            self.compact(self.data)
+        return added
+
+    def sync(self) -> None:
+        """
+        Flushes and fsyncs any appended records that are not yet durable.
+        """
+        if self._unsynced:
+            self._io(self._fsync)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Writes the aggregate snapshot and truncates the log.
+
+        Args:
+            data (Optional[Dict[str, Any]]): Replacement analytics data, e.g. after
+                                             a reset. Defaults to the current data.
+        """
+        if data is not None:
+            self.data = data
+            self.stats.load(data.get("performance", {}))
+        self.data["log_seq"] = self.seq
+        snapshot = copy.deepcopy(self.data) if self.writer is not None else self.data
+        self._io(lambda: self._write_snapshot(snapshot), key=self.filename)
+        self._unsynced = 0
+        self._since_compact = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Compacts pending records into the snapshot and closes the log.
+        """
+        if self._since_compact:
+            self.compact()
+        else:
+            self.sync()
+        self._io(self._close_log)
+
+    def _close_log(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
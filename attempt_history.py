@@ -0,0 +1,510 @@
+import bisect
+import os
+import struct
+import time
+import uuid
+from array import array
+from collections import Counter
+from itertools import accumulate, compress, islice
+from operator import le
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from data_manager import DataManager
+from shared_analytics import LOCK_SUFFIX, lock_file, unlock_file
+
+HISTORY_MAGIC = b'QHST'
+HISTORY_VERSION = 1
+# magic, version, reserved, index of the first attempt, number of attempts
+_CHUNK_HEADER = struct.Struct('<4sHHQI')
+# Typecodes of the key, timestamp, category id, response time, choice and correctness columns
+COLUMN_TYPES = ('Q', 'd', 'I', 'I', 'b', 'B')
+# Attempts per sealed chunk file.
+DEFAULT_CHUNK_SIZE = 4096
+# Unsealed attempts that trigger a rewrite of the tail file.
+DEFAULT_FLUSH_EVERY = 64
+DAY = 86400.0
+TAIL_FILE = "tail.chunk"
+CHUNK_SUFFIX = ".chunk"
+CATEGORIES_FILE = "categories.json"
+
+
+class Attempt(NamedTuple):
+    question_key: int
+    timestamp: float
+    category: str
+    choice: int
+    is_correct: bool
+    response_ms: int
+
+
+def key_to_int(question_key: str) -> int:
+    """
+    Converts a question_key() hex digest to the 64-bit integer stored in the history.
+    """
+    return int(question_key, 16)
+
+
+def _write_atomic(filename: str, payload: bytes) -> bool:
+    tmp_name = f"{filename}.tmp"
+    try:
+        with open(tmp_name, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, filename)
+        return True
+    except (IOError, OSError) as e:
+        print(f"Error saving attempt history '{filename}': {e}")
+        return False
+
+
+class _CategoryWindow:
+    """
+    Attempt timestamps and a running count of correct answers for one category.
+    """
+
+    __slots__ = ("times", "prefix")
+
+    def __init__(self, times: Optional[array] = None, prefix: Optional[array] = None) -> None:
+        self.times = array('d') if times is None else times
+        # prefix[i] is the number of correct answers among the first i attempts.
+        self.prefix = array('I', [0]) if prefix is None else prefix
+
+    def add(self, timestamp: float, is_correct: bool) -> None:
+        self.times.append(timestamp)
+        self.prefix.append(self.prefix[-1] + is_correct)
+
+
+class AttemptHistory:
+    """
+    Append-only, per-attempt answer history in a columnar layout.
+
+    Each attempt is one slot in six parallel typed arrays: the question key as a
+    64-bit integer, the timestamp, the category id, the response time in
+    milliseconds, the chosen option index and the correctness flag (about 26
+    bytes per attempt, against several hundred for a dict).
+
+    Running counts of correct answers are kept next to the columns, overall and
+    per category, so "accuracy over the last N attempts" is O(1) and "accuracy
+    over the last 7 days" is one binary search over the timestamps (O(log n)),
+    without scanning the history. Timestamps are kept non-decreasing for this.
+
+    On disk the history is a directory of immutable chunk files of
+    ``chunk_size`` attempts each, plus a tail file holding the unsealed attempts,
+    rewritten every ``flush_every`` answers. Columns are stored as raw
+    native-endian arrays, like the question pack.
+
+    Several sessions can write to one directory at the same time: each writes
+    only its own attempts, to ``<writer id>.<start>.chunk`` and
+    ``<writer id>.tail.chunk`` files (the files of a history written before
+    writer ids have none). ``categories.json`` is shared and append-only, so
+    category ids mean the same in every file; new categories are added to it
+    under ``categories.json.lock``. Loading merges every writer's attempts in
+    timestamp order.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 flush_every: int = DEFAULT_FLUSH_EVERY, writer: Optional[Any] = None) -> None:
+        """
+        Args:
+            directory (str): The directory the chunk files live in.
+            chunk_size (int): Number of attempts per sealed chunk file.
+            flush_every (int): Number of new attempts that triggers a tail write.
+            writer (Optional[Any]): A PersistenceWorker to write through. Defaults
+                                    to writing on the calling thread.
+        """
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.flush_every = flush_every
+        self.writer = writer
+        self.question_keys = array('Q')
+        self.timestamps = array('d')
+        self.category_ids = array('I')
+        self.response_ms = array('I')
+        self.choices = array('b')
+        self.correct = array('B')
+        self._prefix = array('I', [0])
+        self._category_table: List[str] = []
+        self._category_lookup: Dict[str, int] = {}
+        self._windows: List[_CategoryWindow] = []
+        self._by_question: Dict[int, List[int]] = {}
+        self.writer_id = uuid.uuid4().hex[:16]
+        # Attempts before this index were loaded; only later ones are this session's to write
+        self._loaded = 0
+        self._sealed = 0
+        self._unflushed = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._category_table)
+
+    def _category_id(self, category: str) -> int:
+        cid = self._category_lookup.get(category)
+        if cid is None:
+            cid = self._category_lookup[category] = len(self._category_table)
+            self._category_table.append(category)
+            self._windows.append(_CategoryWindow())
+        return cid
+
+    def _append(self, key: int, timestamp: float, cid: int, response_ms: int,
+                choice: int, is_correct: bool) -> None:
+        self.question_keys.append(key)
+        self.timestamps.append(timestamp)
+        self.category_ids.append(cid)
+        self.response_ms.append(response_ms)
+        self.choices.append(choice)
+        self.correct.append(is_correct)
+        self._prefix.append(self._prefix[-1] + is_correct)
+        self._windows[cid].add(timestamp, is_correct)
+        counts = self._by_question.get(key)
+        if counts is None:
+            counts = self._by_question[key] = [0, 0]
+        counts[0] += is_correct
+        counts[1] += 1
+
+    def record(self, question_key: str, category: str, choice: int, is_correct: bool,
+               response_ms: int = 0, timestamp: Optional[float] = None) -> int:
+        """
+        Appends one attempt.
+
+        Args:
+            question_key (str): The question_key() of the answered question.
+            category (str): The question's category.
+            choice (int): The chosen option index (-1 for none).
+            is_correct (bool): Whether the answer was correct.
+            response_ms (int): Time the user took to answer, in milliseconds (0 if unknown).
+            timestamp (Optional[float]): Unix time of the answer. Defaults to now.
+
+        Returns:
+            int: The index of the attempt in the history.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            # Keep the time columns sorted across clock adjustments.
+            timestamp = self.timestamps[-1]
+        self._append(key_to_int(question_key), timestamp, self._category_id(category),
+                     max(0, min(int(response_ms), 0xFFFFFFFF)), choice, bool(is_correct))
+
+        self._unflushed += 1
+        if len(self) - self._sealed >= self.chunk_size:
+            self._seal()
+        elif self._unflushed >= self.flush_every:
+            self.flush()
+        return len(self) - 1
+
+    def __getitem__(self, index: int) -> Attempt:
+        return Attempt(self.question_keys[index], self.timestamps[index],
+                       self._category_table[self.category_ids[index]], self.choices[index],
+                       bool(self.correct[index]), self.response_ms[index])
+
+    def iter_attempts(self, start: int = 0) -> Iterator[Attempt]:
+        for index in range(start, len(self)):
+            yield self[index]
+
+    # Rolling-window queries
+
+    def counts_last(self, n: int, category: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Returns ``(correct, attempts)`` over the last ``n`` attempts, overall or in a category.
+        """
+        if category is None:
+            prefix = self._prefix
+        else:
+            cid = self._category_lookup.get(category)
+            if cid is None:
+                return 0, 0
+            prefix = self._windows[cid].prefix
+        total = len(prefix) - 1
+        n = max(0, min(n, total))
+        return prefix[total] - prefix[total - n], n
+
+    def counts_since(self, since: float, category: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Returns ``(correct, attempts)`` for attempts at or after Unix time ``since``.
+        """
+        if category is None:
+            times, prefix = self.timestamps, self._prefix
+        else:
+            cid = self._category_lookup.get(category)
+            if cid is None:
+                return 0, 0
+            window = self._windows[cid]
+            times, prefix = window.times, window.prefix
+        start = bisect.bisect_left(times, since)
+        total = len(times)
+        return prefix[total] - prefix[start], total - start
+
+    def accuracy(self, category: Optional[str] = None, last: Optional[int] = None,
+                 days: Optional[float] = None, now: Optional[float] = None) -> Optional[float]:
+        """
+        Fraction of correct answers in a rolling window.
+
+        Args:
+            category (Optional[str]): Restricts the window to a category.
+            last (Optional[int]): Only the last ``last`` attempts.
+            days (Optional[float]): Only attempts in the last ``days`` days.
+            now (Optional[float]): The end of the time window. Defaults to now.
+
+        Returns:
+            Optional[float]: The accuracy, or None if the window holds no attempts.
+        """
+        if days is not None:
+            now = time.time() if now is None else now
+            correct, total = self.counts_since(now - days * DAY, category)
+        else:
+            correct, total = self.counts_last(len(self) if last is None else last, category)
+        return correct / total if total else None
+
+    def weak_areas(self, days: Optional[float] = 7, last: Optional[int] = None,
+                   min_attempts: int = 1, now: Optional[float] = None) -> List[Tuple[str, float, int]]:
+        """
+        Ranks categories by accuracy in a rolling window, weakest first.
+
+        Costs one window query per category, O(k log n).
+
+        Returns:
+            List[Tuple[str, float, int]]: ``(category, accuracy, attempts)`` per
+                                          category with at least ``min_attempts``.
+        """
+        now = time.time() if now is None else now
+        ranked = []
+        for category in self._category_table:
+            if days is not None:
+                correct, total = self.counts_since(now - days * DAY, category)
+            else:
+                correct, total = self.counts_last(len(self) if last is None else last, category)
+            if total >= min_attempts:
+                ranked.append((category, correct / total, total))
+        ranked.sort(key=lambda item: (item[1], -item[2]))
+        return ranked
+
+    def question_counts(self, question_key: str) -> Tuple[int, int]:
+        """
+        Returns ``(correct, attempts)`` for one question over the whole history.
+        """
+        counts = self._by_question.get(key_to_int(question_key))
+        return (counts[0], counts[1]) if counts else (0, 0)
+
+    # Persistence
+
+    def _chunk_path(self, start: int) -> str:
+        return os.path.join(self.directory, f"{self.writer_id}.{start:012d}{CHUNK_SUFFIX}")
+
+    def _write_job(self, path: str, start: int, end: int) -> Callable[[], None]:
+        """
+        Snapshots this session's attempts ``start:end`` for writing to ``path``.
+        Category ids are mapped to the shared table when the job runs.
+        """
+        columns = [column[start:end] for column in (self.question_keys, self.timestamps, self.category_ids,
+                                                     self.response_ms, self.choices, self.correct)]
+        table = list(self._category_table)
+        offset = start - self._loaded
+
+        def job() -> None:
+            shared_ids = self._shared_category_ids(table)
+            if shared_ids is None:
+                return
+            if any(cid != shared for cid, shared in enumerate(shared_ids)):
+                columns[2] = array('I', map(shared_ids.__getitem__, columns[2]))
+            _write_atomic(path, encode_chunk(offset, columns))
+        return job
+
+    def _shared_category_ids(self, table: List[str]) -> Optional[array]:
+        """
+        Adds the categories of ``table`` missing from the shared category table,
+        under its lock, and maps each local category id to its shared id.
+        """
+        path = os.path.join(self.directory, CATEGORIES_FILE)
+        try:
+            with open(f"{path}{LOCK_SUFFIX}", 'a') as lock:
+                lock_file(lock.fileno())
+                try:
+                    shared = (DataManager.load_json(path, default=None) if os.path.exists(path) else None) or []
+                    ids = {name: cid for cid, name in enumerate(shared)}
+                    missing = [name for name in table if name not in ids]
+                    if missing:
+                        shared.extend(missing)
+                        if not DataManager.save_json_atomic(path, shared, indent=None):
+                            return None
+                        ids.update((name, len(shared) - len(missing) + i) for i, name in enumerate(missing))
+                finally:
+                    unlock_file(lock.fileno())
+        except OSError as e:
+            print(f"Error updating attempt history categories '{path}': {e}")
+            return None
+        return array('I', [ids[name] for name in table])
+
+    def _io(self, job: Callable[[], Any], key: Optional[str] = None) -> None:
+        if self.writer is not None:
+            self.writer.submit(job, key=key)
+        else:
+            job()
+
+    def _makedirs(self) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+        except OSError as e:
+            print(f"Error creating attempt history directory '{self.directory}': {e}")
+
+    def _seal(self) -> None:
+        """
+        Writes the unsealed attempts out as an immutable chunk.
+
+        The old tail file needs no cleanup: load() skips a tail that starts
+        before the end of the sealed chunks.
+        """
+        self._makedirs()
+        start, end = self._sealed, len(self)
+        # Not coalesced: every chunk must be written, in order.
+        self._io(self._write_job(self._chunk_path(start - self._loaded), start, end))
+        self._sealed = end
+        self._unflushed = 0
+
+    def flush(self) -> None:
+        """
+        Persists attempts that are not in a sealed chunk yet by rewriting the tail file.
+        """
+        if not self._unflushed:
+            return
+        self._makedirs()
+        tail_path = os.path.join(self.directory, f"{self.writer_id}.{TAIL_FILE}")
+        self._io(self._write_job(tail_path, self._sealed, len(self)))
+        self._unflushed = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def load(self) -> "AttemptHistory":
+        """
+        Loads the chunks and tails of every writer, merged in timestamp order, and
+        rebuilds the window indexes from the columns.
+
+        Returns:
+            AttemptHistory: self, for chaining.
+        """
+        columns = [array(code) for code in COLUMN_TYPES]
+        streams = 0
+        for start, chunk, _sealed in iter_chunks(self.directory):
+            streams += start == 0
+            for column, part in zip(columns, chunk):
+                column.extend(part)
+        # Read after the chunks: the table only grows, so it covers every id in them.
+        table = load_categories(self.directory)
+        if not table:
+            return self
+        keys, times, cids, responses, choices, correct = columns
+        if max(cids, default=0) >= len(table):
+            print(f"Error: attempt history '{self.directory}' refers to unknown categories; not loading it.")
+            return self
+        if streams > 1 and not all(map(le, times, islice(times, 1, None))):
+            order = sorted(range(len(times)), key=times.__getitem__)
+            columns = [array(column.typecode, map(column.__getitem__, order)) for column in columns]
+            keys, times, cids, responses, choices, correct = columns
+        for category in table:
+            self._category_id(category)
+
+        (self.question_keys, self.timestamps, self.category_ids,
+         self.response_ms, self.choices, self.correct) = columns
+        self._prefix = array('I', accumulate(correct, initial=0))
+        by_category = sorted(range(len(cids)), key=cids.__getitem__)
+        counts = Counter(cids)
+        first = 0
+        for cid in range(len(table)):
+            group = by_category[first:first + counts[cid]]
+            first += len(group)
+            self._windows[cid] = _CategoryWindow(
+                array('d', map(times.__getitem__, group)),
+                array('I', accumulate(map(correct.__getitem__, group), initial=0)))
+        totals = Counter(keys)
+        right = Counter(compress(keys, correct))
+        self._by_question = {key: [right[key], total] for key, total in totals.items()}
+        self._loaded = self._sealed = len(self)
+        return self
+
+
+def encode_chunk(start: int, columns: Sequence[array]) -> bytes:
+    """
+    Encodes attempts ``start`` onwards as a chunk file: the header, then the
+    key, timestamp, category id, response time, choice and correctness columns.
+    """
+    parts = [_CHUNK_HEADER.pack(HISTORY_MAGIC, HISTORY_VERSION, 0, start, len(columns[0]))]
+    parts.extend(column.tobytes() for column in columns)
+    return b''.join(parts)
+
+
+def read_chunk(path: str) -> Optional[Tuple[int, List[array]]]:
+    """
+    Reads one chunk file.
+
+    Returns:
+        Optional[Tuple[int, List[array]]]: The index of its first attempt and its
+                                           six columns, or None if it is unreadable.
+    """
+    try:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        magic, version, _reserved, start, count = _CHUNK_HEADER.unpack_from(raw)
+    except (IOError, OSError, struct.error) as e:
+        print(f"Error reading attempt history chunk '{path}': {e}")
+        return None
+    if magic != HISTORY_MAGIC or version != HISTORY_VERSION:
+        print(f"Error: '{path}' is not a version {HISTORY_VERSION} attempt history chunk.")
+        return None
+    columns = [array(code) for code in COLUMN_TYPES]
+    offset = _CHUNK_HEADER.size
+    for column in columns:
+        size = count * column.itemsize
+        column.frombytes(raw[offset:offset + size])
+        offset += size
+    if any(len(column) != count for column in columns):
+        print(f"Error: attempt history chunk '{path}' is truncated.")
+        return None
+    return start, columns
+
+
+def load_categories(directory: str) -> Optional[List[str]]:
+    """
+    Returns the category table of a history directory (category id -> name).
+    """
+    if not os.path.isdir(directory):
+        return None
+    return DataManager.load_json(os.path.join(directory, CATEGORIES_FILE), default=None)
+
+
+def iter_chunks(directory: str) -> Iterator[Tuple[int, List[array], bool]]:
+    """
+    Yields the chunks of a history directory one at a time, as ``(start,
+    columns, sealed)``: each writer's chunks in order, its tail last with
+    ``sealed`` False, then the next writer's. ``start`` counts from 0 in each
+    writer's attempts.
+
+    Stops reading a writer at its first unreadable chunk, and skips a tail (or
+    chunk) that does not continue where the previous one ended.
+    """
+    if not os.path.isdir(directory):
+        return
+    writers: Dict[str, List[str]] = {}
+    for name in os.listdir(directory):
+        if name.endswith(CHUNK_SUFFIX):
+            # "<writer id>.<start>.chunk" / "<writer id>.tail.chunk"; no writer id in old histories
+            writer_id = name[:-len(CHUNK_SUFFIX)].rpartition('.')[0]
+            writers.setdefault(writer_id, []).append(name)
+    for writer_id in sorted(writers):
+        tail = f"{writer_id}.{TAIL_FILE}" if writer_id else TAIL_FILE
+        chunks = sorted(name for name in writers[writer_id] if name != tail)
+        expected = 0
+        for name in chunks + [tail]:
+            path = os.path.join(directory, name)
+            if not os.path.exists(path):
+                continue
+            chunk = read_chunk(path)
+            if chunk is None:
+                break
+            start, columns = chunk
+            if start != expected:
+                # An empty or superseded tail, or a gap after a failed write.
+                continue
+            expected += len(columns[0])
+            yield start, columns, name != tail
@@ -0,0 +1,344 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import queue
+import re
+import select
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from lazy_questions import LazyQuestionFile
+from question_bank import EditableQuestions, QuestionBank
+
+# inotify(7) flags
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, name length
+# Seconds without further events before a changed file is read (editors write in steps)
+SETTLE_DELAY = 0.2
+POLL_INTERVAL = 1.0
+# The question text of a raw record, still JSON-escaped
+_QUESTION_TEXT = re.compile(rb'"question"\s*:\s*"([^"\\]*(?:\\.[^"\\]*)*)"')
+
+
+class BankDiff(NamedTuple):
+    added: List[Tuple[int, Dict[str, Any]]]
+    updated: List[Tuple[int, Dict[str, Any]]]
+    removed: List[int]
+    base: Optional[LazyQuestionFile]   # new source for a lazily loaded bank
+    positions: Optional[array]         # each id's record in ``base``
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+def fingerprint(q: Dict[str, Any]) -> int:
+    """
+    A hash of a question record's content, for telling changed records apart.
+    """
+    try:
+        return hash(tuple(sorted((key, tuple(value) if isinstance(value, list) else value)
+                                 for key, value in q.items())))
+    except TypeError:  # Nested structures in extra fields
+        return hash(json.dumps(q, sort_keys=True))
+
+
+def _inotify() -> Optional[Any]:
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class BankWatcher:
+    """
+    Watches a question bank file and works out what changed in it.
+
+    A background thread waits for changes to the file: with inotify on Linux
+    (through ctypes; the directory is watched, so editors that save by renaming
+    a temporary file are seen), otherwise by polling its mtime and size. After a
+    change it re-reads the file and compares each record's content fingerprint
+    with those of the loaded bank, so the result is a diff: added records get new
+    ids, records whose question text is unchanged but whose options, answer or
+    category changed are updates, and the rest are removals. Moving records
+    around in the file changes nothing. Ids never move, so state keyed by
+    question id (review heaps, search postings) is updated in place.
+
+    For a lazily loaded bank the fingerprint is a hash of each record's raw
+    bytes and the question text is matched on its raw bytes too, so only the
+    records whose bytes changed are decoded.
+
+    The thread only reads; diffs are queued and applied by the owner with
+    ``QuestionBank.apply_changes`` on its own thread (see ``poll``), in order.
+    The bank must not be edited any other way while it is watched. A lazily
+    loaded bank reads records straight from the mapped file, so save large
+    banks by writing a copy and renaming it over the original.
+    """
+
+    def __init__(self, filename: str, bank: QuestionBank, poll_interval: float = POLL_INTERVAL,
+                 use_inotify: bool = True) -> None:
+        """
+        Args:
+            filename (str): The bank's JSON file.
+            bank (QuestionBank): The bank loaded from it.
+            poll_interval (float): Seconds between checks without inotify.
+            use_inotify (bool): Use inotify where available.
+        """
+        self.filename = filename
+        self.poll_interval = poll_interval
+        questions = bank.questions
+        base = questions.base if isinstance(questions, EditableQuestions) else questions
+        self.lazy = isinstance(base, LazyQuestionFile)
+        self.changes: "queue.Queue[BankDiff]" = queue.Queue()
+        self._next_id = len(bank)
+        # Per question id: content fingerprint, question text hash and position
+        # in the file as last read (-1 once removed)
+        self._prints = array('q')
+        self._texts = array('q')
+        self._positions = array('q')
+        # The file the lazily loaded bank reads, and the last one read for a diff
+        self._base: Optional[LazyQuestionFile] = base if self.lazy else None
+        self._next_base: Optional[LazyQuestionFile] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._libc = _inotify() if use_inotify else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warned = False
+
+    @property
+    def backend(self) -> str:
+        return "inotify" if self._libc is not None else "polling"
+
+    def start(self) -> "BankWatcher":
+        self._thread = threading.Thread(target=self._run, name="bank-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def poll(self) -> List[BankDiff]:
+        """
+        Returns the diffs found since the last call, oldest first, without blocking.
+        """
+        diffs = []
+        while True:
+            try:
+                diffs.append(self.changes.get_nowait())
+            except queue.Empty:
+                return diffs
+
+    # Watcher thread
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _run(self) -> None:
+        self._signature = self._stat()
+        records = self._fingerprints(self._base) if self.lazy else self._read()
+        if records is not None:
+            for position, fp, text, _q in records[:self._next_id]:
+                self._prints.append(fp)
+                self._texts.append(text)
+                self._positions.append(position)
+        for _ in self._events():
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            self._signature = signature
+            diff = self.diff()
+            if diff:
+                self.changes.put(diff)
+
+    def _events(self) -> Iterator[None]:
+        """
+        Yields once per settled change of the watched file.
+        """
+        libc = self._libc
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC) if libc is not None else -1
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        if fd >= 0 and libc.inotify_add_watch(fd, directory.encode(), IN_CLOSE_WRITE | IN_MOVED_TO
+                                              | IN_CREATE | IN_MODIFY) < 0:
+            os.close(fd)
+            fd = -1
+        if fd < 0:
+            self._libc = None
+            while not self._stop.wait(self.poll_interval):
+                yield
+            return
+
+        name = os.path.basename(self.filename).encode()
+        try:
+            while not self._stop.is_set():
+                if not select.select([fd], [], [], 0.5)[0]:
+                    continue
+                changed = self._drain(fd, name)
+                # Wait until the writer is done before reading the file
+                while select.select([fd], [], [], SETTLE_DELAY)[0]:
+                    changed = self._drain(fd, name) or changed
+                if changed:
+                    yield
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _drain(fd: int, name: bytes) -> bool:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        changed = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            changed = changed or data[offset:offset + length].rstrip(b'\0') == name
+            offset += length
+        return changed
+
+    def _read(self) -> Optional[List[Tuple[int, int, int, Optional[Dict[str, Any]]]]]:
+        """
+        Reads the file's records as ``(position, fingerprint, text hash, record)``,
+        or None if it is not valid (e.g. still being written). Lazy banks are only
+        indexed: the record is None, and the file is kept in ``_next_base``.
+        """
+        try:
+            if self.lazy:
+                self._next_base = LazyQuestionFile(self.filename)
+                records = self._fingerprints(self._next_base)
+            else:
+                with open(self.filename, 'r') as f:
+                    data = json.load(f)
+                records = ([(position, fingerprint(q), hash(q.get('question')), q)
+                            for position, q in enumerate(data) if isinstance(q, dict)]
+                           if isinstance(data, list) else None)
+        except (OSError, ValueError) as e:
+            if not self._warned:
+                print(f"Warning: could not reload '{self.filename}' ({e}); keeping the loaded questions.")
+                self._warned = True
+            return None
+        if records is not None:
+            self._warned = False
+        return records
+
+    @staticmethod
+    def _fingerprints(base: LazyQuestionFile) -> List[Tuple[int, int, int, None]]:
+        records = []
+        search = _QUESTION_TEXT.search
+        for position, raw in enumerate(map(base.raw, range(len(base)))):
+            text = search(raw)
+            records.append((position, hash(raw), hash(text.group(1)) if text else 0, None))
+        return records
+
+    def diff(self) -> BankDiff:
+        """
+        Re-reads the file and diffs it against the records seen so far.
+        """
+        records = self._read()
+        if records is None:
+            return BankDiff([], [], [], None, None)
+
+        # Unchanged records, wherever they moved to
+        pool: Dict[int, List[int]] = {}
+        for i, (_position, fp, _text, _q) in enumerate(records):
+            pool.setdefault(fp, []).append(i)
+        matched: Dict[int, int] = {}
+        unmatched: List[int] = []
+        for qid in range(len(self._positions)):
+            if self._positions[qid] < 0:
+                continue
+            found = pool.get(self._prints[qid])
+            if found:
+                matched[qid] = records[found.pop()][0]
+            else:
+                unmatched.append(qid)
+
+        fresh = sorted(i for found in pool.values() for i in found)
+
+        # Changed records keep the id of the record with the same question text
+        leftover: Dict[int, List[int]] = {}
+        for qid in unmatched:
+            leftover.setdefault(self._texts[qid], []).append(qid)
+        added, updated = [], []
+        for i in fresh:
+            position, fp, text, q = records[i]
+            if q is None:
+                q = json.loads(self._next_base.raw(position))
+                if not isinstance(q, dict):
+                    continue
+            ids = leftover.get(text)
+            if ids:
+                qid = ids.pop()
+                updated.append((qid, q))
+            else:
+                qid = self._next_id
+                self._next_id += 1
+                self._prints.append(0)
+                self._texts.append(0)
+                self._positions.append(-1)
+                added.append((qid, q))
+            self._prints[qid] = fp
+            self._texts[qid] = text
+            matched[qid] = position
+        removed = sorted(qid for ids in leftover.values() for qid in ids)
+
+        positions = array('q', [-1]) * self._next_id
+        for qid, position in matched.items():
+            positions[qid] = position
+        self._positions = positions
+        if not self.lazy:
+            return BankDiff(added, updated, removed, None, None)
+        if not (added or updated or removed):
+            # Records only moved; the bank keeps the file it has
+            self._next_base.close()
+            return BankDiff([], [], [], None, None)
+        return BankDiff(added, updated, removed, self._next_base, array('q', positions))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Print the changes to a question bank file as it is edited.")
+    parser.add_argument("questions", nargs="?", default="questions.json")
+    parser.add_argument("--poll", action="store_true", help="poll instead of using inotify")
+    args = parser.parse_args(argv)
+
+    bank = QuestionBank.from_file(args.questions)
+    watcher = BankWatcher(args.questions, bank, use_inotify=not args.poll).start()
+    print(f"Watching '{args.questions}' ({len(bank)} questions, {watcher.backend}). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(0.5)
+            for diff in watcher.poll():
+                start = time.perf_counter()
+                changes = bank.apply_changes(diff.added, diff.updated, diff.removed, diff.base, diff.positions)
+                print(f"{len(changes.added)} added, {len(changes.updated)} changed, {len(changes.removed)} removed "
+                      f"in {(time.perf_counter() - start) * 1000:.1f} ms; {bank.count()} questions in "
+                      f"{len(bank.categories)} categories")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+from question_store import QuestionStore
+from synthetic_data import generate_questions
+
+
+def measure(build: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Measures the memory retained by the object ``build`` returns and its build time.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return {"mb": current / 2**20, "seconds": elapsed}
+
+
+def run(count: int) -> None:
+    # Both layouts are built from the same JSON text, exactly as the loaders would.
+    text = json.dumps(generate_questions(count))
+
+    dicts = measure(lambda: json.loads(text))
+    store = measure(lambda: QuestionStore.from_questions(json.loads(text)))
+
+    saving = (1 - store["mb"] / dicts["mb"]) * 100 if dicts["mb"] else 0.0
+    print(f"{count:>9} questions | dict-of-lists: {dicts['mb']:8.2f} MB | "
+          f"QuestionStore: {store['mb']:8.2f} MB | saving: {saving:5.1f}% | "
+          f"store build: {store['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for size in sizes:
+        run(size)
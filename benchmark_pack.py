@@ -0,0 +1,64 @@
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Tuple
+from question_bank import QuestionBank
+from question_pack import QuestionPack, compile_pack
+from question_store import QuestionStore
+from synthetic_data import write_bank
+
+
+def timed(load: Callable[[], Any]) -> Tuple[Any, Dict[str, float]]:
+    """
+    Runs ``load`` and reports its wall time and the Python heap it retains.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": elapsed, "mb": current / 2**20, "peak_mb": peak / 2**20}
+
+
+def run(count: int, directory: str) -> Dict[str, Any]:
+    source = os.path.join(directory, f"bank_{count}.json")
+    write_bank(source, count)
+    pack = compile_pack(source)
+
+    def load_json() -> Any:
+        with open(source, 'r') as f:
+            return json.load(f)
+
+    def load_pack() -> QuestionBank:
+        return QuestionBank(QuestionPack(pack))
+
+    results: Dict[str, Any] = {"questions": count,
+                               "json_mb_on_disk": os.path.getsize(source) / 2**20,
+                               "pack_mb_on_disk": os.path.getsize(pack) / 2**20}
+    _, results["json.load"] = timed(load_json)
+    _, results["json -> QuestionStore"] = timed(lambda: QuestionStore.from_questions(load_json()))
+    bank, results["pack -> QuestionBank"] = timed(load_pack)
+
+    # First access after load, including a category draw.
+    start = time.perf_counter()
+    bank[bank.random_id(bank.categories[0])]['question']
+    results["pack first question seconds"] = time.perf_counter() - start
+    return results
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            result = run(size, directory)
+            print(f"\n{size:,} questions (JSON {result['json_mb_on_disk']:.1f} MB, "
+                  f"pack {result['pack_mb_on_disk']:.1f} MB)")
+            for name in ("json.load", "json -> QuestionStore", "pack -> QuestionBank"):
+                stats = result[name]
+                print(f"  {name:<24} {stats['seconds'] * 1000:10.2f} ms  "
+                      f"retained {stats['mb']:8.2f} MB  peak {stats['peak_mb']:8.2f} MB")
+            print(f"  {'pack first question':<24} {result['pack first question seconds'] * 1000:10.3f} ms")
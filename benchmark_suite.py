@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from analytics_log import AnalyticsLog
+from data_manager import DataManager
+from question_bank import QuestionBank
+from quiz_engine import QuizEngine
+from sampler import WeakAreaSampler
+from stats_aggregator import StatsAggregator
+from scheduler import ReviewScheduler
+from search_index import SearchIndex
+from synthetic_data import (category_names, generate_analytics, generate_legacy_analytics,
+                            write_bank)
+
+# (questions, categories) pairs. The full run adds the largest bank.
+DEFAULT_SCENARIOS = [(1_000, 10), (10_000, 100), (100_000, 1_000)]
+FULL_SCENARIOS = DEFAULT_SCENARIOS + [(1_000_000, 10_000)]
+# A benchmark is flagged when its median is this much slower than the baseline.
+DEFAULT_THRESHOLD = 0.25
+# ... and at least this many milliseconds slower, so timer noise on
+# sub-microsecond paths is not reported.
+MIN_DELTA_MS = 0.01
+# Modules the data layer must never import; front-ends import them lazily.
+GUI_MODULES = ("customtkinter", "tkinter", "gui_app")
+# Each repetition runs enough calls to take roughly this long.
+TARGET_SECONDS = 0.05
+
+
+def parse_scenario(text: str) -> Tuple[int, int]:
+    """
+    Parses a "QUESTIONSxCATEGORIES" scenario such as "100000x1000".
+    """
+    questions, _, categories = text.lower().partition('x')
+    return int(questions), int(categories or 10)
+
+
+def bench(run: Callable[[], Any], setup: Optional[Callable[[], Any]] = None,
+          repeat: int = 5) -> Dict[str, float]:
+    """
+    Times ``run`` like timeit: each repetition calls it ``number`` times and the
+    per-call time is reported.
+
+    Args:
+        run (Callable[[], Any]): The code under test.
+        setup (Optional[Callable[[], Any]]): Untimed code run before every call,
+                                             e.g. to restore a file ``run`` rewrites.
+        repeat (int): Number of repetitions.
+
+    Returns:
+        Dict[str, float]: Median / min / max milliseconds per call, and the loop sizes.
+    """
+    def once() -> float:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+
+    first = once()
+    number = 1 if setup is not None or first >= TARGET_SECONDS else max(1, int(TARGET_SECONDS / max(first, 1e-7)))
+    if first >= 1.0:
+        # Multi-second paths (1M questions) would take minutes at full repetition.
+        repeat = min(repeat, 3)
+
+    samples = []
+    for _ in range(repeat):
+        if number == 1:
+            samples.append(once())
+            continue
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        samples.append((time.perf_counter() - start) / number)
+    return {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000,
+            "max_ms": max(samples) * 1000, "repeat": repeat, "number": number}
+
+
+def measure_import(module: str = "data_manager", repeat: int = 5) -> Dict[str, Any]:
+    """
+    Times a cold import of ``module`` in fresh interpreters and lists any GUI
+    modules it pulled in.
+    """
+    code = ("import json, sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "elapsed = time.perf_counter() - start\n"
+            f"print(json.dumps([elapsed, [m for m in {GUI_MODULES!r} if m in sys.modules]]))")
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples, gui_modules = [], []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True,
+                             text=True, check=True).stdout
+        elapsed, gui_modules = json.loads(out.strip().splitlines()[-1])
+        samples.append(elapsed)
+    return {"median_ms": statistics.median(samples) * 1000, "min_ms": min(samples) * 1000,
+            "max_ms": max(samples) * 1000, "repeat": repeat, "number": 1,
+            "gui_modules": gui_modules}
+
+
+def render_rows(stats: StatsAggregator, streak: int) -> List[Tuple[str, float, str]]:
+    """
+    Does the text and layout work of FlashcardApp.render_dashboard without widgets.
+    """
+    rows = []
+    for cat in stats.take_dirty():
+        correct, total = stats.rows[cat]
+        if total == 0:
+            continue
+        pct = correct / total
+        rows.append((f"{cat} ({correct}/{total})", pct, f"{pct*100:.1f}%"))
+        stats.row_order(cat)
+    rows.append((stats.insights_text(streak), 0.0, ""))
+    return rows
+
+
+def run_scenario(question_count: int, category_count: int, directory: str,
+                 repeat: int = 5, seed: int = 42) -> Dict[str, Dict[str, float]]:
+    """
+    Runs every benchmark against one synthetic bank and analytics file.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Timings keyed by benchmark name.
+    """
+    names = category_names(category_count)
+    bank_file = os.path.join(directory, f"bank_{question_count}_{category_count}.json")
+    analytics_file = os.path.join(directory, f"analytics_{category_count}.json")
+    legacy_file = os.path.join(directory, "legacy_analytics.json")
+    log_file = os.path.join(directory, f"answers_{category_count}.json")
+
+    write_bank(bank_file, question_count, seed, names)
+    analytics = generate_analytics(names, seed)
+    DataManager.save_json(analytics_file, analytics)
+    legacy = generate_legacy_analytics(seed)
+
+    results: Dict[str, Dict[str, float]] = {}
+    results["load_json"] = bench(lambda: DataManager.load_json(bank_file), repeat=repeat)
+    questions = DataManager.load_json(bank_file)
+
+    results["load_analytics"] = bench(lambda: DataManager.load_analytics(analytics_file), repeat=repeat)
+    results["load_analytics_migrate"] = bench(lambda: DataManager.load_analytics(legacy_file),
+                                              setup=lambda: DataManager.save_json(legacy_file, legacy),
+                                              repeat=repeat)
+    results["get_unique_categories"] = bench(lambda: DataManager.get_unique_categories(questions),
+                                             repeat=repeat)
+
+    # Category filtering: the list scan the front-ends used to do per quiz vs the index.
+    target = names[len(names) // 2]
+    results["filter_scan"] = bench(lambda: [q for q in questions if q.get('category') == target],
+                                   repeat=repeat)
+    results["bank_build"] = bench(lambda: QuestionBank(questions), repeat=repeat)
+    bank = QuestionBank(questions)
+    results["filter_indexed"] = bench(lambda: list(bank.question_ids(target)), repeat=repeat)
+    results["random_id"] = bench(lambda: bank.random_id(target), repeat=repeat)
+    sampler = WeakAreaSampler(bank, generate_analytics(names, seed)["performance"])
+    results["weak_sample"] = bench(lambda: sampler.sample(), repeat=repeat)
+    results["weak_record"] = bench(lambda: sampler.record(sampler.sample(), False), repeat=repeat)
+
+    # Full-text search: building (once) and reloading the sidecar, then warm queries.
+    results["search_build"] = bench(lambda: SearchIndex.build(questions).save(f"{bank_file}.sidx", bank_file),
+                                    repeat=1)
+    results["search_load"] = bench(lambda: SearchIndex.load(f"{bank_file}.sidx", bank_file), repeat=1)
+    index = SearchIndex.load(f"{bank_file}.sidx", bank_file)
+    results["search_top20"] = bench(lambda: index.search("glacier storage"), repeat=repeat)
+    results["search_prefix"] = bench(lambda: index.search("dynam"), repeat=repeat)
+    results["search_matches"] = bench(lambda: index.matches("glacier"), repeat=repeat)
+
+    # Recording one answer: rewriting the whole analytics file vs appending to the log.
+    results["answer_save_json"] = bench(lambda: DataManager.save_json(analytics_file, analytics),
+                                        repeat=repeat)
+    DataManager.save_json(log_file, analytics)
+    log = AnalyticsLog(log_file)
+    log.load()
+    results["answer_log_append"] = bench(lambda: log.record_answer(target, True), repeat=repeat)
+    log.close()
+
+    # Analytics tab: first full build of every row, then one answer's worth of change.
+    performance = analytics["performance"]
+    streak = analytics["streak"]
+
+    def full_refresh() -> None:
+        stats = StatsAggregator()
+        stats.load(performance)
+        render_rows(stats, streak)
+
+    results["dashboard_full_refresh"] = bench(full_refresh, repeat=repeat)
+    stats = StatsAggregator()
+    stats.load(performance)
+    render_rows(stats, streak)
+
+    def incremental_refresh() -> None:
+        stats.record(target, False)
+        render_rows(stats, streak)
+
+    results["dashboard_incremental"] = bench(incremental_refresh, repeat=repeat)
+
+    # Welcome message: summing every category vs the aggregator's running totals.
+    results["welcome_scan"] = bench(lambda: sum(c.get("correct", 0) for c in performance.values())
+                                    / max(1, sum(c.get("total", 0) for c in performance.values())),
+                                    repeat=repeat)
+    results["welcome_running_totals"] = bench(lambda: stats.accuracy, repeat=repeat)
+
+    # Everything FlashcardApp.load_data does before the first question is drawn.
+    def first_question() -> None:
+        bank = QuestionBank.from_file(bank_file)
+        log = AnalyticsLog(analytics_file)
+        log.load()
+        engine = QuizEngine(bank, log, ReviewScheduler(bank))
+        engine.bank[bank.random_id()].get('question')
+
+    results["first_question_headless"] = bench(first_question, repeat=repeat)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, min_delta_ms: float = MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """
+    Compares median timings against a baseline run.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per benchmark present in both runs, with
+                              the ratio to the baseline and a regression flag.
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("median_ms"):
+            continue
+        ratio = current["median_ms"] / previous["median_ms"]
+        rows.append({"benchmark": name, "baseline_ms": previous["median_ms"],
+                     "current_ms": current["median_ms"], "ratio": round(ratio, 3),
+                     "regression": (ratio > 1 + threshold
+                                    and current["median_ms"] - previous["median_ms"] > min_delta_ms)})
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark load, selection, answer-recording and dashboard paths.")
+    parser.add_argument("--scenario", action="append", type=parse_scenario, default=None,
+                        help="QUESTIONSxCATEGORIES, e.g. 100000x1000 (repeatable)")
+    parser.add_argument("--full", action="store_true", help="include the 1M question / 10k category scenario")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per benchmark")
+    parser.add_argument("--seed", type=int, default=42, help="seed for the synthetic data")
+    parser.add_argument("-o", "--output", default=None, help="write the JSON report here")
+    parser.add_argument("--baseline", default=None, help="a previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fractional slowdown flagged as a regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenario or (FULL_SCENARIOS if args.full else DEFAULT_SCENARIOS)
+    results: Dict[str, Dict[str, float]] = {"import_data_manager": measure_import(repeat=args.repeat)}
+    with tempfile.TemporaryDirectory() as directory:
+        for question_count, category_count in scenarios:
+            label = f"{question_count}x{category_count}"
+            print(f"Running {label}...", file=sys.stderr)
+            # DataManager reports migrations and saves on stdout; keep the report clean.
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings = run_scenario(question_count, category_count, directory, args.repeat, args.seed)
+            for name, timing in timings.items():
+                results[f"{name}[{label}]"] = timing
+
+    report: Dict[str, Any] = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed": args.seed,
+                 "scenarios": [f"{q}x{c}" for q, c in scenarios]},
+        "results": results,
+    }
+    if args.baseline:
+        baseline = DataManager.load_json(args.baseline, default={})
+        report["comparison"] = compare(results, baseline.get("results", {}), args.threshold)
+        report["regressions"] = [row["benchmark"] for row in report["comparison"] if row["regression"]]
+    gui_modules = results["import_data_manager"]["gui_modules"]
+    if gui_modules:
+        report.setdefault("regressions", []).append("import_data_manager")
+        print(f"Error: importing data_manager loaded GUI modules: {', '.join(gui_modules)}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    for row in report.get("comparison", []):
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:<48} {row['baseline_ms']:10.3f} ms -> {row['current_ms']:10.3f} ms "
+              f"x{row['ratio']:<6} {flag}", file=sys.stderr)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import json
 import os
+import re
 from typing import Any, Optional
+from instrumentation import timed
 
 class DataManager:
     """
@@ -8,6 +10,7 @@ class DataManager:
     """
 
     @staticmethod
+    @timed("DataManager.load_analytics")
     def load_analytics(filename: str) -> Any:
         """
         Loads analytics data and migrates old format if necessary.
@@ -49,6 +52,7 @@ class DataManager:
             return default_data
 
     @staticmethod
+    @timed("DataManager.load_json")
     def load_json(filename: str, default: Optional[Any] = None) -> Any:
         """
         Loads data from a JSON file.
@@ -76,6 +80,7 @@ class DataManager:
             return default
 
     @staticmethod
+    @timed("DataManager.save_json")
     def save_json(filename: str, data: Any) -> None:
         """
         Saves data to a JSON file.
@@ -92,6 +97,96 @@ class DataManager:
         except TypeError as e:
             print(f"Error serializing data for '{filename}': {e}")
 
+    @staticmethod
+    @timed("DataManager.save_json_atomic")
+    def save_json_atomic(filename: str, data: Any, indent: Optional[int] = 4) -> bool:
+        """
+        Saves data to a JSON file via a temporary file and an atomic rename,
+        so a crash mid-write never leaves a truncated file behind.
+
+        Args:
+            filename (str): The path to the JSON file.
+            data (Any): The data to save (must be serializable to JSON).
+            indent (Optional[int]): Indentation passed to json.dump. Defaults to 4.
+
+        Returns:
+            bool: True if the file was written, False otherwise.
+        """
+        tmp_name = f"{filename}.tmp"
+        try:
+            with open(tmp_name, 'w') as f:
+                json.dump(data, f, indent=indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, filename)
+            return True
+        except (IOError, OSError) as e:
+            print(f"Error saving data to '{filename}': {e}")
+        except TypeError as e:
+            print(f"Error serializing data for '{filename}': {e}")
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+        return False
+
+    @staticmethod
+    def open_analytics(filename: str, user: Optional[str] = None, writer: Optional[Any] = None,
+                       import_from: Optional[str] = None, shared: bool = False) -> Any:
+        """
+        Opens the analytics storage backend for a path.
+
+        Paths ending in .db / .sqlite / .sqlite3 open the multi-user SQLite store;
+        anything else opens the single-user JSON snapshot plus append-only log,
+        or with ``shared`` the JSON snapshot merged from per-process journals, for
+        several sessions (CLI and GUI windows) answering at the same time.
+
+        Args:
+            filename (str): The path to the analytics JSON file or SQLite database.
+            user (Optional[str]): The user name (SQLite only). Defaults to the login name.
+            writer (Optional[Any]): A PersistenceWorker to run writes on.
+            import_from (Optional[str]): A JSON analytics file imported into a new
+                                         SQLite store for its first user.
+            shared (bool): Use the multi-process JSON backend (ignored for SQLite,
+                           which handles concurrent writers itself).
+
+        Returns:
+            Any: An AnalyticsLog, SharedAnalyticsLog or SQLiteAnalyticsStore; call
+                 load() for the data.
+        """
+        # Imported here: the backends build on DataManager themselves.
+        from analytics_log import AnalyticsLog
+        from shared_analytics import SharedAnalyticsLog
+        from sqlite_store import SQLiteAnalyticsStore, is_sqlite_path
+
+        if is_sqlite_path(filename):
+            return SQLiteAnalyticsStore(filename, user=user, writer=writer, import_from=import_from)
+        if shared:
+            return SharedAnalyticsLog(filename, writer=writer)
+        return AnalyticsLog(filename, writer=writer)
+
+    @staticmethod
+    def user_path(path: str, store: Any) -> str:
+        """
+        Returns the per-user variant of a data file or directory, e.g.
+        ``schedule.alice.json`` or ``attempt_history.alice``, for an analytics
+        store that keeps several users apart (the SQLite store).
+
+        Args:
+            path (str): The shared file or directory name.
+            store (Any): The analytics backend from open_analytics().
+
+        Returns:
+            str: The path for the store's user, or ``path`` itself for the
+                 single-user JSON backends.
+        """
+        user = getattr(store, 'user', None)
+        if not user:
+            return path
+        root, ext = os.path.splitext(path)
+        safe_user = re.sub(r'[^\w.-]', '_', user)
+        return f"{root}.{safe_user}{ext}"
+
     @staticmethod
     def get_unique_categories(questions: list) -> list:
         """
@@ -0,0 +1,289 @@
+import json
+import os
+import random
+import statistics
+import time
+from array import array
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+from question_bank import QuestionBank
+from question_store import question_key
+from quiz_engine import UNANSWERED
+
+EXAM_RESULTS_FILE = 'exam_results.jsonl'
+# The AWS certification exams: 65 questions in 90 minutes
+DEFAULT_EXAM_QUESTIONS = 65
+DEFAULT_EXAM_MINUTES = 90
+# AWS pass marks are 700-750 of 1000
+PASS_PERCENT = 70.0
+
+
+class CategoryTiming(NamedTuple):
+    category: str
+    questions: int
+    answered: int
+    correct: int
+    total_ms: float
+    mean_ms: float
+    median_ms: float
+    slowest_ms: float
+
+
+class ExamReport(NamedTuple):
+    questions: int
+    answered: int
+    correct: int
+    elapsed_s: float
+    time_limit_s: float
+    timed_out: bool
+    categories: List[CategoryTiming]
+
+    @property
+    def percent(self) -> float:
+        return self.correct / self.questions * 100 if self.questions else 0.0
+
+    @property
+    def passed(self) -> bool:
+        return self.percent >= PASS_PERCENT
+
+
+def format_duration(seconds: float) -> str:
+    """Formats seconds as M:SS (or H:MM:SS)."""
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+def format_report(report: ExamReport) -> str:
+    """
+    Formats an exam report as a per-category timing and accuracy table.
+    """
+    verdict = "PASS" if report.passed else "FAIL"
+    lines = [f"Score: {report.correct}/{report.questions} ({report.percent:.1f}%) - {verdict} "
+             f"({PASS_PERCENT:.0f}% needed)",
+             f"Answered {report.answered}/{report.questions} in {format_duration(report.elapsed_s)} "
+             f"of {format_duration(report.time_limit_s)}" + (" - time ran out" if report.timed_out else ""),
+             "",
+             f"{'Category':<24} {'Correct':>8} {'Accuracy':>9} {'Mean':>7} {'Median':>7} {'Slowest':>8}"]
+    for c in report.categories:
+        accuracy = c.correct / c.questions * 100 if c.questions else 0.0
+        lines.append(f"{c.category[:24]:<24} {f'{c.correct}/{c.questions}':>8} {accuracy:>8.1f}% "
+                     f"{c.mean_ms / 1000:>6.1f}s {c.median_ms / 1000:>6.1f}s {c.slowest_ms / 1000:>7.1f}s")
+    return "\n".join(lines)
+
+
+class Exam:
+    """
+    A fixed, timed mock exam: no feedback until it is submitted.
+
+    The questions are drawn and resolved up front. While the exam runs, every
+    event is stamped with the monotonic ``time.perf_counter_ns`` clock and kept
+    in memory: the answers in one answer sheet and, per question, the time spent
+    on it and when it was last answered, in typed arrays. Nothing is graded or
+    written until ``submit``, which grades the sheet against the answer key,
+    records the answers through the engine in one batch and appends a single
+    result record to the results file.
+    """
+
+    def __init__(self, bank: QuestionBank, question_ids: Sequence[int],
+                 time_limit_s: float = DEFAULT_EXAM_MINUTES * 60,
+                 clock: Callable[[], int] = time.perf_counter_ns) -> None:
+        """
+        Args:
+            bank (QuestionBank): The bank the questions come from.
+            question_ids (Sequence[int]): The questions of the exam, in order.
+            time_limit_s (float): The time allowed, in seconds.
+            clock (Callable[[], int]): Monotonic nanosecond clock.
+        """
+        self.bank = bank
+        self.question_ids = list(question_ids)
+        # Resolved now, so a lazily loaded bank is not read from disk mid-exam
+        self.questions = [bank[qid] for qid in self.question_ids]
+        self.time_limit_s = time_limit_s
+        self.clock = clock
+        count = len(self.question_ids)
+        self.sheet = bytearray([UNANSWERED]) * count
+        self.latency_ns = array('q', [0]) * count
+        self.answered_ns = array('q', [0]) * count
+        self.started_ns: Optional[int] = None
+        self.started_at = 0.0
+        self.submitted_ns: Optional[int] = None
+        self._shown: Optional[int] = None
+        self._shown_ns = 0
+
+    @classmethod
+    def draw(cls, bank: QuestionBank, count: int = DEFAULT_EXAM_QUESTIONS, category: Optional[str] = None,
+             time_limit_s: float = DEFAULT_EXAM_MINUTES * 60, rng: Any = random) -> "Exam":
+        """
+        Draws ``count`` distinct questions (fewer if the category is smaller, none
+        if ``count`` is not positive).
+        """
+        ids = bank.question_ids(category)
+        return cls(bank, rng.sample(ids, max(0, min(count, len(ids)))), time_limit_s)
+
+    def __len__(self) -> int:
+        return len(self.question_ids)
+
+    def question(self, position: int) -> Any:
+        return self.questions[position]
+
+    def start(self) -> None:
+        """Starts the countdown."""
+        self.started_ns = self.clock()
+        # The wall clock is read once; answer times are derived from the monotonic clock
+        self.started_at = time.time()
+
+    def elapsed_s(self) -> float:
+        if self.started_ns is None:
+            return 0.0
+        end = self.submitted_ns if self.submitted_ns is not None else self.clock()
+        return (end - self.started_ns) / 1e9
+
+    def remaining_s(self) -> float:
+        return max(0.0, self.time_limit_s - self.elapsed_s())
+
+    @property
+    def expired(self) -> bool:
+        return self.started_ns is not None and self.elapsed_s() >= self.time_limit_s
+
+    @property
+    def submitted(self) -> bool:
+        return self.submitted_ns is not None
+
+    def _leave(self, now: int) -> None:
+        # Time on screen counts towards the question shown, also when it is revisited
+        if self._shown is not None:
+            self.latency_ns[self._shown] += now - self._shown_ns
+            self._shown = None
+
+    def present(self, position: int) -> None:
+        """Marks a question as shown from now on."""
+        now = self.clock()
+        self._leave(now)
+        self._shown = position
+        self._shown_ns = now
+
+    def answer(self, position: int, letter: str) -> bool:
+        """
+        Sets (or changes) the answer to a question.
+
+        Returns:
+            bool: False if time is up or the exam was submitted; the answer is not taken.
+        """
+        now = self.clock()
+        if self.submitted or self.started_ns is None or (now - self.started_ns) / 1e9 >= self.time_limit_s:
+            return False
+        if self._shown == position:
+            self._leave(now)
+        letter = letter.strip().upper()
+        self.sheet[position] = ord(letter) if len(letter) == 1 else UNANSWERED
+        self.answered_ns[position] = now
+        return True
+
+    def _wall_time(self, ns: int) -> float:
+        return self.started_at + (ns - self.started_ns) / 1e9
+
+    def submit(self, engine: Any, results_file: Optional[str] = EXAM_RESULTS_FILE,
+               writer: Optional[Any] = None) -> ExamReport:
+        """
+        Ends the exam, grades it and records the results.
+
+        Answered questions are graded and recorded through the engine (analytics,
+        scheduler, history), in the order they were answered and with the time they were
+        answered. Unanswered questions count as wrong in the score but are not
+        recorded as practice. One JSON line with the whole exam is appended to
+        ``results_file``.
+
+        Args:
+            engine (QuizEngine): The engine to grade with and record through.
+            results_file (Optional[str]): JSON-lines file of exam results (None to skip).
+            writer (Optional[PersistenceWorker]): Writes the result record in the background.
+
+        Returns:
+            ExamReport: The score and per-category timing and accuracy.
+        """
+        if self.submitted:
+            return self.report(engine)
+        if self.started_ns is None:
+            self.start()
+        now = self.clock()
+        self._leave(now)
+        self.submitted_ns = now
+
+        answered = [pos for pos in range(len(self)) if self.sheet[pos] != UNANSWERED]
+        answered.sort(key=self.answered_ns.__getitem__)
+        for pos in answered:
+            engine.record(engine.submit(self.question_ids[pos], chr(self.sheet[pos])),
+                          self.latency_ns[pos] // 1_000_000, self._wall_time(self.answered_ns[pos]))
+        if engine.analytics is not None:
+            engine.analytics.sync()
+
+        report = self.report(engine)
+        if results_file is not None:
+            line = json.dumps(self.result_record(engine, report), separators=(',', ':')) + '\n'
+            if writer is not None:
+                writer.submit(lambda: append_result(results_file, line))
+            else:
+                append_result(results_file, line)
+        return report
+
+    def report(self, engine: Any) -> ExamReport:
+        """
+        Grades the answer sheet and summarises it per category.
+        """
+        key = engine.answer_key
+        by_category: Dict[str, List[Any]] = {}
+        correct_total = 0
+        for pos, qid in enumerate(self.question_ids):
+            category = self.questions[pos].get('category', 'General')
+            entry = by_category.setdefault(category, [0, 0, 0, []])
+            entry[0] += 1
+            if self.sheet[pos] != UNANSWERED:
+                entry[1] += 1
+                entry[3].append(self.latency_ns[pos] / 1e6)
+            if self.sheet[pos] == key[qid]:
+                entry[2] += 1
+                correct_total += 1
+
+        categories = []
+        for category, (questions, answered, correct, latencies) in by_category.items():
+            total_ms = sum(latencies)
+            categories.append(CategoryTiming(category, questions, answered, correct, total_ms,
+                                             total_ms / len(latencies) if latencies else 0.0,
+                                             statistics.median(latencies) if latencies else 0.0,
+                                             max(latencies, default=0.0)))
+        # Weakest categories first
+        categories.sort(key=lambda c: (c.correct / c.questions, c.category))
+        return ExamReport(len(self), sum(c.answered for c in categories), correct_total, self.elapsed_s(),
+                          self.time_limit_s, self.elapsed_s() >= self.time_limit_s, categories)
+
+    def result_record(self, engine: Any, report: ExamReport) -> Dict[str, Any]:
+        """
+        The exam as one result record: the score, then per question its key, the
+        answer given ("" if none), whether it was right and the time spent (ms).
+        """
+        key = engine.answer_key
+        items = []
+        for pos, qid in enumerate(self.question_ids):
+            answer = chr(self.sheet[pos]) if self.sheet[pos] != UNANSWERED else ""
+            items.append([question_key(self.questions[pos]), answer, int(self.sheet[pos] == key[qid]),
+                          self.latency_ns[pos] // 1_000_000])
+        return {"started_at": self.started_at, "elapsed_s": round(report.elapsed_s, 3),
+                "time_limit_s": self.time_limit_s, "timed_out": report.timed_out,
+                "questions": report.questions, "answered": report.answered, "correct": report.correct,
+                "percent": round(report.percent, 1), "passed": report.passed,
+                "categories": {c.category: {"correct": c.correct, "total": c.questions,
+                                            "mean_ms": round(c.mean_ms), "median_ms": round(c.median_ms)}
+                               for c in report.categories},
+                "items": items}
+
+
+def append_result(filename: str, line: str) -> None:
+    """Appends one result record and makes it durable."""
+    try:
+        with open(filename, 'a') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+    except (IOError, OSError) as e:
+        print(f"Error saving exam results to '{filename}': {e}")
@@ -0,0 +1,408 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from attempt_history import iter_chunks, key_to_int, load_categories
+from data_manager import DataManager
+from sqlite_store import default_user, is_sqlite_path
+
+try:
+    import numpy as np
+except ImportError:  # Optional: aggregation falls back to pure Python.
+    np = None
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS in the summary
+    resource = None
+
+FORMAT_CSV = "csv"
+FORMAT_COLUMNAR = "columnar"
+DEFAULT_MEMORY_MB = 64
+# Bytes per attempt in flight: the batch columns plus the aggregation temporaries
+BYTES_PER_ROW = 128
+# Attempts formatted as CSV text at a time, so the row strings stay small
+CSV_SLICE = 4096
+# Attempts fetched per SQLite query
+SQL_PAGE = 16384
+
+# Output columns, their array typecodes and numpy dtypes (little-endian on disk)
+COLUMNS = (("user_id", 'I', '<u4'), ("question_key", 'Q', '<u8'), ("category_id", 'I', '<u4'),
+           ("answered_at", 'd', '<f8'), ("choice", 'b', 'i1'), ("correct", 'B', 'u1'),
+           ("response_ms", 'I', '<u4'))
+
+
+class AttemptBatch(NamedTuple):
+    """A slice of attempts as parallel columns; user and category ids are the pipeline's."""
+    user_ids: array
+    question_keys: array
+    category_ids: array
+    answered_at: array
+    choices: array
+    correct: array
+    response_ms: array
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @classmethod
+    def empty(cls) -> "AttemptBatch":
+        return cls(*(array(code) for _name, code, _dtype in COLUMNS))
+
+
+def chunk_rows_for(memory_mb: float) -> int:
+    """Attempts per batch that fit in a memory budget."""
+    return max(CSV_SLICE, int(memory_mb * 1024 * 1024) // BYTES_PER_ROW)
+
+
+class ExportPipeline:
+    """
+    Streams attempts out of attempt history directories and SQLite analytics
+    databases into an export, computing per-user and per-category aggregates on
+    the way.
+
+    Attempts are read a batch at a time (history chunk files one after another,
+    SQLite rows by keyset pagination), so memory depends on the batch size and
+    the number of (user, category) pairs, never on the number of attempts. Each
+    batch is aggregated with NumPy (``np.unique`` and ``np.bincount``) when it is
+    installed, else in a pure Python loop, and appended to the output: one CSV
+    file, or one raw little-endian file per column that ``numpy.fromfile`` or
+    ``array.fromfile`` read back directly. User and category names are
+    dictionary-encoded as ids; the tables are written next to the output.
+    """
+
+    def __init__(self, output: str, fmt: str = FORMAT_CSV, memory_mb: float = DEFAULT_MEMORY_MB,
+                 attempts: bool = True, use_numpy: bool = True) -> None:
+        """
+        Args:
+            output (str): Directory the export is written to.
+            fmt (str): FORMAT_CSV or FORMAT_COLUMNAR.
+            memory_mb (float): Memory budget for attempts in flight, in MiB.
+            attempts (bool): Export the attempts themselves, not just the aggregates.
+            use_numpy (bool): Aggregate with NumPy if it is installed.
+        """
+        self.output = output
+        self.format = fmt
+        self.chunk_rows = chunk_rows_for(memory_mb)
+        self.attempts = attempts
+        self.use_numpy = use_numpy and np is not None
+        self.users: List[str] = []
+        self.categories: List[str] = []
+        self._user_ids: Dict[str, int] = {}
+        self._category_ids: Dict[str, int] = {}
+        # (user_id, category_id) -> [attempts, correct, response ms, timed attempts, first, last]
+        self.groups: Dict[Tuple[int, int], List[float]] = {}
+        self.records = 0
+        self._files: List[Any] = []
+        self._csv: Any = None
+
+    def user_id(self, name: str) -> int:
+        uid = self._user_ids.get(name)
+        if uid is None:
+            uid = self._user_ids[name] = len(self.users)
+            self.users.append(name)
+        return uid
+
+    def category_id(self, name: str) -> int:
+        cid = self._category_ids.get(name)
+        if cid is None:
+            cid = self._category_ids[name] = len(self.categories)
+            self.categories.append(name)
+        return cid
+
+    # Sources
+
+    def history_batches(self, directory: str, user: str) -> Iterator[AttemptBatch]:
+        """
+        Yields the attempts of one user's history directory, chunk file by chunk file.
+        """
+        table = load_categories(directory) or []
+        cids = [self.category_id(name) for name in table]
+        uid = self.user_id(user)
+        batch = AttemptBatch.empty()
+        for _start, (keys, times, local_cids, responses, choices, correct), _sealed in iter_chunks(directory):
+            if max(local_cids, default=0) >= len(cids):
+                # A running session added categories; the table only grows
+                table = load_categories(directory) or []
+                cids.extend(self.category_id(name) for name in table[len(cids):])
+            batch.user_ids.extend(array('I', [uid]) * len(keys))
+            batch.question_keys.extend(keys)
+            batch.category_ids.extend(array('I', [cids[cid] for cid in local_cids]))
+            batch.answered_at.extend(times)
+            batch.choices.extend(choices)
+            batch.correct.extend(correct)
+            batch.response_ms.extend(responses)
+            if len(batch) >= self.chunk_rows:
+                yield batch
+                batch = AttemptBatch.empty()
+        if len(batch):
+            yield batch
+
+    def sqlite_batches(self, filename: str) -> Iterator[AttemptBatch]:
+        """
+        Yields the attempts of every user in an analytics database, in id order.
+
+        The database is opened read-only; choices and response times are not
+        stored there and export as -1 and 0.
+        """
+        try:
+            conn = sqlite3.connect(f"file:{filename}?mode=ro", uri=True)
+        except sqlite3.Error as e:
+            print(f"Error opening analytics database '{filename}': {e}")
+            return
+        try:
+            uids = {row_id: self.user_id(name) for row_id, name in conn.execute("SELECT id, name FROM users")}
+            cids = {row_id: self.category_id(name)
+                    for row_id, name in conn.execute("SELECT id, name FROM categories")}
+            last_id = 0
+            batch = AttemptBatch.empty()
+            while True:
+                rows = conn.execute("SELECT id, user_id, category_id, question_key, correct, answered_at "
+                                    "FROM attempts WHERE id > ? ORDER BY id LIMIT ?",
+                                    (last_id, SQL_PAGE)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                batch.user_ids.extend(uids[row[1]] for row in rows)
+                batch.question_keys.extend(key_to_int(row[3]) if row[3] else 0 for row in rows)
+                batch.category_ids.extend(cids[row[2]] for row in rows)
+                batch.answered_at.extend(row[5] for row in rows)
+                batch.choices.extend(array('b', [-1]) * len(rows))
+                batch.correct.extend(row[4] for row in rows)
+                batch.response_ms.extend(array('I', [0]) * len(rows))
+                del rows
+                if len(batch) >= self.chunk_rows:
+                    yield batch
+                    batch = AttemptBatch.empty()
+            if len(batch):
+                yield batch
+        except sqlite3.Error as e:
+            print(f"Error reading attempts from '{filename}': {e}")
+        finally:
+            conn.close()
+
+    # Aggregation
+
+    def aggregate(self, batch: AttemptBatch) -> None:
+        """
+        Adds a batch to the per-(user, category) aggregates.
+        """
+        if self.use_numpy:
+            self._aggregate_numpy(batch)
+            return
+        groups = self.groups
+        for uid, cid, when, is_correct, response in zip(batch.user_ids, batch.category_ids, batch.answered_at,
+                                                        batch.correct, batch.response_ms):
+            group = groups.get((uid, cid))
+            if group is None:
+                groups[(uid, cid)] = [1, is_correct, response, response > 0, when, when]
+                continue
+            group[0] += 1
+            group[1] += is_correct
+            if response:
+                group[2] += response
+                group[3] += 1
+            if when < group[4]:
+                group[4] = when
+            if when > group[5]:
+                group[5] = when
+
+    def _aggregate_numpy(self, batch: AttemptBatch) -> None:
+        # One group key per attempt, then per-group sums over the whole batch
+        keys = (np.frombuffer(batch.user_ids, dtype=np.uint32).astype(np.uint64) << np.uint64(32)) \
+            | np.frombuffer(batch.category_ids, dtype=np.uint32)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        responses = np.frombuffer(batch.response_ms, dtype=np.uint32)
+        times = np.frombuffer(batch.answered_at, dtype=np.float64)
+        counts = np.bincount(inverse, minlength=len(unique))
+        correct = np.bincount(inverse, weights=np.frombuffer(batch.correct, dtype=np.uint8), minlength=len(unique))
+        response_sum = np.bincount(inverse, weights=responses, minlength=len(unique))
+        timed = np.bincount(inverse, weights=responses > 0, minlength=len(unique))
+        first = np.full(len(unique), np.inf)
+        last = np.full(len(unique), -np.inf)
+        np.minimum.at(first, inverse, times)
+        np.maximum.at(last, inverse, times)
+
+        groups = self.groups
+        for i, key in enumerate(unique.tolist()):
+            group_key = (key >> 32, key & 0xFFFFFFFF)
+            group = groups.get(group_key)
+            if group is None:
+                groups[group_key] = [int(counts[i]), int(correct[i]), int(response_sum[i]), int(timed[i]),
+                                     float(first[i]), float(last[i])]
+                continue
+            group[0] += int(counts[i])
+            group[1] += int(correct[i])
+            group[2] += int(response_sum[i])
+            group[3] += int(timed[i])
+            group[4] = min(group[4], float(first[i]))
+            group[5] = max(group[5], float(last[i]))
+
+    # Output
+
+    def _open(self) -> None:
+        os.makedirs(self.output, exist_ok=True)
+        if not self.attempts:
+            return
+        if self.format == FORMAT_CSV:
+            f = open(os.path.join(self.output, "attempts.csv"), 'w', newline='')
+            self._files.append(f)
+            self._csv = csv.writer(f)
+            self._csv.writerow(["user", "question_key", "category", "answered_at", "choice", "correct",
+                                "response_ms"])
+        else:
+            self._files.extend(open(os.path.join(self.output, f"attempts.{name}.bin"), 'wb')
+                               for name, _code, _dtype in COLUMNS)
+
+    def write(self, batch: AttemptBatch) -> None:
+        """
+        Appends a batch to the attempts output.
+        """
+        if not self.attempts:
+            return
+        if self.format == FORMAT_COLUMNAR:
+            for f, column in zip(self._files, batch):
+                if sys.byteorder != 'little' and column.itemsize > 1:
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(f)
+            return
+        users, categories = self.users, self.categories
+        for start in range(0, len(batch), CSV_SLICE):
+            end = start + CSV_SLICE
+            self._csv.writerows(zip([users[uid] for uid in batch.user_ids[start:end]],
+                                    [f"{key:016x}" for key in batch.question_keys[start:end]],
+                                    [categories[cid] for cid in batch.category_ids[start:end]],
+                                    [f"{when:.3f}" for when in batch.answered_at[start:end]],
+                                    batch.choices[start:end], batch.correct[start:end],
+                                    batch.response_ms[start:end]))
+
+    def _write_aggregates(self) -> None:
+        users, categories = self.users, self.categories
+        per_user: Dict[int, List[float]] = {}
+        per_category: Dict[int, List[float]] = {}
+        for (uid, cid), group in self.groups.items():
+            for totals, key in ((per_user, uid), (per_category, cid)):
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = list(group)
+                    continue
+                for i in range(4):
+                    total[i] += group[i]
+                total[4] = min(total[4], group[4])
+                total[5] = max(total[5], group[5])
+
+        header = ["attempts", "correct", "accuracy", "mean_response_ms", "first_answered_at", "last_answered_at"]
+
+        def row(group: List[float]) -> List[Any]:
+            attempts, correct, response_sum, timed, first, last = group
+            return [int(attempts), int(correct), f"{correct / attempts:.4f}",
+                    f"{response_sum / timed:.0f}" if timed else "", f"{first:.3f}", f"{last:.3f}"]
+
+        tables = (("user_categories.csv", ["user", "category"],
+                   ([users[uid], categories[cid]] + row(group)
+                    for (uid, cid), group in sorted(self.groups.items(),
+                                                    key=lambda item: (users[item[0][0]], categories[item[0][1]])))),
+                  ("users.csv", ["user"],
+                   ([users[uid]] + row(group) for uid, group in sorted(per_user.items(),
+                                                                       key=lambda item: users[item[0]]))),
+                  ("categories.csv", ["category"],
+                   ([categories[cid]] + row(group)
+                    for cid, group in sorted(per_category.items(), key=lambda item: item[1][1] / item[1][0]))))
+        for filename, key_columns, rows in tables:
+            with open(os.path.join(self.output, filename), 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(key_columns + header)
+                writer.writerows(rows)
+
+    def run(self, histories: Sequence[Tuple[str, str]] = (), databases: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        Exports every source and writes the aggregates and a summary.
+
+        Args:
+            histories (Sequence[Tuple[str, str]]): ``(directory, user)`` of attempt history directories.
+            databases (Sequence[str]): SQLite analytics databases.
+
+        Returns:
+            Dict[str, Any]: The summary (also written as summary.json).
+        """
+        start = time.perf_counter()
+        rss_before = _max_rss_mb()
+        try:
+            self._open()
+            sources = [self.history_batches(directory, user) for directory, user in histories]
+            sources.extend(self.sqlite_batches(filename) for filename in databases)
+            for source in sources:
+                for batch in source:
+                    self.aggregate(batch)
+                    self.write(batch)
+                    self.records += len(batch)
+        except (IOError, OSError) as e:
+            print(f"Error writing export to '{self.output}': {e}")
+        finally:
+            for f in self._files:
+                f.close()
+            self._files = []
+
+        self._write_aggregates()
+        summary = {"records": self.records, "users": len(self.users), "categories": len(self.categories),
+                   "groups": len(self.groups), "format": self.format, "chunk_rows": self.chunk_rows,
+                   "aggregation": "numpy" if self.use_numpy else "python",
+                   "seconds": round(time.perf_counter() - start, 2)}
+        rss_after = _max_rss_mb()
+        if rss_after is not None:
+            summary["peak_rss_mb"] = round(rss_after, 1)
+            summary["rss_growth_mb"] = round(rss_after - rss_before, 1)
+        if self.attempts and self.format == FORMAT_COLUMNAR:
+            summary["columns"] = {name: {"file": f"attempts.{name}.bin", "dtype": dtype, "typecode": code}
+                                  for name, code, dtype in COLUMNS}
+            summary["user_names"] = self.users
+            summary["category_names"] = self.categories
+        DataManager.save_json_atomic(os.path.join(self.output, "summary.json"), summary)
+        return summary
+
+
+def _max_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _history_arg(value: str) -> Tuple[str, str]:
+    directory, _sep, user = value.partition('=')
+    return directory, user or default_user()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export attempts and per-user / per-category aggregates.")
+    parser.add_argument("sources", nargs="+",
+                        help="attempt history directories (DIR or DIR=USER) and SQLite analytics databases")
+    parser.add_argument("-o", "--output", default="export", help="output directory (default: %(default)s)")
+    parser.add_argument("--format", choices=[FORMAT_CSV, FORMAT_COLUMNAR], default=FORMAT_CSV,
+                        help="attempts as one CSV file or as one binary file per column")
+    parser.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB,
+                        help="memory budget for attempts in flight (default: %(default)s)")
+    parser.add_argument("--aggregates-only", action="store_true", help="skip the attempts, write only the aggregates")
+    parser.add_argument("--no-numpy", action="store_true", help="aggregate in pure Python even if NumPy is installed")
+    args = parser.parse_args(argv)
+
+    databases = [source for source in args.sources if is_sqlite_path(source)]
+    histories = [_history_arg(source) for source in args.sources if not is_sqlite_path(source)]
+    pipeline = ExportPipeline(args.output, args.format, args.memory_mb, attempts=not args.aggregates_only,
+                              use_numpy=not args.no_numpy)
+    summary = pipeline.run(histories, databases)
+    print(f"Exported {summary['records']} attempts of {summary['users']} users in {summary['categories']} "
+          f"categories to '{args.output}' in {summary['seconds']}s ({summary['aggregation']} aggregation, "
+          f"{summary['chunk_rows']} attempts per batch"
+          + (f", peak RSS {summary['peak_rss_mb']} MB)" if "peak_rss_mb" in summary else ")"))
+    return 0 if summary["records"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,65 +1,258 @@
+import time
+# Measured from here so the customtkinter import counts towards startup
+_PROCESS_START = time.perf_counter()
+
 import customtkinter as ctk
+import argparse
+import os
 import random
-from typing import Dict, Any, List
+from collections import deque
+from typing import Dict, Any, List, NamedTuple
+import instrumentation
+from attempt_history import AttemptHistory
+from bank_watcher import BankWatcher
 from data_manager import DataManager
-
-# Configuration
-ctk.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
-ctk.set_default_color_theme("dark-blue")  # Themes: "blue" (standard), "green", "dark-blue"
+from exam import DEFAULT_EXAM_MINUTES, DEFAULT_EXAM_QUESTIONS, EXAM_RESULTS_FILE, Exam, format_duration, format_report
+from question_bank import ALL_CATEGORIES, QuestionBank
+from quiz_engine import QuizEngine
+from scheduler import ReviewScheduler
+from sampler import WeakAreaSampler
+from search_index import SearchIndex
+from persistence import PersistenceWorker
 
 QUESTIONS_FILE = 'questions.json'
 ANALYTICS_FILE = 'analytics.json'
+# Set QUIZ_ANALYTICS to a .db path (and QUIZ_USER) to use the multi-user SQLite store
+ANALYTICS_PATH = os.environ.get("QUIZ_ANALYTICS", ANALYTICS_FILE)
+# Set QUIZ_SHARED_ANALYTICS=1 when other windows or the CLI answer at the same time
+SHARED_ANALYTICS = os.environ.get("QUIZ_SHARED_ANALYTICS", "") not in ("", "0")
+SCHEDULE_FILE = 'schedule.json'
+HISTORY_DIR = 'attempt_history'
+# Delay used to coalesce dashboard refreshes from rapid answers (ms)
+DASHBOARD_REFRESH_DELAY = 50
+MODE_RANDOM = "Random"
+MODE_REVIEW = "Spaced Repetition"
+MODE_WEAK = "Weak Areas"
+# Fast start: delay before loading data, so the window paints first (ms)
+FIRST_PAINT_DELAY = 10
+# Categories added to the combo box per event-loop turn
+CATEGORY_FILL_CHUNK = 200
+# Startup budget from process start to the first question on screen (ms)
+FIRST_QUESTION_TARGET_MS = 500
+# Countdown refresh while a mock exam runs (ms)
+EXAM_TICK = 1000
+# How often edits to questions.json picked up by the watcher are applied (ms)
+BANK_POLL_INTERVAL = 500
+# Upcoming questions selected and prepared ahead of the "Next Question" click
+PREFETCH_DEPTH = 3
+# Delay before preparing the next upcoming question, so the screen redraws first (ms)
+PREFETCH_DELAY = 1
+# Draws tried when looking for a question that is not on screen or queued already
+PREFETCH_RETRIES = 8
+
+
+class PreparedQuestion(NamedTuple):
+    """A selected question with the texts shown for it, ready to be swapped in."""
+    qid: int
+    question: Dict[str, Any]
+    category_text: str
+    question_text: str
+    options: List[str]
+
+
+def configure_appearance():
+    """Applies the theme; call before the first window is created."""
+    ctk.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
+    ctk.set_default_color_theme("dark-blue")  # Themes: "blue" (standard), "green", "dark-blue"
+
 
 class FlashcardApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, fast_start: bool = True, watch: bool = True):
+        """
+        Args:
+            fast_start (bool): Show the Practice tab before loading any data, then
+                               load questions, analytics and the Analytics tab from
+                               the event loop. False loads everything up front.
+            watch (bool): Reload questions.json while the app runs when it is edited.
+        """
+        configure_appearance()
         super().__init__()
 
         # Window Setup
         self.title("Flashcard Wizard")
         self.geometry("700x500")
 
-        # Data Loading
-        self.questions = DataManager.load_json(QUESTIONS_FILE, default=[])
-        self.analytics = DataManager.load_analytics(ANALYTICS_FILE)
+        # Data is loaded by load_data(); until then the Practice tab shows a placeholder
+        self.fast_start = fast_start
+        self.bank = None
+        self.questions = []
+        # All disk writes go through one background writer thread
+        self.writer = PersistenceWorker()
+        self.analytics_log = None
+        self.analytics = {"streak": 0, "performance": {}}
+        self.scheduler = None
+        self.history = None
+        self.sampler = None
+        self.engine = None
+        # Full-text search: the index is built (or loaded) on the first search
+        self.search_index = None
+        self.search_query = ""
+        self.search_results = None
         self.current_question = None
-        
-        # Session Data
-        self.session_data = {"correct": 0, "total": 0, "mistakes": []}
-
-        # Sync Analytics Categories
-        self.sync_analytics_categories()
+        self.current_qid = None
+        self.question_shown_at = 0.0
+        self.time_to_first_question_ms = None
+        # Prefetch queue; it belongs to the category, mode, search and bank of _prefetch_key
+        self.prefetched = deque()
+        self._prefetch_key = None
+        self._prefetch_job = None
+        self._bank_version = 0
+        # The question whose text is laid out in the hidden lbl_question_back
+        self._back_qid = None
+        # Time from a "Next Question" click until the new question was drawn
+        self.click_to_render_ms = None
+        # Mock exam: no feedback and no disk writes until it is submitted
+        self.exam = None
+        self.exam_position = 0
+        self._exam_job = None
+        # Hot reload of the question bank
+        self.watch = watch
+        self.watcher = None
+        self._watch_job = None
+
+        # Dashboard State; the counters live in analytics_log.stats
+        self.stat_rows = {}
+        self._dashboard_job = None
+        self._dashboard_pending = False
+        self.analytics_ready = False
         
         # UI Layout
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
 
-        self.tab_view = ctk.CTkTabview(self)
+        self.tab_view = ctk.CTkTabview(self, command=self.on_tab_change)
         self.tab_view.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         
         self.tab_practice = self.tab_view.add("Practice")
         self.tab_analytics = self.tab_view.add("Analytics")
         
-        # Setup Tabs
+        # Practice Tab first; the Analytics Tab is built once data is loaded
         self.setup_practice_tab()
-        self.setup_analytics_tab()
+        self.lbl_question.configure(text="Loading questions...")
+        for btn in self.option_buttons:
+            btn.configure(state="disabled", text="")
+
+        # Compact the analytics log on exit
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        if fast_start:
+            self.after(FIRST_PAINT_DELAY, self.load_data)
+        else:
+            self.load_data()
+
+    @instrumentation.timed("FlashcardApp.load_data")
+    def load_data(self):
+        """Loads questions and analytics and shows the first question."""
+        self.bank = QuestionBank.from_file(QUESTIONS_FILE)
+        self.questions = self.bank.questions
+        self.analytics_log = DataManager.open_analytics(ANALYTICS_PATH, writer=self.writer,
+                                                        import_from=ANALYTICS_FILE, shared=SHARED_ANALYTICS)
+        self.analytics = self.analytics_log.load()
+        # The SQLite store keeps learners apart; so do their histories and schedules
+        self.history = AttemptHistory(DataManager.user_path(HISTORY_DIR, self.analytics_log),
+                                      writer=self.writer).load()
         
+        # Answer checking & Session Data (the review scheduler is loaded on first use)
+        self.engine = QuizEngine(self.bank, self.analytics_log, history=self.history)
+
         # Start First Round
         self.next_question()
+        self.record_first_question()
+
+        if self.fast_start:
+            self.after(0, self.finish_startup)
+        else:
+            self.finish_startup()
+
+    def record_first_question(self):
+        self.time_to_first_question_ms = (time.perf_counter() - _PROCESS_START) * 1000
+        if instrumentation.enabled():
+            instrumentation.record("FlashcardApp.time_to_first_question", int(self.time_to_first_question_ms * 1e6))
+            if self.time_to_first_question_ms > FIRST_QUESTION_TARGET_MS:
+                print(f"Startup: first question after {self.time_to_first_question_ms:.0f} ms "
+                      f"(target {FIRST_QUESTION_TARGET_MS} ms)")
+
+    def finish_startup(self):
+        """Syncs analytics categories, builds the Analytics Tab and fills the category list."""
+        self.sync_analytics_categories()
+        self.setup_analytics_tab()
+        self.analytics_ready = True
+        self.refresh_analytics_ui()
+        self.fill_categories()
+        if self.watch:
+            self.watcher = BankWatcher(QUESTIONS_FILE, self.bank).start()
+            self._watch_job = self.after(BANK_POLL_INTERVAL, self.poll_bank_changes)
+
+    def fill_categories(self, start: int = 0):
+        """Adds categories to the combo box a chunk per event-loop turn."""
+        categories = self.bank.categories
+        end = start + CATEGORY_FILL_CHUNK if self.fast_start else len(categories)
+        self.cmb_category.configure(values=[ALL_CATEGORIES] + categories[:end])
+        if end < len(categories):
+            self.after(1, self.fill_categories, end)
 
     def sync_analytics_categories(self):
         """Ensures all categories in questions.json exist in analytics."""
-        categories = DataManager.get_unique_categories(self.questions)
-        if "performance" not in self.analytics:
-            self.analytics["performance"] = {}
-            
-        updated = False
-        for cat in categories:
-            if cat not in self.analytics["performance"]:
-                self.analytics["performance"][cat] = {"correct": 0, "total": 0}
-                updated = True
-        
-        if updated:
-            DataManager.save_json(ANALYTICS_FILE, self.analytics)
+        # Only missing categories are written; other sessions' counts stay as they are
+        self.analytics_log.add_categories(self.bank.categories)
+
+    def poll_bank_changes(self):
+        """Applies the edits to questions.json found by the watcher thread."""
+        for diff in self.watcher.poll():
+            self.apply_bank_changes(diff)
+        self._watch_job = self.after(BANK_POLL_INTERVAL, self.poll_bank_changes)
+
+    @instrumentation.timed("FlashcardApp.apply_bank_changes")
+    def apply_bank_changes(self, diff):
+        """
+        Applies one diff of questions.json to the bank and to everything indexed
+        by question id, touching only the changed questions and categories.
+        """
+        changes = self.bank.apply_changes(diff.added, diff.updated, diff.removed, diff.base, diff.positions)
+        self.questions = self.bank.questions
+        self._bank_version += 1
+        self.invalidate_prefetch()
+        if self.search_index is not None:
+            for qid in changes.added:
+                self.search_index.add(qid, self.bank[qid])
+            for qid, old, new in changes.updated:
+                self.search_index.update(qid, old, new)
+            for qid, old in changes.removed:
+                self.search_index.remove(qid, old)
+        if self.scheduler is not None:
+            self.scheduler.apply_changes(changes)
+        self.engine.bank_changed()
+        # Rebuilt on next use from the new category index
+        self.sampler = None
+        self.engine.sampler = None
+
+        if changes.categories_added or changes.categories_removed:
+            self.sync_analytics_categories()
+            if self.cmb_category.get() in changes.categories_removed:
+                self.cmb_category.set(ALL_CATEGORIES)
+            self.fill_categories()
+        if self.search_query:
+            self.run_search()
+        instrumentation.count("FlashcardApp.bank_reload")
+        instrumentation.count("FlashcardApp.bank_reload_questions",
+                              len(changes.added) + len(changes.updated) + len(changes.removed))
+
+        # Replace the question on screen if it is gone or changed before it was answered
+        if self.current_qid is not None and self.exam is None:
+            removed = any(qid == self.current_qid for qid, _old in changes.removed)
+            updated = any(qid == self.current_qid for qid, _old, _new in changes.updated)
+            if removed or (updated and self.btn_next.cget("state") == "disabled"):
+                self.next_question()
 
     def setup_practice_tab(self):
         # Configure Grid
@@ -74,11 +267,28 @@ class FlashcardApp(ctk.CTk):
         self.lbl_category_sel = ctk.CTkLabel(self.frm_controls, text="Study Category:", font=("Roboto", 14))
         self.lbl_category_sel.grid(row=0, column=0, sticky="e", padx=10)
 
-        categories = ["All"] + DataManager.get_unique_categories(self.questions)
-        self.cmb_category = ctk.CTkComboBox(self.frm_controls, values=categories, command=self.on_category_change)
-        self.cmb_category.set("All")
+        # Filled by fill_categories() once questions are loaded
+        self.cmb_category = ctk.CTkComboBox(self.frm_controls, values=[ALL_CATEGORIES],
+                                            command=self.on_category_change)
+        self.cmb_category.set(ALL_CATEGORIES)
         self.cmb_category.grid(row=0, column=1, sticky="w", padx=10)
 
+        self.lbl_mode_sel = ctk.CTkLabel(self.frm_controls, text="Selection:", font=("Roboto", 14))
+        self.lbl_mode_sel.grid(row=1, column=0, sticky="e", padx=10, pady=(5, 0))
+
+        self.cmb_mode = ctk.CTkComboBox(self.frm_controls, values=[MODE_RANDOM, MODE_REVIEW, MODE_WEAK],
+                                        command=self.on_category_change)
+        self.cmb_mode.set(MODE_RANDOM)
+        self.cmb_mode.grid(row=1, column=1, sticky="w", padx=10, pady=(5, 0))
+
+        self.lbl_search = ctk.CTkLabel(self.frm_controls, text="Search:", font=("Roboto", 14))
+        self.lbl_search.grid(row=2, column=0, sticky="e", padx=10, pady=(5, 0))
+
+        # Enter runs the search; an empty query goes back to the whole category
+        self.ent_search = ctk.CTkEntry(self.frm_controls, placeholder_text="e.g. glacier", width=200)
+        self.ent_search.grid(row=2, column=1, sticky="w", padx=10, pady=(5, 0))
+        self.ent_search.bind("<Return>", self.on_search)
+
         # Question Area (Moved down slightly)
         self.lbl_category = ctk.CTkLabel(self.tab_practice, text="Category: Loading...", font=("Roboto", 12))
         self.lbl_category.grid(row=1, column=0, pady=(10, 0))
@@ -87,6 +297,8 @@ class FlashcardApp(ctk.CTk):
         self.lbl_question = ctk.CTkLabel(self.tab_practice, text="Question text here", font=("Roboto", 20),
                                          wraplength=600)
         self.lbl_question.grid(row=2, column=0, pady=20, sticky="n")
+        # Back buffer: the next question's text is wrapped here while hidden, then swapped in
+        self.lbl_question_back = ctk.CTkLabel(self.tab_practice, text="", font=("Roboto", 20), wraplength=600)
 
         # Options Container
         self.frm_options = ctk.CTkFrame(self.tab_practice, fg_color="transparent")
@@ -113,6 +325,9 @@ class FlashcardApp(ctk.CTk):
         self.btn_finish = ctk.CTkButton(self.frm_actions, text="Finish Session", command=self.show_session_report,
                                         fg_color="#D32F2F", hover_color="#B71C1C")
         self.btn_finish.grid(row=0, column=1, padx=10)
+
+        self.btn_exam = ctk.CTkButton(self.frm_actions, text="Mock Exam", command=self.start_exam)
+        self.btn_exam.grid(row=0, column=2, padx=10)
         self.btn_next.configure(state="disabled")
 
     def setup_analytics_tab(self):
@@ -137,65 +352,228 @@ class FlashcardApp(ctk.CTk):
         self.btn_reset.grid(row=3, column=0, pady=20)
 
     def on_category_change(self, choice):
+        self.invalidate_prefetch()
+        if self.search_query:
+            self.run_search()
         self.next_question()
 
+    def on_search(self, event=None):
+        self.invalidate_prefetch()
+        self.search_query = self.ent_search.get().strip()
+        self.run_search()
+        self.next_question()
+
+    @instrumentation.timed("FlashcardApp.run_search")
+    def run_search(self):
+        """Finds the questions matching every word of the search box within the selected category."""
+        if not self.search_query or self.bank is None:
+            self.search_results = None
+            return
+        if self.search_index is None:
+            self.search_index = SearchIndex.for_bank(self.bank, QUESTIONS_FILE)
+        selected_cat = self.cmb_category.get()
+        allowed = None if selected_cat == ALL_CATEGORIES else set(self.bank.question_ids(selected_cat))
+        self.search_results = self.search_index.matches(self.search_query, allowed=allowed)
+
+    @instrumentation.timed("FlashcardApp.next_question")
     def next_question(self):
+        """Shows the next question: the head of the prefetch queue, or a fresh draw if it is empty."""
+        clicked_ns = time.perf_counter_ns()
+        if self.bank is None:
+            return  # Still loading
+        if self.exam is not None:
+            return  # The exam decides the questions
         if not self.questions:
             self.lbl_question.configure(text="No questions available.")
             return
 
-        # Filter by Category
+        if self.prefetch_key() != self._prefetch_key:
+            self.invalidate_prefetch()
+        if self.prefetched:
+            prepared = self.prefetched.popleft()
+            instrumentation.count("FlashcardApp.prefetch_hit")
+        else:
+            instrumentation.count("FlashcardApp.prefetch_miss")
+            qid = self.select_question({self.current_qid}, strict=False)
+            if qid is None:
+                self.show_no_question()
+                return
+            prepared = self.prepare_question(qid)
+
+        self.show_prepared(prepared)
+        # Idle callbacks run after Tk's pending redraws, so this times the click until the new question is drawn
+        self.after_idle(self.record_click_to_render, clicked_ns)
+        self.schedule_prefetch()
+
+    def show_no_question(self):
         selected_cat = self.cmb_category.get()
-        if selected_cat == "All":
-            pool = self.questions
+        if self.search_results is not None:
+            self.lbl_question.configure(text=f"No questions match '{self.search_query}' in '{selected_cat}'.")
         else:
-            pool = [q for q in self.questions if q.get('category') == selected_cat]
-
-        if not pool:
-             self.lbl_question.configure(text=f"No questions found for '{selected_cat}'.")
-             # Disable options
-             for btn in self.option_buttons:
-                 btn.configure(state="disabled", text="")
-             self.btn_next.configure(state="disabled")
-             return
-
-        # Simple Random Selection
-        self.current_question = random.choice(pool)
-        
-        # Update UI
-        self.lbl_category.configure(text=f"Category: {self.current_question.get('category', 'General')}")
-        self.lbl_question.configure(text=self.current_question.get('question', ''))
-        
+            self.lbl_question.configure(text=f"No questions found for '{selected_cat}'.")
+        # Disable options
+        for btn in self.option_buttons:
+            btn.configure(state="disabled", text="")
+        self.btn_next.configure(state="disabled")
+
+    def select_question(self, exclude, strict: bool = True):
+        """
+        Draws a question for the selected category, mode and search, avoiding the
+        ids in ``exclude`` (the question on screen and those queued).
+
+        Args:
+            exclude (Set[int]): Question ids not to draw.
+            strict (bool): Return None rather than an excluded id when nothing else is drawn.
+        """
+        selected_cat = self.cmb_category.get()
+        mode = self.cmb_mode.get()
+        qid = None
+        for _ in range(PREFETCH_RETRIES):
+            if self.search_results is not None:
+                # Search drills draw from the matches, whatever the mode
+                qid = self.search_draw()
+            elif mode == MODE_REVIEW:
+                qid = self.review_scheduler().next_due(selected_cat, exclude=self.current_qid)
+            elif mode == MODE_WEAK:
+                qid = self.weak_area_sampler().sample(selected_cat, exclude=self.current_qid)
+            else:
+                qid = self.bank.random_id(selected_cat)
+            if qid is None or qid not in exclude:
+                return qid
+        return None if strict else qid
+
+    def prepare_question(self, qid) -> PreparedQuestion:
+        """Resolves a question and builds the texts shown for it."""
+        question = self.bank[qid]
+        category_text = f"Category: {question.get('category', 'General')}"
+        if self.search_results is not None:
+            category_text += f"  |  {len(self.search_results)} matches for '{self.search_query}'"
+        return PreparedQuestion(qid, question, category_text, question.get('question', ''),
+                                question.get('options', []))
+
+    def show_prepared(self, prepared: PreparedQuestion):
+        """Puts a prepared question on screen: a fixed number of widget updates."""
+        self.current_qid = prepared.qid
+        self.current_question = prepared.question
+        self.lbl_category.configure(text=prepared.category_text)
+        if self._back_qid == prepared.qid:
+            # Already wrapped in the hidden label: swap the two
+            self.lbl_question.grid_remove()
+            self.lbl_question_back.grid(row=2, column=0, pady=20, sticky="n")
+            self.lbl_question, self.lbl_question_back = self.lbl_question_back, self.lbl_question
+            self._back_qid = None
+        else:
+            self.lbl_question.configure(text=prepared.question_text)
+
         # Reset Buttons
-        options = self.current_question.get('options', [])
-        mapping = ['A', 'B', 'C', 'D']
-        
+        options = prepared.options
         for i, btn in enumerate(self.option_buttons):
             if i < len(options):
                 btn.configure(text=options[i], state="normal", fg_color=["#3B8ED0", "#1F6AA5"]) # Default Blue
             else:
                 btn.configure(state="disabled", text="")
-        
-        self.btn_next.configure(state="disabled")
 
+        self.btn_next.configure(state="disabled")
+        self.question_shown_at = time.perf_counter()
+
+    def record_click_to_render(self, clicked_ns):
+        elapsed_ns = time.perf_counter_ns() - clicked_ns
+        self.click_to_render_ms = elapsed_ns / 1e6
+        if instrumentation.enabled():
+            instrumentation.record("FlashcardApp.click_to_render", elapsed_ns)
+
+    def prefetch_key(self):
+        search = self.search_query if self.search_results is not None else None
+        return self.cmb_category.get(), self.cmb_mode.get(), search, self._bank_version
+
+    def invalidate_prefetch(self):
+        """Drops the queued questions; they are drawn again for the new selection."""
+        self.prefetched.clear()
+        self._back_qid = None
+        self._prefetch_key = self.prefetch_key()
+
+    def schedule_prefetch(self):
+        if self._prefetch_job is None:
+            self._prefetch_job = self.after(PREFETCH_DELAY, self.fill_prefetch)
+
+    @instrumentation.timed("FlashcardApp.fill_prefetch")
+    def fill_prefetch(self):
+        """
+        Selects and prepares one more upcoming question per event-loop turn,
+        until PREFETCH_DEPTH are queued.
+
+        Spaced repetition queues only one: the next due question depends on the
+        answers given, except for the answer to the question on screen. Weak-area
+        draws use the weights of when they were queued.
+        """
+        self._prefetch_job = None
+        if self.bank is None or self.exam is not None or not self.questions:
+            return
+        if self.prefetch_key() != self._prefetch_key:
+            self.invalidate_prefetch()
+        review = self.cmb_mode.get() == MODE_REVIEW and self.search_results is None
+        if len(self.prefetched) >= (1 if review else PREFETCH_DEPTH):
+            return
+        exclude = {self.current_qid}
+        exclude.update(prepared.qid for prepared in self.prefetched)
+        qid = self.select_question(exclude)
+        if qid is None:
+            return  # Nothing left to draw without repeats
+        self.prefetched.append(self.prepare_question(qid))
+        head = self.prefetched[0]
+        if self._back_qid != head.qid:
+            self.lbl_question_back.configure(text=head.question_text)
+            self._back_qid = head.qid
+        self.schedule_prefetch()
+
+    def search_draw(self):
+        """Draws a random search match other than the current question."""
+        results = self.search_results
+        if not results:
+            return None
+        i = random.randrange(len(results))
+        if results[i] == self.current_qid and len(results) > 1:
+            i = (i + 1 + random.randrange(len(results) - 1)) % len(results)
+        return results[i]
+
+    def review_scheduler(self):
+        """Loads the review schedule on first use; the engine keeps it updated."""
+        if self.scheduler is None:
+            self.scheduler = ReviewScheduler(self.bank, DataManager.user_path(SCHEDULE_FILE, self.analytics_log),
+                                             writer=self.writer)
+            self.engine.scheduler = self.scheduler
+        return self.scheduler
+
+    def weak_area_sampler(self):
+        """Builds the weak-area sampler on first use; the engine keeps it updated."""
+        if self.sampler is None:
+            self.sampler = WeakAreaSampler(self.bank, self.analytics.get("performance", {}), self.history)
+            self.engine.sampler = self.sampler
+        return self.sampler
+
+    @instrumentation.timed("FlashcardApp.check_answer")
     def check_answer(self, idx):
         if not self.current_question:
             return
+        if self.exam is not None:
+            self.answer_exam(idx)
+            return
 
         mapping = ['A', 'B', 'C', 'D']
         selected_option = mapping[idx] if idx < 4 else ""
-        correct_option = self.current_question.get('correct_answer', '')
-        category = self.current_question.get('category', 'General')
 
-        is_correct = (selected_option == correct_option)
+        # Grade, then record (analytics, schedule, history, session)
+        response_ms = int((time.perf_counter() - self.question_shown_at) * 1000)
+        result = self.engine.submit(self.current_qid, selected_option)
+        self.engine.record(result, response_ms)
         
         # Immediate UI Feedback
-        if is_correct:
+        if result.is_correct:
             self.option_buttons[idx].configure(fg_color="green")
         else:
             self.option_buttons[idx].configure(fg_color="red")
             # Highlight correct one
-            correct_idx = mapping.index(correct_option) if correct_option in mapping else -1
+            correct_idx = mapping.index(result.correct_answer) if result.correct_answer in mapping else -1
             if correct_idx != -1:
                 self.option_buttons[correct_idx].configure(fg_color="green")
 
@@ -205,110 +583,204 @@ class FlashcardApp(ctk.CTk):
         
         self.btn_next.configure(state="normal")
         
-        # Update Analytics Data
-        self.update_analytics(category, is_correct)
-        
-        # Update Session Data
-        self.session_data["total"] += 1
-        if is_correct:
-            self.session_data["correct"] += 1
-        else:
-            self.session_data["mistakes"].append({
-                "question": self.current_question.get("question"),
-                "category": category
-            })
+        # Update Analytics Tab
+        self.update_analytics()
 
 
-    def update_analytics(self, category: str, is_correct: bool):
-        # Update Streak
-        if is_correct:
-            self.analytics["streak"] = self.analytics.get("streak", 0) + 1
-        else:
-            self.analytics["streak"] = 0
-            
-        # Update Category Performance
-        if "performance" not in self.analytics:
-            self.analytics["performance"] = {}
-            
-        cat_stats = self.analytics["performance"].get(category, {"correct": 0, "total": 0})
-        cat_stats["total"] += 1
-        if is_correct:
-            cat_stats["correct"] += 1
-            
-        self.analytics["performance"][category] = cat_stats
-        
-        # Save
-        DataManager.save_json(ANALYTICS_FILE, self.analytics)
-        
-        # Refresh Analytics Tab
+    def start_exam(self):
+        """Starts a timed mock exam drawn from the selected category."""
+        if self.bank is None or self.exam is not None:
+            return
+        self.exam = Exam.draw(self.bank, DEFAULT_EXAM_QUESTIONS, self.cmb_category.get(),
+                              time_limit_s=DEFAULT_EXAM_MINUTES * 60)
+        if not len(self.exam):
+            self.exam = None
+            return
+        for widget in (self.cmb_category, self.cmb_mode, self.ent_search, self.btn_next, self.btn_finish):
+            widget.configure(state="disabled")
+        self.btn_exam.configure(text="Submit Exam", command=self.submit_exam)
+        self.invalidate_prefetch()
+        self.exam_position = 0
+        self.exam.start()
+        self.show_exam_question()
+        self.exam_tick()
+
+    def show_exam_question(self):
+        self.current_qid = self.exam.question_ids[self.exam_position]
+        self.current_question = self.exam.question(self.exam_position)
+        self.lbl_question.configure(text=self.current_question.get('question', ''))
+        options = self.current_question.get('options', [])
+        for i, btn in enumerate(self.option_buttons):
+            if i < len(options):
+                btn.configure(text=options[i], state="normal", fg_color=["#3B8ED0", "#1F6AA5"])
+            else:
+                btn.configure(state="disabled", text="")
+        self.update_exam_status()
+        self.exam.present(self.exam_position)
+
+    def update_exam_status(self):
+        self.lbl_category.configure(text=f"Mock exam: question {self.exam_position + 1}/{len(self.exam)}  |  "
+                                         f"{format_duration(self.exam.remaining_s())} left")
+
+    def exam_tick(self):
+        """Updates the countdown and submits the exam when time is up."""
+        self._exam_job = None
+        if self.exam is None:
+            return
+        if self.exam.expired:
+            self.submit_exam()
+            return
+        self.update_exam_status()
+        self._exam_job = self.after(EXAM_TICK, self.exam_tick)
+
+    def answer_exam(self, idx):
+        # No feedback: take the answer and move on
+        if not self.exam.answer(self.exam_position, "ABCD"[idx]) or self.exam_position + 1 >= len(self.exam):
+            self.submit_exam()
+            return
+        self.exam_position += 1
+        self.show_exam_question()
+
+    @instrumentation.timed("FlashcardApp.submit_exam")
+    def submit_exam(self, show_report: bool = True):
+        """Grades and records the exam in one batch, then shows the report."""
+        if self.exam is None:
+            return
+        if self._exam_job is not None:
+            self.after_cancel(self._exam_job)
+            self._exam_job = None
+        exam, self.exam = self.exam, None
+        report = exam.submit(self.engine, EXAM_RESULTS_FILE, writer=self.writer)
+
+        for widget in (self.cmb_category, self.cmb_mode, self.ent_search, self.btn_finish):
+            widget.configure(state="normal")
+        self.btn_exam.configure(text="Mock Exam", command=self.start_exam)
         self.refresh_analytics_ui()
+        if show_report:
+            self.show_exam_report(report)
+            self.next_question()
+
+    def show_exam_report(self, exam_report):
+        report = ctk.CTkToplevel(self)
+        report.title("Exam Report")
+        report.geometry("640x500")
+        verdict, color = ("Passed", "green") if exam_report.passed else ("Not passed", "red")
+        ctk.CTkLabel(report, text="Mock Exam Results", font=("Roboto", 20, "bold")).pack(pady=10)
+        ctk.CTkLabel(report, text=verdict, text_color=color, font=("Roboto", 18)).pack(pady=5)
+        ctk.CTkLabel(report, text=format_report(exam_report), font=("Courier", 12), justify="left").pack(pady=10)
+        ctk.CTkButton(report, text="Close", command=report.destroy).pack(pady=20, side="bottom")
+
+    def update_analytics(self):
+        # Streak & Category Performance were recorded by the engine, and the
+        # changed row marked dirty in the stats aggregator
+        self.schedule_dashboard_refresh()
 
     def refresh_analytics_ui(self):
-        # Clear existing widgets in scroll frame
-        for widget in self.frm_stats.winfo_children():
-            widget.destroy()
-            
-        perf = self.analytics.get("performance", {})
-        
-        # Determine Strongest/Weakest
-        max_pct = -1.0
-        min_pct = 101.0
-        strongest = "None"
-        weakest = "None"
-        
-        row = 0
-        for cat, stats in perf.items():
-            total = stats.get("total", 0)
-            correct = stats.get("correct", 0)
-            if total == 0: continue
-            
-            pct = (correct / total)
+        """Schedules a redraw of the rows changed since the last one (all rows after loading)."""
+        self.schedule_dashboard_refresh()
+
+    def schedule_dashboard_refresh(self):
+        """Coalesces redraw requests; nothing is drawn while the Analytics tab is hidden."""
+        if self._dashboard_pending:
+            instrumentation.count("FlashcardApp.dashboard_refresh_coalesced")
+        self._dashboard_pending = True
+        if self._dashboard_job is None and self.analytics_ready and self.tab_view.get() == "Analytics":
+            self._dashboard_job = self.after(DASHBOARD_REFRESH_DELAY, self.render_dashboard)
+
+    def on_tab_change(self):
+        # Shared analytics: show answers other sessions merged in the meantime
+        refresh = getattr(self.analytics_log, "refresh", None)
+        if refresh is not None and self.analytics_ready and refresh():
+            self.refresh_analytics_ui()
+        if self._dashboard_pending and self.analytics_ready and self._dashboard_job is None and self.tab_view.get() == "Analytics":
+            self.render_dashboard()
+
+    @instrumentation.timed("FlashcardApp.render_dashboard")
+    def render_dashboard(self):
+        self._dashboard_job = None
+        self._dashboard_pending = False
+
+        stats = self.analytics_log.stats
+        for cat in stats.take_dirty():
+            correct, total = stats.rows[cat]
+            row = self.stat_rows.get(cat)
             
-            if pct > max_pct:
-                max_pct = pct
-                strongest = cat
-            if pct < min_pct:
-                min_pct = pct
-                weakest = cat
+            if total == 0:
+                # Categories without attempts are not shown
+                if row:
+                    for widget in row:
+                        widget.grid_forget()
+                continue
             
-            # Draw UI Row
-            lbl = ctk.CTkLabel(self.frm_stats, text=f"{cat} ({correct}/{total})", width=100, anchor="w")
-            lbl.grid(row=row, column=0, padx=10, pady=5)
+            pct = correct / total
+            if row is None:
+                # Draw UI Row (once per category)
+                row = (ctk.CTkLabel(self.frm_stats, width=100, anchor="w"),
+                       ctk.CTkProgressBar(self.frm_stats),
+                       ctk.CTkLabel(self.frm_stats))
+                self.stat_rows[cat] = row
             
-            prog = ctk.CTkProgressBar(self.frm_stats)
+            lbl, prog, pct_lbl = row
+            lbl.configure(text=f"{cat} ({correct}/{total})")
             prog.set(pct)
-            prog.grid(row=row, column=1, padx=10, pady=5, sticky="ew")
+            pct_lbl.configure(text=f"{pct*100:.1f}%")
             
-            pct_lbl = ctk.CTkLabel(self.frm_stats, text=f"{pct*100:.1f}%")
-            pct_lbl.grid(row=row, column=2, padx=10, pady=5)
-            
-            row += 1
+            grid_row = stats.row_order(cat)
+            lbl.grid(row=grid_row, column=0, padx=10, pady=5)
+            prog.grid(row=grid_row, column=1, padx=10, pady=5, sticky="ew")
+            pct_lbl.grid(row=grid_row, column=2, padx=10, pady=5)
             
         # Update Streak & Insights
         streak = self.analytics.get("streak", 0)
-        self.lbl_insights.configure(text=f"Current Streak: {streak} 🔥\n"
-                                         f"Strongest Area: {strongest} ({max_pct*100:.1f}%)\n"
-                                         f"Area to Improve: {weakest} ({min_pct*100:.1f}%)")
+        self.lbl_insights.configure(text=stats.insights_text(streak))
 
     def reset_analytics(self):
         # Reset Data
-        self.analytics = {"streak": 0, "performance": {}}
-        self.sync_analytics_categories() # Re-add empty categories
-        DataManager.save_json(ANALYTICS_FILE, self.analytics)
+        self.analytics = {"streak": 0,
+                          "performance": {cat: {"correct": 0, "total": 0} for cat in self.bank.categories}}
+        self.analytics_log.compact(self.analytics)
+        # Rebuilt on next use from the reset performance
+        self.sampler = None
+        self.engine.sampler = None
         self.refresh_analytics_ui()
     
+    def on_close(self):
+        if self._prefetch_job is not None:
+            self.after_cancel(self._prefetch_job)
+        if self.watcher is not None:
+            self.after_cancel(self._watch_job)
+            self.watcher.stop()
+        if self.exam is not None:
+            self.submit_exam(show_report=False)
+        if self.analytics_log is not None:
+            self.analytics_log.close()
+            if self.scheduler is not None:
+                self.scheduler.save()
+            self.history.close()
+        self.writer.close()
+        self.destroy()
+
     def show_session_report(self):
+        # Make every answer so far durable before reporting
+        if self.analytics_log is not None:
+            self.analytics_log.sync()
+            if self.scheduler is not None:
+                self.scheduler.save()
+            self.history.flush()
+        self.writer.flush()
+
         report = ctk.CTkToplevel(self)
         report.title("Session Report")
         report.geometry("400x500")
         
-        total = self.session_data["total"]
-        if total == 0:
+        stats = self.analytics_log.stats if self.analytics_log is not None else None
+        if stats is None or stats.session_total == 0:
             ctk.CTkLabel(report, text="No questions attempted yet!", font=("Roboto", 16)).pack(pady=20)
             return
 
-        correct = self.session_data["correct"]
-        pct = (correct / total) * 100
+        correct = stats.session_correct
+        total = stats.session_total
+        pct = stats.session_accuracy * 100
         
         ctk.CTkLabel(report, text="Session Summary", font=("Roboto", 20, "bold")).pack(pady=10)
         ctk.CTkLabel(report, text=f"Score: {pct:.1f}% ({correct}/{total})", font=("Roboto", 18)).pack(pady=5)
@@ -325,21 +797,27 @@ class FlashcardApp(ctk.CTk):
             
         ctk.CTkLabel(report, text=msg, text_color=color, font=("Roboto", 14)).pack(pady=10)
         
-        if self.session_data["mistakes"]:
+        # Mistakes per category, counted as they were recorded
+        mistakes = stats.mistakes_by_category()
+        if mistakes:
             ctk.CTkLabel(report, text="Needs Improvement:", font=("Roboto", 14, "bold")).pack(pady=5)
-            
-            # Group mistakes by category
-            mistake_cats = {}
-            for m in self.session_data["mistakes"]:
-                cat = m['category']
-                mistake_cats[cat] = mistake_cats.get(cat, 0) + 1
-                
-            for cat, count in mistake_cats.items():
+            for cat, count in mistakes:
                 ctk.CTkLabel(report, text=f"• {cat} ({count} mistakes)").pack()
 
         ctk.CTkButton(report, text="Close", command=report.destroy).pack(pady=20, side="bottom")
 
 if __name__ == "__main__":
-    app = FlashcardApp()
-    app.refresh_analytics_ui() # Initial populate
+    parser = argparse.ArgumentParser(description="Flashcard quiz GUI.")
+    parser.add_argument("--profile", action="store_true",
+                        help="time hot paths and print p50/p95/p99 on exit (same as QUIZ_PROFILE=1)")
+    parser.add_argument("--cprofile", default=None, metavar="PATH", help="also write a cProfile capture here")
+    parser.add_argument("--no-fast-start", action="store_true",
+                        help="load all data and build both tabs before the window appears")
+    parser.add_argument("--no-watch", action="store_true",
+                        help="do not reload questions.json when it is edited while the app runs")
+    args = parser.parse_args()
+    if args.profile or args.cprofile:
+        instrumentation.enable(output=os.environ.get(instrumentation.ENV_PROFILE_OUTPUT), cprofile=args.cprofile)
+
+    app = FlashcardApp(fast_start=not args.no_fast_start, watch=not args.no_watch)
     app.mainloop()
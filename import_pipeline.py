@@ -0,0 +1,468 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import eq
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from data_manager import DataManager
+from lazy_questions import LazyQuestionFile
+
+try:
+    import numpy as np
+except ImportError:  # Optional: signatures fall back to pure Python.
+    np = None
+
+OPTION_LETTERS = "ABCD"
+# MinHash: NUM_PERM hash functions split into BANDS bands for LSH candidate search.
+NUM_PERM = 48
+BANDS = 12
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+# Estimated Jaccard similarity at or above which two questions are near duplicates.
+DEFAULT_THRESHOLD = 0.7
+# Records per worker task.
+BATCH_SIZE = 2000
+# Earlier records compared against per LSH bucket, so huge buckets stay linear.
+MAX_BUCKET_CANDIDATES = 32
+# Issues and duplicates listed individually in the report (counts are always complete).
+MAX_REPORT_ITEMS = 1000
+
+_MERSENNE = (1 << 31) - 1
+_rng = random.Random(0x51A7)
+_PERM_A = [_rng.randrange(1, _MERSENNE) for _ in range(NUM_PERM)]
+_PERM_B = [_rng.randrange(0, _MERSENNE) for _ in range(NUM_PERM)]
+_OPTION_PREFIX = re.compile(r'^\s*([A-Za-z])\s*[.):]\s*')
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def _clean(text: str) -> str:
+    return ' '.join(text.split())
+
+
+def normalize_question(raw: Any) -> Tuple[Optional[Dict[str, Any]], List[str], List[str]]:
+    """
+    Validates one question record and normalizes it to the questions.json schema.
+
+    Whitespace is collapsed, the answer letter is upper-cased, options are
+    labelled "A. ", "B. ", ... by position and a missing category becomes
+    "Uncategorized". Unknown keys are kept as they are.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], List[str], List[str]]: The normalized
+            record (None if invalid), the errors and the warnings.
+    """
+    if not isinstance(raw, dict):
+        return None, ["record is not an object"], []
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    question = raw.get('question')
+    if not isinstance(question, str) or not question.strip():
+        errors.append("missing question text")
+
+    options = raw.get('options')
+    bodies: List[str] = []
+    if not isinstance(options, list):
+        errors.append("missing options")
+    elif len(options) != len(OPTION_LETTERS):
+        errors.append(f"expected {len(OPTION_LETTERS)} options, found {len(options)}")
+    else:
+        for position, option in enumerate(options):
+            if not isinstance(option, str) or not option.strip():
+                errors.append(f"option {position + 1} is empty")
+                continue
+            match = _OPTION_PREFIX.match(option)
+            if match:
+                if match.group(1).upper() != OPTION_LETTERS[position]:
+                    warnings.append(f"option {position + 1} was labelled {match.group(1)!r}")
+                option = option[match.end():]
+            bodies.append(_clean(option))
+
+    answer = raw.get('correct_answer')
+    letter = answer.strip().upper() if isinstance(answer, str) else None
+    if not letter or letter not in OPTION_LETTERS or len(letter) != 1:
+        errors.append(f"correct_answer {answer!r} is not one of A-D")
+
+    category = raw.get('category')
+    if not isinstance(category, str) or not category.strip():
+        warnings.append("missing category, using 'Uncategorized'")
+        category = 'Uncategorized'
+
+    if errors:
+        return None, errors, warnings
+    normalized = {
+        "category": _clean(category),
+        "question": _clean(question),
+        "options": [f"{OPTION_LETTERS[i]}. {body}" for i, body in enumerate(bodies)],
+        "correct_answer": letter,
+    }
+    for key, value in raw.items():
+        if key not in normalized:
+            normalized[key] = value
+    return normalized, errors, warnings
+
+
+def _tokens(q: Dict[str, Any]) -> List[str]:
+    text = ' '.join([q["question"]] + [option[3:] for option in q["options"]])
+    return _WORD.findall(text.lower())
+
+
+def exact_key(q: Dict[str, Any]) -> int:
+    """
+    64-bit hash of the question and options after case / punctuation folding.
+    """
+    canonical = ' '.join(_tokens(q)).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(canonical, digest_size=8).digest(), 'little')
+
+
+def shingles(q: Dict[str, Any]) -> List[int]:
+    """
+    Hashes of the overlapping word SHINGLE_SIZE-grams of a question and its options.
+    """
+    words = _tokens(q)
+    if len(words) < SHINGLE_SIZE:
+        grams = [' '.join(words)]
+    else:
+        grams = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+    return list({zlib.crc32(gram.encode('utf-8')) % _MERSENNE for gram in grams})
+
+
+def minhash(values: Sequence[int]) -> List[int]:
+    """
+    MinHash signature of a set of shingle hashes, one value per hash function
+    ``(a * x + b) mod (2^31 - 1)``.
+    """
+    if np is not None:
+        xs = np.asarray(values, dtype=np.uint64)
+        a = np.asarray(_PERM_A, dtype=np.uint64)[:, None]
+        b = np.asarray(_PERM_B, dtype=np.uint64)[:, None]
+        return ((a * xs + b) % _MERSENNE).min(axis=1).tolist()
+    return [min([(a * x + b) % _MERSENNE for x in values]) for a, b in zip(_PERM_A, _PERM_B)]
+
+
+def band_keys(signature: Sequence[int]) -> List[int]:
+    """
+    One 64-bit key per LSH band; similar signatures share at least one key.
+    """
+    keys = []
+    for band in range(BANDS):
+        rows = array('I', signature[band * ROWS:(band + 1) * ROWS]).tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8, person=band.to_bytes(2, 'little')).digest()
+        keys.append(int.from_bytes(digest, 'little'))
+    return keys
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """
+    Jaccard similarity estimated from two MinHash signatures.
+    """
+    return sum(map(eq, a, b)) / len(a)
+
+
+def process_batch(filename: str, starts: bytes, ends: bytes) -> List[Tuple[Any, ...]]:
+    """
+    Worker: decodes, validates and fingerprints a run of records.
+
+    Args:
+        filename (str): The source bank.
+        starts (bytes): Record start offsets (array('Q') bytes).
+        ends (bytes): Record end offsets (array('Q') bytes).
+
+    Returns:
+        List[Tuple[Any, ...]]: Per record ``(json_line, errors, warnings, exact_key,
+            signature, band_keys)``; the first and last three are None when invalid.
+    """
+    start_offsets, end_offsets = array('Q'), array('Q')
+    start_offsets.frombytes(starts)
+    end_offsets.frombytes(ends)
+    results = []
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start, end in zip(start_offsets, end_offsets):
+            try:
+                raw = json.loads(mm[start:end])
+            except json.JSONDecodeError as e:
+                results.append((None, [f"malformed JSON: {e}"], [], None, None, None))
+                continue
+            q, errors, warnings = normalize_question(raw)
+            if q is None:
+                results.append((None, errors, warnings, None, None, None))
+                continue
+            signature = minhash(shingles(q))
+            results.append((json.dumps(q, ensure_ascii=False), errors, warnings, exact_key(q),
+                            signature, band_keys(signature)))
+    return results
+
+
+def _batches(sources: Sequence[str],
+             failures: List[Tuple[int, str]]) -> Iterator[Tuple[int, int, str, bytes, bytes]]:
+    # Sources that cannot be indexed are added to ``failures`` as (source index, error) and skipped.
+    for source_index, filename in enumerate(sources):
+        try:
+            bank = LazyQuestionFile(filename)
+        except (OSError, ValueError) as e:
+            failures.append((source_index, str(e)))
+            continue
+        try:
+            try:
+                starts, ends = bank.byte_ranges()
+            except ValueError as e:
+                failures.append((source_index, str(e)))
+                continue
+            for first in range(0, len(starts), BATCH_SIZE):
+                yield (source_index, first, filename, starts[first:first + BATCH_SIZE].tobytes(),
+                       ends[first:first + BATCH_SIZE].tobytes())
+        finally:
+            bank.close()
+
+
+class ImportPipeline:
+    """
+    Validates, normalizes and de-duplicates question banks for import.
+
+    Records are streamed from each source through a byte-offset index (see
+    LazyQuestionFile) and processed in batches on a ProcessPoolExecutor: each
+    worker validates and normalizes its records and computes an exact-match hash
+    and a MinHash signature over word shingles. The parent then finds exact
+    duplicates and, through locality-sensitive hashing on signature bands,
+    near duplicates, keeping the first occurrence in source order. Only
+    signatures and offsets are held in memory; normalized records are spooled to
+    a temporary file and streamed into the output bank.
+    """
+
+    def __init__(self, sources: Sequence[str], workers: Optional[int] = None,
+                 threshold: float = DEFAULT_THRESHOLD, max_report_items: int = MAX_REPORT_ITEMS) -> None:
+        """
+        Args:
+            sources (Sequence[str]): Question bank files, in priority order.
+            workers (Optional[int]): Worker processes; 1 runs in-process. Defaults to the CPU count.
+            threshold (float): Minimum estimated similarity for a near duplicate.
+            max_report_items (int): Issues / duplicates listed individually in the report.
+        """
+        self.sources = list(sources)
+        self.workers = workers or os.cpu_count() or 1
+        self.threshold = threshold
+        self.max_report_items = max_report_items
+        self.report: Dict[str, Any] = {}
+        self._failures: List[Tuple[int, str]] = []
+
+    def _results(self) -> Iterator[Tuple[int, int, List[Tuple[Any, ...]]]]:
+        if self.workers <= 1:
+            for source_index, first, filename, starts, ends in _batches(self.sources, self._failures):
+                yield source_index, first, process_batch(filename, starts, ends)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = []
+            for source_index, first, filename, starts, ends in _batches(self.sources, self._failures):
+                pending.append((source_index, first, pool.submit(process_batch, filename, starts, ends)))
+                # Bound the results held in memory while keeping every worker busy.
+                if len(pending) >= 4 * self.workers:
+                    source_index, first, future = pending.pop(0)
+                    yield source_index, first, future.result()
+            for source_index, first, future in pending:
+                yield source_index, first, future.result()
+
+    def run(self, output: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Runs the pipeline.
+
+        Args:
+            output (Optional[str]): Where to write the clean bank (a JSON array,
+                                    one question per line). None only validates.
+
+        Returns:
+            Dict[str, Any]: The report: counts, issues and duplicates.
+        """
+        started = time.perf_counter()
+        counts = {"records": 0, "valid": 0, "invalid": 0, "invalid_sources": 0, "warnings": 0,
+                  "exact_duplicates": 0, "near_duplicates": 0, "written": 0}
+        issues: List[Dict[str, Any]] = []
+        origins = array('I')        # source index of each valid record
+        positions = array('Q')      # position of each valid record in its source
+        exact = array('Q')
+        signatures = array('I')
+        bands = [array('Q') for _ in range(BANDS)]
+
+        self._failures = []
+        spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        try:
+            for source_index, first, results in self._results():
+                for offset, (line, errors, warnings, key, signature, keys) in enumerate(results):
+                    counts["records"] += 1
+                    counts["warnings"] += bool(warnings)
+                    if errors or warnings:
+                        if len(issues) < self.max_report_items:
+                            issues.append({"source": self.sources[source_index], "index": first + offset,
+                                           "errors": errors, "warnings": warnings})
+                    if line is None:
+                        counts["invalid"] += 1
+                        continue
+                    counts["valid"] += 1
+                    origins.append(source_index)
+                    positions.append(first + offset)
+                    exact.append(key)
+                    signatures.extend(signature)
+                    for band, band_key in enumerate(keys):
+                        bands[band].append(band_key)
+                    spool.write(line)
+                    spool.write('\n')
+
+            # Unreadable sources (e.g. a malformed record, with its byte offset) are skipped whole
+            for source_index, error in self._failures:
+                counts["invalid_sources"] += 1
+                if len(issues) < self.max_report_items:
+                    issues.append({"source": self.sources[source_index], "index": None,
+                                   "errors": [error], "warnings": []})
+
+            duplicates = self._find_duplicates(exact, signatures, bands)
+            listed = []
+            for index, (kind, original, score) in sorted(duplicates.items()):
+                counts["exact_duplicates" if kind == "exact" else "near_duplicates"] += 1
+                if len(listed) < self.max_report_items:
+                    listed.append({"kind": kind, "similarity": round(score, 3),
+                                   "source": self.sources[origins[index]], "index": positions[index],
+                                   "duplicate_of": {"source": self.sources[origins[original]],
+                                                    "index": positions[original]}})
+
+            if output:
+                spool.seek(0)
+                counts["written"] = self._write_bank(output, spool, duplicates)
+        finally:
+            spool.close()
+
+        self.report = {"sources": self.sources, "output": output, "threshold": self.threshold,
+                       "seconds": round(time.perf_counter() - started, 3), "counts": counts,
+                       "issues": issues, "duplicates": listed}
+        return self.report
+
+    def _find_duplicates(self, exact: array, signatures: array,
+                         bands: List[array]) -> Dict[int, Tuple[str, int, float]]:
+        """
+        Marks every record that repeats an earlier kept record.
+
+        Grouping is done by sorting record ids by key (exact hash, then each LSH
+        band), so memory stays at a few arrays instead of one dict entry per band.
+
+        Returns:
+            Dict[int, Tuple[str, int, float]]: ``{record: (kind, original, similarity)}``.
+        """
+        duplicates: Dict[int, Tuple[str, int, float]] = {}
+        for run in self._runs(exact):
+            for index in run[1:]:
+                duplicates[index] = ("exact", run[0], 1.0)
+
+        # Candidate pairs (later, earlier) from records sharing any band key.
+        candidates: Dict[int, List[int]] = {}
+        for keys in bands:
+            for run in self._runs(keys):
+                for i, index in enumerate(run[1:], 1):
+                    if index in duplicates:
+                        continue
+                    earlier = candidates.setdefault(index, [])
+                    earlier.extend(run[max(0, i - MAX_BUCKET_CANDIDATES):i])
+
+        for index in sorted(candidates):
+            if index in duplicates:
+                continue
+            own = signatures[index * NUM_PERM:(index + 1) * NUM_PERM]
+            best, best_score = -1, 0.0
+            for other in set(candidates[index]):
+                if other in duplicates:
+                    continue
+                score = similarity(own, signatures[other * NUM_PERM:(other + 1) * NUM_PERM])
+                if score > best_score:
+                    best, best_score = other, score
+            if best >= 0 and best_score >= self.threshold:
+                duplicates[index] = ("near", best, best_score)
+        return duplicates
+
+    @staticmethod
+    def _runs(keys: array) -> Iterator[List[int]]:
+        """
+        Yields groups of two or more record ids sharing a key, in ascending id order.
+        """
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        run: List[int] = []
+        previous = None
+        for index in order:
+            key = keys[index]
+            if key != previous:
+                if len(run) > 1:
+                    yield run
+                run = []
+                previous = key
+            run.append(index)
+        if len(run) > 1:
+            yield run
+
+    @staticmethod
+    def _write_bank(output: str, spool: Any, duplicates: Dict[int, Any]) -> int:
+        tmp_name = f"{output}.tmp"
+        written = 0
+        try:
+            with open(tmp_name, 'w', encoding='utf-8') as f:
+                f.write('[\n')
+                for index, line in enumerate(spool):
+                    if index in duplicates:
+                        continue
+                    if written:
+                        f.write(',\n')
+                    f.write(line.rstrip('\n'))
+                    written += 1
+                f.write('\n]\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, output)
+        except (IOError, OSError) as e:
+            print(f"Error writing question bank '{output}': {e}")
+            return 0
+        return written
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate, de-duplicate and merge question banks.")
+    parser.add_argument("command", choices=["validate", "import"],
+                        help="validate: report only; import: also write a clean, merged bank")
+    parser.add_argument("sources", nargs="+", help="question bank JSON files, highest priority first")
+    parser.add_argument("-o", "--output", default=None, help="clean bank to write (import)")
+    parser.add_argument("--report", default=None, help="write the JSON report here (default: stdout summary)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="similarity at which questions count as near duplicates (default 0.7)")
+    args = parser.parse_args(argv)
+
+    if args.command == "import" and not args.output:
+        parser.error("import needs -o/--output")
+    pipeline = ImportPipeline(args.sources, workers=args.workers, threshold=args.threshold)
+    report = pipeline.run(args.output if args.command == "import" else None)
+
+    if args.report:
+        DataManager.save_json_atomic(args.report, report)
+    counts = report["counts"]
+    if counts["invalid_sources"]:
+        print(f"{counts['invalid_sources']} source(s) could not be read and were skipped")
+    print(f"{counts['records']} records: {counts['valid']} valid, {counts['invalid']} invalid, "
+          f"{counts['warnings']} with warnings, {counts['exact_duplicates']} exact and "
+          f"{counts['near_duplicates']} near duplicates ({report['seconds']}s)")
+    if args.output and args.command == "import":
+        print(f"Wrote {counts['written']} questions to '{args.output}'")
+    if not args.report:
+        for issue in report["issues"][:20]:
+            where = issue['source'] if issue['index'] is None else f"{issue['source']}[{issue['index']}]"
+            print(f"  {where}: {'; '.join(issue['errors'] + issue['warnings'])}")
+        for dup in report["duplicates"][:20]:
+            print(f"  {dup['source']}[{dup['index']}] duplicates {dup['duplicate_of']['source']}"
+                  f"[{dup['duplicate_of']['index']}] ({dup['kind']}, {dup['similarity']})")
+    return 1 if args.command == "validate" and (counts["invalid"] or counts["invalid_sources"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+import atexit
+import contextlib
+import cProfile
+import functools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, TextIO
+
+# QUIZ_PROFILE=1 turns spans and counters on for the whole process.
+ENV_PROFILE = "QUIZ_PROFILE"
+# Optional JSON report path, written on exit in addition to the stderr table.
+ENV_PROFILE_OUTPUT = "QUIZ_PROFILE_OUTPUT"
+# Optional path for a cProfile capture (.prof, readable with pstats / snakeviz).
+ENV_CPROFILE = "QUIZ_CPROFILE"
+# Samples kept per span; longer runs keep a uniform reservoir sample.
+MAX_SAMPLES = 100_000
+
+_enabled = False
+_samples: Dict[str, List[int]] = {}
+_seen: Dict[str, int] = {}
+_totals: Dict[str, int] = {}
+_maxima: Dict[str, int] = {}
+_counters: Dict[str, int] = {}
+_profiler: Optional[cProfile.Profile] = None
+_cprofile_path: Optional[str] = None
+_output_path: Optional[str] = None
+_registered = False
+_rng = random.Random(0)
+# Spans are also recorded on the persistence writer thread.
+_lock = threading.Lock()
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(output: Optional[str] = None, cprofile: Optional[str] = None) -> None:
+    """
+    Turns instrumentation on and reports on exit.
+
+    Args:
+        output (Optional[str]): Also write the report as JSON to this path.
+        cprofile (Optional[str]): Capture a cProfile of the calling thread to this path.
+    """
+    global _enabled, _output_path, _cprofile_path, _profiler, _registered
+    _enabled = True
+    _output_path = output or _output_path
+    if cprofile and _profiler is None:
+        _cprofile_path = cprofile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if not _registered:
+        atexit.register(_at_exit)
+        _registered = True
+
+
+def record(name: str, elapsed_ns: int) -> None:
+    """
+    Adds one duration sample to the histogram of ``name``.
+    """
+    with _lock:
+        seen = _seen.get(name, 0) + 1
+        _seen[name] = seen
+        _totals[name] = _totals.get(name, 0) + elapsed_ns
+        if elapsed_ns > _maxima.get(name, 0):
+            _maxima[name] = elapsed_ns
+        samples = _samples.setdefault(name, [])
+        if len(samples) < MAX_SAMPLES:
+            samples.append(elapsed_ns)
+        else:
+            slot = _rng.randrange(seen)
+            if slot < MAX_SAMPLES:
+                samples[slot] = elapsed_ns
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        record(self.name, time.perf_counter_ns() - self.start)
+
+
+def span(name: str) -> Any:
+    """
+    Times a block: ``with span("QuizManager.run.submit"): ...``.
+
+    When instrumentation is off this returns a shared no-op context manager.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator recording every call of a function as a span.
+
+    The switch is checked per call so a CLI flag parsed after import still takes
+    effect; when off, the overhead is one global lookup and an extra call frame.
+
+    Args:
+        name (Optional[str]): The span name. Defaults to the function's qualified name.
+    """
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(label, time.perf_counter_ns() - start)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """
+    Increments a counter (no-op when instrumentation is off).
+    """
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def _percentile(ordered: List[int], fraction: float) -> float:
+    # Nearest-rank percentile, in milliseconds.
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index] / 1e6
+
+
+def report() -> Dict[str, Any]:
+    """
+    Summarises every span and counter recorded so far.
+
+    Returns:
+        Dict[str, Any]: ``{"spans": {name: {count, total_ms, mean_ms, p50_ms,
+                        p95_ms, p99_ms, max_ms}}, "counters": {name: value}}``.
+    """
+    spans = {}
+    with _lock:
+        snapshot = [(name, sorted(samples)) for name, samples in _samples.items()]
+        counters = dict(_counters)
+    for name, ordered in snapshot:
+        seen = _seen[name]
+        spans[name] = {"count": seen, "total_ms": _totals[name] / 1e6,
+                       "mean_ms": _totals[name] / seen / 1e6,
+                       "p50_ms": _percentile(ordered, 0.50), "p95_ms": _percentile(ordered, 0.95),
+                       "p99_ms": _percentile(ordered, 0.99), "max_ms": _maxima[name] / 1e6}
+    return {"spans": spans, "counters": counters}
+
+
+def dump(out: TextIO = sys.stderr) -> None:
+    """
+    Prints the span histograms and counters as a table.
+    """
+    data = report()
+    if data["spans"]:
+        print(f"\n{'span':<40} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'max ms':>9} {'total ms':>10}", file=out)
+        for name, s in sorted(data["spans"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"{name:<40} {s['count']:>7} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} "
+                  f"{s['p99_ms']:>9.3f} {s['max_ms']:>9.3f} {s['total_ms']:>10.1f}", file=out)
+    for name, value in sorted(data["counters"].items()):
+        print(f"{name:<40} {value:>7}", file=out)
+
+
+def _at_exit() -> None:
+    if _profiler is not None:
+        _profiler.disable()
+        try:
+            _profiler.dump_stats(_cprofile_path)
+            print(f"cProfile written to '{_cprofile_path}'", file=sys.stderr)
+        except (IOError, OSError) as e:
+            print(f"Error writing profile '{_cprofile_path}': {e}", file=sys.stderr)
+    dump()
+    if _output_path:
+        try:
+            with open(_output_path, 'w') as f:
+                json.dump(report(), f, indent=4)
+        except (IOError, OSError) as e:
+            print(f"Error writing profile report '{_output_path}': {e}", file=sys.stderr)
+
+
+if os.environ.get(ENV_PROFILE, "").strip().lower() not in ("", "0", "false", "no", "off"):
+    enable(output=os.environ.get(ENV_PROFILE_OUTPUT), cprofile=os.environ.get(ENV_CPROFILE))
@@ -0,0 +1,263 @@
+import codecs
+import json
+import mmap
+import os
+import re
+import struct
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_SEPARATOR = re.compile(r'[\s,]*')
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+
+INDEX_MAGIC = b'QIDX'
+INDEX_VERSION = 1
+# magic, version, source mtime_ns, source size, record count, category table length (bytes)
+_INDEX_HEADER = struct.Struct('<4sIqQQI')
+
+
+class LazyQuestionFile:
+    """
+    Read-only, lazily decoded view over a questions JSON file.
+
+    The file is memory-mapped and scanned once to build a byte-offset index of
+    the records in its top-level array, together with each record's category.
+    The index is cached in a ``<filename>.idx`` sidecar keyed by the file's
+    mtime and size, so later starts only load the index. Individual questions
+    are decoded on demand with ``json.loads`` on their byte range.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Args:
+            filename (str): The path to the questions JSON file.
+
+        Raises:
+            OSError: If the file cannot be opened or mapped.
+            ValueError: If the file is not a JSON array of objects.
+        """
+        self.filename = filename
+        self.index_filename = f"{filename}.idx"
+        self._file = open(filename, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._mtime_ns = stat.st_mtime_ns
+        self._size = stat.st_size
+        if self._size == 0:
+            raise ValueError(f"'{filename}' is empty")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._starts = array('Q')
+        self._ends = array('Q')
+        self._category_ids = array('i')
+        self.category_table: List[str] = []
+        self._category_lookup: Dict[str, int] = {}
+        self._scanner: Optional[Iterator[Any]] = None
+        self._complete = self._load_index()
+        if not self._complete:
+            self._begin_scan()
+            # Index the first record right away so it can be shown before the scan finishes.
+            self._scan(until=1)
+
+    @classmethod
+    def open(cls, filename: str) -> Optional["LazyQuestionFile"]:
+        """
+        Opens a questions file lazily, returning None if it cannot be indexed.
+        """
+        if not os.path.exists(filename):
+            return None
+        try:
+            return cls(filename)
+        except (OSError, ValueError) as e:
+            print(f"Error indexing '{filename}': {e}. Falling back to a full load.")
+            return None
+
+    def _load_index(self) -> bool:
+        """
+        Loads the sidecar index if it matches the current file.
+
+        Returns:
+            bool: True if a valid index was loaded.
+        """
+        try:
+            with open(self.index_filename, 'rb') as f:
+                header = f.read(_INDEX_HEADER.size)
+                magic, version, mtime_ns, size, count, table_len = _INDEX_HEADER.unpack(header)
+                if (magic != INDEX_MAGIC or version != INDEX_VERSION
+                        or mtime_ns != self._mtime_ns or size != self._size):
+                    return False
+                table = json.loads(f.read(table_len).decode('utf-8'))
+                starts, ends, category_ids = array('Q'), array('Q'), array('i')
+                starts.fromfile(f, count)
+                ends.fromfile(f, count)
+                category_ids.fromfile(f, count)
+        except (OSError, EOFError, struct.error, ValueError):
+            return False
+
+        self._starts, self._ends, self._category_ids = starts, ends, category_ids
+        self.category_table = table
+        self._category_lookup = {cat: cid for cid, cat in enumerate(table)}
+        return True
+
+    def _save_index(self) -> None:
+        table = json.dumps(self.category_table).encode('utf-8')
+        tmp_name = f"{self.index_filename}.tmp"
+        try:
+            with open(tmp_name, 'wb') as f:
+                f.write(_INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self._mtime_ns, self._size,
+                                           len(self._starts), len(table)))
+                f.write(table)
+                self._starts.tofile(f)
+                self._ends.tofile(f)
+                self._category_ids.tofile(f)
+            os.replace(tmp_name, self.index_filename)
+        except OSError as e:
+            print(f"Error saving question index '{self.index_filename}': {e}")
+
+    def _begin_scan(self) -> None:
+        self._scanner = self._records()
+
+    def _records(self) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Streams the top-level array, yielding ``(start, end, record)`` byte ranges.
+
+        The file is decoded in fixed-size chunks and each record is parsed with
+        ``JSONDecoder.raw_decode``; byte offsets are tracked by re-encoding only the
+        text consumed since the previous record, and skipped for ASCII chunks.
+        """
+        decoder = json.JSONDecoder()
+        utf8 = codecs.getincrementaldecoder('utf-8')()
+        mm, size = self._mm, self._size
+        read_pos = 0
+        text = ''
+        ascii_text = True
+        idx = 0          # position in ``text``
+        byte_pos = 0     # byte offset of ``text[idx]`` in the file
+
+        def more() -> bool:
+            nonlocal read_pos, text, idx, ascii_text
+            if read_pos >= size:
+                return False
+            chunk = utf8.decode(mm[read_pos:read_pos + SCAN_CHUNK_SIZE], read_pos + SCAN_CHUNK_SIZE >= size)
+            read_pos += SCAN_CHUNK_SIZE
+            text = text[idx:] + chunk
+            ascii_text = text.isascii()
+            idx = 0
+            return True
+
+        def advance(new_idx: int) -> None:
+            nonlocal idx, byte_pos
+            byte_pos += (new_idx - idx) if ascii_text else len(text[idx:new_idx].encode('utf-8'))
+            idx = new_idx
+
+        # Opening bracket (after optional BOM / whitespace)
+        while True:
+            stripped = text.lstrip('\ufeff \t\r\n')
+            if stripped or not more():
+                break
+        advance(len(text) - len(stripped))
+        if not stripped.startswith('['):
+            raise ValueError(f"'{self.filename}' is not a JSON array")
+        advance(idx + 1)
+
+        while True:
+            advance(_SEPARATOR.match(text, idx).end())
+            if idx >= len(text):
+                if more():
+                    continue
+                print(f"Warning: '{self.filename}' ended before its closing bracket.")
+                return
+            if text[idx] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(text, idx)
+            except json.JSONDecodeError:
+                if more():
+                    continue
+                raise ValueError(f"'{self.filename}' has a malformed record at byte {byte_pos}")
+            start = byte_pos
+            advance(end)
+            yield start, byte_pos, record
+
+    def _scan(self, until: Optional[int] = None) -> None:
+        """
+        Extends the index until it holds ``until`` records (or the whole file).
+        """
+        if self._scanner is None:
+            return
+        for start, end, record in self._scanner:
+            self._add_record(start, end, record)
+            if until is not None and len(self._starts) >= until:
+                return
+        self._scanner = None
+        self._complete = True
+        self._save_index()
+
+    def _add_record(self, start: int, end: int, record: Any) -> None:
+        category = record.get('category') if isinstance(record, dict) else None
+        if isinstance(category, str):
+            cid = self._category_lookup.get(category)
+            if cid is None:
+                cid = self._category_lookup[category] = len(self.category_table)
+                self.category_table.append(category)
+        else:
+            cid = -1
+        self._starts.append(start)
+        self._ends.append(end)
+        self._category_ids.append(cid)
+
+    @property
+    def is_indexed(self) -> bool:
+        """
+        Whether every record of the file has been indexed.
+        """
+        return self._complete
+
+    def __len__(self) -> int:
+        if not self._complete:
+            self._scan()
+        return len(self._starts)
+
+    def __getitem__(self, qid: int) -> Dict[str, Any]:
+        if qid < 0:
+            qid += len(self)
+        if qid >= len(self._starts) and not self._complete:
+            self._scan(until=qid + 1)
+        if not 0 <= qid < len(self._starts):
+            raise IndexError("question id out of range")
+        return json.loads(self._mm[self._starts[qid]:self._ends[qid]])
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        qid = 0
+        while True:
+            try:
+                yield self[qid]
+            except IndexError:
+                return
+            qid += 1
+
+    def raw(self, qid: int) -> bytes:
+        """
+        Returns the undecoded bytes of an indexed record.
+        """
+        return self._mm[self._starts[qid]:self._ends[qid]]
+
+    def byte_ranges(self) -> Tuple[array, array]:
+        """
+        Returns the start and end byte offsets of every record, indexing the whole file.
+        """
+        len(self)
+        return self._starts, self._ends
+
+    def category(self, qid: int) -> Optional[str]:
+        if qid >= len(self._starts) and not self._complete:
+            self._scan(until=qid + 1)
+        cid = self._category_ids[qid]
+        return self.category_table[cid] if cid >= 0 else None
+
+    def close(self) -> None:
+        """
+        Releases the memory map and the underlying file handle.
+        """
+        self._scanner = None
+        self._mm.close()
+        self._file.close()
@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from quiz_server import DEFAULT_HOST, DEFAULT_PORT
+
+OPTION_LETTERS = "ABCD"
+
+
+class Client:
+    """
+    One simulated learner on a keep-alive HTTP/1.1 connection.
+    """
+
+    def __init__(self, host: str, port: int, user: str) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.last: Any = None
+
+    async def connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[int, Any]:
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _sep, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        data = await self.reader.readexactly(length) if length else b''
+        return status, json.loads(data) if data else None
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+async def learner_loop(client: Client, deadline: float, latencies: Dict[str, List[float]],
+                       errors: Dict[str, int], rng: random.Random, think_ms: float) -> None:
+    """
+    Asks for a question and answers it until the deadline, timing every request.
+    """
+    try:
+        await client.connect()
+    except OSError:
+        errors["connect"] = errors.get("connect", 0) + 1
+        return
+    try:
+        while time.perf_counter() < deadline:
+            for method, path, payload in _requests(client, rng):
+                start = time.perf_counter()
+                try:
+                    status, body = await client.request(method, path, payload() if callable(payload) else payload)
+                except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    return
+                latencies.setdefault(path.split('?')[0], []).append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+                client.last = body
+            if think_ms:
+                await asyncio.sleep(rng.random() * think_ms / 1000)
+    finally:
+        await client.close()
+
+
+def _requests(client: Client, rng: random.Random):
+    # One round: draw a question, answer it, and now and then check the stats.
+    yield "GET", f"/question?user={client.user}", None
+    yield "POST", "/answer", lambda: {"user": client.user,
+                                      "question_id": (client.last or {}).get("question_id", 0),
+                                      "answer": rng.choice(OPTION_LETTERS)}
+    if rng.random() < 0.1:
+        yield "GET", f"/stats?user={client.user}", None
+
+
+async def run_load(host: str, port: int, users: int, duration: float, seed: int,
+                   think_ms: float) -> Dict[str, Any]:
+    """
+    Runs ``users`` concurrent learners for ``duration`` seconds.
+
+    Returns:
+        Dict[str, Any]: Requests, requests/sec, errors and per-endpoint latency
+                        percentiles in milliseconds.
+    """
+    rng = random.Random(seed)
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    clients = [Client(host, port, f"learner{i:03d}") for i in range(users)]
+    await asyncio.gather(*(learner_loop(client, deadline, latencies, errors, random.Random(rng.random()), think_ms)
+                           for client in clients))
+    elapsed = time.perf_counter() - start
+
+    report: Dict[str, Any] = {"users": users, "seconds": elapsed, "errors": errors, "endpoints": {}}
+    total = 0
+    everything: List[float] = []
+    for path, samples in sorted(latencies.items()):
+        ordered = sorted(samples)
+        everything.extend(ordered)
+        total += len(ordered)
+        report["endpoints"][path] = _summary(ordered, elapsed)
+    report["requests"] = total
+    report["all"] = _summary(sorted(everything), elapsed)
+    return report
+
+
+def _summary(ordered: List[float], elapsed: float) -> Dict[str, float]:
+    return {"requests": len(ordered), "rps": len(ordered) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(ordered, 0.50), "p95_ms": percentile(ordered, 0.95),
+            "p99_ms": percentile(ordered, 0.99), "max_ms": ordered[-1] if ordered else 0.0}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['users']} learners, {report['seconds']:.1f}s, {report['requests']} requests")
+    print(f"{'endpoint':<14} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = list(report["endpoints"].items()) + [("all", report["all"])]
+    for path, s in rows:
+        print(f"{path:<14} {s['requests']:>9} {s['rps']:>9.0f} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} "
+              f"{s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+    if report["errors"]:
+        print(f"Errors: {report['errors']}")
+
+
+def spawn_server(port: int, questions: str, analytics: str) -> subprocess.Popen:
+    """
+    Starts quiz_server.py in a subprocess and waits until it accepts connections.
+    """
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                            "quiz_server.py"),
+                               "--port", str(port), "--questions", questions, "--analytics", analytics],
+                              stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line.startswith("Serving"):
+        server.kill()
+        raise RuntimeError(f"Server did not start: {line.strip()}")
+    print(line.strip())
+    return server
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test quiz_server.py with simulated learners.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--users", type=int, default=200, help="concurrent learners (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default: %(default)s)")
+    parser.add_argument("--think-ms", type=float, default=0.0,
+                        help="random pause of up to this long between questions (0: closed loop, maximum load)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spawn", action="store_true", help="start a server for the run and stop it afterwards")
+    parser.add_argument("--questions", default="questions.json", help="bank for --spawn")
+    parser.add_argument("--analytics", default="loadtest_analytics.db", help="database for --spawn")
+    parser.add_argument("-o", "--output", default=None, help="write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    server = spawn_server(args.port, args.questions, args.analytics) if args.spawn else None
+    try:
+        report = asyncio.run(run_load(args.host, args.port, args.users, args.duration, args.seed, args.think_ms))
+    finally:
+        if server is not None:
+            server.terminate()
+            print(server.communicate(timeout=30)[0].strip())
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+    return 1 if report["errors"] or not report["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
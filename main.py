@@ -1,11 +1,29 @@
+import argparse
+import os
 import random
 import sys
-from typing import List, Dict, Optional, Any
+import time
+from typing import List, Dict, Optional, Any, Sequence, Iterator
+import instrumentation
+from attempt_history import AttemptHistory
 from data_manager import DataManager
+from exam import DEFAULT_EXAM_MINUTES, DEFAULT_EXAM_QUESTIONS, EXAM_RESULTS_FILE, Exam, format_duration, format_report
+from question_bank import QuestionBank
+from scheduler import ReviewScheduler
+from quiz_engine import QuizEngine
+from sampler import WeakAreaSampler
+from search_index import SearchIndex
 
 # Constants
 QUESTIONS_FILE = 'questions.json'
 ANALYTICS_FILE = 'analytics.json'
+SCHEDULE_FILE = 'schedule.json'
+HISTORY_DIR = 'attempt_history'
+MODE_RANDOM = 'random'
+MODE_REVIEW = 'review'
+MODE_WEAK = 'weak'
+# Top-ranked questions listed before a --search drill
+SEARCH_PREVIEW = 3
 DEFAULT_STATS = {"total_attempted": 0, "total_correct": 0, "streak": 0}
 
 class QuizManager:
@@ -13,55 +31,108 @@ class QuizManager:
     Manages the core logic of the Flashcard Quiz application.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, mode: str = MODE_RANDOM, analytics_path: str = ANALYTICS_FILE,
+                 user: Optional[str] = None, search: Optional[str] = None, shared: bool = False,
+                 exam: Optional[int] = None, exam_minutes: float = DEFAULT_EXAM_MINUTES) -> None:
         """
         Initializes the QuizManager by loading questions and analytics data.
+
+        Args:
+            mode (str): Question order, MODE_RANDOM (shuffled), MODE_REVIEW
+                        (spaced repetition, most overdue first) or MODE_WEAK
+                        (weighted towards weak categories and questions).
+            analytics_path (str): Analytics JSON file or SQLite database (.db).
+            user (Optional[str]): The user to record answers for (SQLite only).
+            search (Optional[str]): Drill the questions matching this full-text
+                                    query instead of asking for a category.
+            shared (bool): Merge analytics with other sessions running at the
+                           same time instead of overwriting them (JSON only).
+            exam (Optional[int]): Sit a timed mock exam of this many questions
+                                  instead of practicing.
+            exam_minutes (float): The time allowed for the exam.
         """
-        self.questions: List[Dict[str, Any]] = DataManager.load_json(QUESTIONS_FILE, default=[]) or []
-        self.stats: Dict[str, Any] = DataManager.load_analytics(ANALYTICS_FILE)
+        self.mode = mode
+        self.bank = QuestionBank.from_file(QUESTIONS_FILE)
+        self.questions: Sequence[Any] = self.bank.questions
+        self.analytics_log = DataManager.open_analytics(analytics_path, user=user, import_from=ANALYTICS_FILE,
+                                                        shared=shared)
+        self.stats: Dict[str, Any] = self.analytics_log.load()
+        # Built when review mode is used
+        self.scheduler: Optional[ReviewScheduler] = None
+        # The SQLite store keeps learners apart; so do their histories and schedules
+        self.history = AttemptHistory(DataManager.user_path(HISTORY_DIR, self.analytics_log)).load()
+        self.engine = QuizEngine(self.bank, self.analytics_log, history=self.history)
+        self.sampler: Optional[WeakAreaSampler] = None
+        self.category: Optional[str] = None
+        self.search = search
+        self.exam = exam
+        self.exam_minutes = exam_minutes
 
     def display_welcome_message(self) -> None:
         """
-        Calculates and displays the welcome message with user statistics.
+        Displays the welcome message with the user's lifetime statistics.
         """
         streak = self.stats.get("streak", 0)
-        
-        # Calculate totals from new schema
-        total_attempted = 0
-        total_correct = 0
-        performance = self.stats.get("performance", {})
-        
-        for cat_data in performance.values():
-            total_attempted += cat_data.get("total", 0)
-            total_correct += cat_data.get("correct", 0)
-        
-        accuracy = (total_correct / total_attempted * 100) if total_attempted > 0 else 0.0
+        # Running totals kept by the analytics backend, no rescan of the categories
+        accuracy = self.analytics_log.stats.accuracy * 100
         print(f"\nWelcome back! Lifetime Accuracy: {accuracy:.1f}% | Current Streak: {streak}")
 
-    def filter_questions(self) -> List[Dict[str, Any]]:
+    def filter_questions(self) -> List[int]:
         """
         Asks the user to select a category and filters the questions.
+        The selected category (None for all) is kept in ``self.category``.
 
         Returns:
-            List[Dict[str, Any]]: A list of filtered questions.
+            List[int]: The ids of the filtered questions.
         """
         if not self.questions:
             print("No questions data available.")
             return []
 
         while True:
-            choice = input("Do you want to practice AWS, Cloud, or All? ").strip().lower()
+            choice = input("Do you want to practice AWS, Cloud, All, or Weak areas? ").strip().lower()
             if choice == 'all':
-                return self.questions
+                self.category = None
+                return list(self.bank.question_ids())
+
+            if choice in ['weak', 'weak areas']:
+                self.mode = MODE_WEAK
+                self.category = None
+                return list(self.bank.question_ids())
             
             if choice in ['aws', 'cloud']:
-                filtered = [q for q in self.questions if q.get('category', '').lower() == choice]
+                category = self.bank.resolve_category(choice)
+                filtered = list(self.bank.question_ids(category)) if category else []
                 if not filtered:
                     print(f"No questions found for category: {choice}")
                     continue
+                self.category = category
                 return filtered
             
-            print("Invalid choice. Please enter 'AWS', 'Cloud', or 'All'.")
+            print("Invalid choice. Please enter 'AWS', 'Cloud', 'All', or 'Weak'.")
+
+    def search_questions(self) -> List[int]:
+        """
+        Looks up the questions containing every word of ``self.search`` and
+        lists the best-ranked ones. The matches are drilled in shuffled order,
+        whatever the mode.
+
+        Returns:
+            List[int]: The ids of the matching questions.
+        """
+        index = SearchIndex.for_bank(self.bank, QUESTIONS_FILE)
+        with instrumentation.span("QuizManager.search"):
+            matches = index.matches(self.search)
+            best = index.search(self.search, limit=SEARCH_PREVIEW)
+        if not matches:
+            print(f"No questions match '{self.search}'.")
+            return []
+        print(f"{len(matches)} questions match '{self.search}'. Best matches:")
+        for qid in best:
+            print(f"  - {self.bank[qid]['question']}")
+        self.mode = MODE_RANDOM
+        self.category = None
+        return matches
 
     def get_user_answer(self) -> str:
         """
@@ -85,47 +156,178 @@ class QuizManager:
             return
 
         self.display_welcome_message()
+        if self.exam:
+            self.run_exam()
+            return
         
-        questions_to_play = self.filter_questions()
-        if not questions_to_play:
+        question_ids = self.search_questions() if self.search else self.filter_questions()
+        if not question_ids:
             return
 
-        random.shuffle(questions_to_play)
-        
         score = 0
-        total_session = len(questions_to_play)
+        total_session = len(question_ids)
         
         print(f"\nStarting quiz with {total_session} questions...\n")
         
-        for i, q in enumerate(questions_to_play, 1):
-            print(f"Question {i}/{total_session}: {q['question']}")
-            for option in q['options']:
-                print(option)
+        for i, qid in enumerate(self.play_order(question_ids), 1):
+            # Spans leave out the time spent waiting for the user's input
+            with instrumentation.span("QuizManager.run.show_question"):
+                q = self.bank[qid]
+                print(f"Question {i}/{total_session}: {q['question']}")
+                for option in q['options']:
+                    print(option)
                 
+            shown_at = time.perf_counter()
             user_answer = self.get_user_answer()
+            response_ms = int((time.perf_counter() - shown_at) * 1000)
             
-            # Update data structure
-            category = q.get('category', 'General')
-            if "performance" not in self.stats:
-                self.stats["performance"] = {}
-            if category not in self.stats["performance"]:
-                self.stats["performance"][category] = {"correct": 0, "total": 0}
-            
-            self.stats["performance"][category]["total"] += 1
-            
-            if user_answer == q['correct_answer']:
-                print("Correct!")
-                score += 1
-                self.stats["performance"][category]["correct"] += 1
-                self.stats["streak"] = self.stats.get("streak", 0) + 1
-            else:
-                print(f"Wrong! The answer was {q['correct_answer']}")
-                self.stats["streak"] = 0
-            print("-" * 30)
+            with instrumentation.span("QuizManager.run.submit"):
+                # Grade, then record (analytics, schedule, history, session)
+                result = self.engine.submit(qid, user_answer)
+                self.engine.record(result, response_ms)
+                
+                if result.is_correct:
+                    print("Correct!")
+                    score += 1
+                else:
+                    print(f"Wrong! The answer was {result.correct_answer}")
+                print("-" * 30)
+            instrumentation.count("QuizManager.questions")
             
         print(f"\nGame Over! Your final score is {score}/{total_session}")
-        DataManager.save_json(ANALYTICS_FILE, self.stats)
+        self.shutdown()
+
+    def run_exam(self) -> None:
+        """
+        Runs a timed mock exam: a fixed set of questions, a countdown and no
+        feedback until the end, then a per-category timing and accuracy report.
+        """
+        exam = Exam.draw(self.bank, self.exam, time_limit_s=self.exam_minutes * 60)
+        if not len(exam):
+            print("No questions available for a mock exam.")
+            return
+        print(f"\nMock exam: {len(exam)} questions in {format_duration(exam.time_limit_s)}. "
+              f"No feedback until the end.\n")
+        exam.start()
+        for position in range(len(exam)):
+            q = exam.question(position)
+            print(f"Question {position + 1}/{len(exam)} [{format_duration(exam.remaining_s())} left]: "
+                  f"{q['question']}")
+            for option in q['options']:
+                print(option)
+            exam.present(position)
+            if not exam.answer(position, self.get_user_answer()):
+                print("Time is up! That answer came after the deadline.")
+                break
+            print("-" * 30)
+
+        with instrumentation.span("QuizManager.run_exam.submit"):
+            report = exam.submit(self.engine, EXAM_RESULTS_FILE)
+        print(f"\nExam finished.\n{format_report(report)}")
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        """
+        Writes out analytics, the review schedule and the attempt history.
+        """
+        with instrumentation.span("QuizManager.run.shutdown"):
+            self.analytics_log.close()
+            if self.scheduler is not None:
+                self.scheduler.save()
+            self.history.close()
+
+    def review_scheduler(self) -> ReviewScheduler:
+        """
+        Loads the review schedule on first use and has the engine keep it updated.
+        """
+        if self.scheduler is None:
+            self.scheduler = ReviewScheduler(self.bank, DataManager.user_path(SCHEDULE_FILE, self.analytics_log))
+            self.engine.scheduler = self.scheduler
+        return self.scheduler
+
+    def weak_area_sampler(self) -> WeakAreaSampler:
+        """
+        Builds the weak-area sampler on first use and has the engine keep it updated.
+        """
+        if self.sampler is None:
+            self.sampler = WeakAreaSampler(self.bank, self.stats.get("performance", {}), self.history)
+            self.engine.sampler = self.sampler
+        return self.sampler
+
+    def play_order(self, question_ids: List[int]) -> Iterator[int]:
+        """
+        Yields the ids to ask this session, one per question in the pool.
+
+        In review and weak-area mode each id is picked after the previous answer
+        was recorded, so a missed question comes back once its relearning delay
+        has passed, or with a higher weight.
+        """
+        if self.mode == MODE_WEAK:
+            sampler = self.weak_area_sampler()
+            last = None
+            for _ in range(len(question_ids)):
+                last = sampler.sample(self.category, exclude=last)
+                if last is None:
+                    return
+                yield last
+            return
+
+        if self.mode != MODE_REVIEW:
+            random.shuffle(question_ids)
+            yield from question_ids
+            return
+
+        scheduler = self.review_scheduler()
+        last = None
+        for _ in range(len(question_ids)):
+            last = scheduler.next_due(self.category, exclude=last)
+            if last is None:
+                return
+            yield last
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive number, not {value}")
+    return number
+
+
+def positive_float(value: str) -> float:
+    """argparse type for durations that must be greater than 0."""
+    number = float(value)
+    if not 0 < number < float("inf"):
+        raise argparse.ArgumentTypeError(f"must be a positive number, not {value}")
+    return number
+
 
 if __name__ == "__main__":
-    app = QuizManager()
+    parser = argparse.ArgumentParser(description="Flashcard quiz in the terminal.")
+    parser.add_argument("--mode", choices=[MODE_RANDOM, MODE_REVIEW, MODE_WEAK], default=MODE_RANDOM,
+                        help="question order: shuffled, spaced-repetition review (most overdue first), "
+                             "or weighted towards weak areas")
+    parser.add_argument("--analytics", default=os.environ.get("QUIZ_ANALYTICS", ANALYTICS_FILE),
+                        help="analytics JSON file, or a .db file for the multi-user SQLite store")
+    parser.add_argument("--search", default=None, metavar="QUERY",
+                        help="practice the questions whose text or options match QUERY, "
+                             "e.g. --search glacier (the last word also matches as a prefix)")
+    parser.add_argument("--exam", type=positive_int, nargs="?", const=DEFAULT_EXAM_QUESTIONS, default=None, metavar="N",
+                        help=f"sit a timed mock exam of N questions (default: {DEFAULT_EXAM_QUESTIONS}) "
+                             "with no feedback until the end")
+    parser.add_argument("--exam-minutes", type=positive_float, default=DEFAULT_EXAM_MINUTES,
+                        help="time allowed for --exam (default: %(default)s)")
+    parser.add_argument("--user", default=None, help="user name for the SQLite store (default: $QUIZ_USER or login)")
+    parser.add_argument("--shared", action="store_true",
+                        default=os.environ.get("QUIZ_SHARED_ANALYTICS", "") not in ("", "0"),
+                        help="merge analytics with other CLI / GUI sessions running at the same time "
+                             "(same as QUIZ_SHARED_ANALYTICS=1)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time hot paths and print p50/p95/p99 on exit (same as QUIZ_PROFILE=1)")
+    parser.add_argument("--cprofile", default=None, metavar="PATH", help="also write a cProfile capture here")
+    args = parser.parse_args()
+    if args.profile or args.cprofile:
+        instrumentation.enable(output=os.environ.get(instrumentation.ENV_PROFILE_OUTPUT), cprofile=args.cprofile)
+
+    app = QuizManager(mode=args.mode, analytics_path=args.analytics, user=args.user, search=args.search,
+                      shared=args.shared, exam=args.exam, exam_minutes=args.exam_minutes)
     app.run()
@@ -0,0 +1,128 @@
+import copy
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from data_manager import DataManager
+
+_STOP = object()
+
+
+class PersistenceWorker:
+    """
+    Runs disk writes on a single background thread so callers never block on I/O.
+
+    Jobs run in submission order. Jobs submitted with a ``key`` (e.g. a snapshot
+    of a file) are coalesced: while a job for that key is still queued, newer
+    submissions replace its payload instead of queueing another write. The queue
+    is bounded, so a stalled disk applies back-pressure rather than growing memory.
+    """
+
+    def __init__(self, max_pending: int = 1024, name: str = "persistence-writer") -> None:
+        """
+        Args:
+            max_pending (int): Maximum number of queued jobs before submit() blocks.
+            name (str): Name of the writer thread.
+        """
+        self._queue: "queue.Queue[Tuple[float, Any]]" = queue.Queue(maxsize=max_pending)
+        self._keyed: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+        self._counters = {"jobs": 0, "coalesced": 0, "errors": 0,
+                          "total_write_ms": 0.0, "max_write_ms": 0.0, "last_write_ms": 0.0,
+                          "max_queue_wait_ms": 0.0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable[[], Any], key: Optional[str] = None) -> None:
+        """
+        Queues a job for the writer thread.
+
+        Args:
+            job (Callable[[], Any]): The function performing the write.
+            key (Optional[str]): Coalescing key; a queued job with the same key is
+                                 replaced by this one.
+        """
+        if self._closed:
+            # Late writes after close() still happen, just synchronously.
+            self._execute(job, time.perf_counter())
+            return
+        if key is not None:
+            with self._lock:
+                if key in self._keyed:
+                    self._keyed[key] = job
+                    self._counters["coalesced"] += 1
+                    return
+                self._keyed[key] = job
+        self._queue.put((time.perf_counter(), key if key is not None else job))
+
+    def save_json(self, filename: str, data: Any, indent: Optional[int] = 4) -> None:
+        """
+        Queues an atomic JSON snapshot write, coalesced per file.
+
+        The data is copied on the calling thread, so the caller may keep mutating it.
+        """
+        snapshot = copy.deepcopy(data)
+        self.submit(lambda: DataManager.save_json_atomic(filename, snapshot, indent=indent), key=filename)
+
+    def _run(self) -> None:
+        while True:
+            queued_at, item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                if isinstance(item, str):
+                    with self._lock:
+                        job = self._keyed.pop(item)
+                else:
+                    job = item
+                self._execute(job, queued_at)
+            finally:
+                self._queue.task_done()
+
+    def _execute(self, job: Callable[[], Any], queued_at: float) -> None:
+        start = time.perf_counter()
+        try:
+            job()
+        except Exception as e:
+            self._counters["errors"] += 1
+            print(f"Error in background write: {e}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        wait_ms = (start - queued_at) * 1000
+        counters = self._counters
+        counters["jobs"] += 1
+        counters["total_write_ms"] += elapsed_ms
+        counters["last_write_ms"] = elapsed_ms
+        counters["max_write_ms"] = max(counters["max_write_ms"], elapsed_ms)
+        counters["max_queue_wait_ms"] = max(counters["max_queue_wait_ms"], wait_ms)
+
+    def flush(self) -> None:
+        """
+        Blocks until every job queued so far has been written.
+        """
+        if not self._closed:
+            self._queue.join()
+
+    def close(self) -> None:
+        """
+        Writes all pending jobs and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self._queue.put((time.perf_counter(), _STOP))
+        self._thread.join()
+        self._closed = True
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns write-latency counters.
+
+        Returns:
+            Dict[str, float]: Number of jobs written and coalesced, errors, total /
+                              average / max / last write time and the longest
+                              time a job waited in the queue, in milliseconds.
+        """
+        stats = dict(self._counters)
+        stats["pending"] = self._queue.qsize()
+        stats["avg_write_ms"] = stats["total_write_ms"] / stats["jobs"] if stats["jobs"] else 0.0
+        return stats
@@ -0,0 +1,355 @@
+import bisect
+import os
+import random
+from array import array
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+from question_store import UNCATEGORIZED, QuestionStore, answer_index
+from lazy_questions import LazyQuestionFile
+from question_pack import QuestionPack, pack_path_for
+
+ALL_CATEGORIES = "All"
+# Banks larger than this are indexed and decoded lazily instead of parsed up front.
+LAZY_LOAD_THRESHOLD = 64 * 1024 * 1024
+
+
+class EditableQuestions:
+    """
+    Question sequence that takes edits on top of a read-only source (a compact
+    store, a pack or a lazy file), so a reloaded bank keeps its question ids.
+
+    Changed and added questions are kept as dicts in ``_edits``; added ones get
+    the next free id. Removed questions are only dropped from the bank's index:
+    they stay readable, so an answer to a question already on screen can still be
+    checked. ``rebase`` swaps in a new source (a re-indexed lazy file) together
+    with the position of each id in it; removed questions of a lazy file are
+    then only kept as their category.
+    """
+
+    def __init__(self, base: Sequence[Any]) -> None:
+        self.base = base
+        self._positions: Optional[array] = None  # None: id == position in base
+        self._edits: Dict[int, Any] = {}
+        self._count = len(base)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _position(self, qid: int) -> int:
+        return qid if self._positions is None else self._positions[qid]
+
+    def __getitem__(self, qid: int) -> Any:
+        if qid < 0:
+            qid += self._count
+        q = self._edits.get(qid)
+        if q is not None:
+            return q
+        position = self._position(qid) if 0 <= qid < self._count else -1
+        if position < 0:
+            raise IndexError("question id out of range")
+        return self.base[position]
+
+    def __iter__(self) -> Iterator[Any]:
+        for qid in range(self._count):
+            yield self[qid]
+
+    def category(self, qid: int) -> Optional[str]:
+        q = self._edits.get(qid)
+        category_of = getattr(self.base, 'category', None)
+        if q is not None or category_of is None:
+            return self[qid].get('category')
+        return category_of(self._position(qid))
+
+    def correct_index(self, qid: int) -> int:
+        q = self._edits.get(qid)
+        correct_of = getattr(self.base, 'correct_index', None)
+        if q is not None or correct_of is None:
+            return answer_index(self[qid].get('correct_answer'))
+        return correct_of(self._position(qid))
+
+    def set(self, qid: int, q: Any) -> None:
+        self._edits[qid] = q
+
+    def append(self, q: Any) -> int:
+        qid = self._count
+        self._edits[qid] = q
+        self._count += 1
+        return qid
+
+    def rebase(self, base: Sequence[Any], positions: array) -> None:
+        """
+        Reads from ``base`` from now on; ``positions[qid]`` is each id's record in
+        it (-1 for ids only kept in the edits).
+        """
+        for qid in range(len(positions)):
+            if positions[qid] >= 0:
+                self._edits.pop(qid, None)
+        old, self.base, self._positions = self.base, base, positions
+        close = getattr(old, 'close', None)
+        if close is not None:
+            close()
+
+
+class BankChanges(NamedTuple):
+    added: List[int]
+    updated: List[Tuple[int, Any, Any]]   # (qid, old record, new record)
+    removed: List[Tuple[int, Any]]        # (qid, old record)
+    categories_added: List[str]
+    categories_removed: List[str]
+    touched: Set[str]                     # categories that gained or lost questions
+
+
+class QuestionBank:
+    """
+    Holds the loaded questions together with a per-category index of question ids.
+
+    The index is built once at load time, so filtering by category, listing
+    categories and drawing a random question never rescan the whole bank.
+    A question id is the position of the question in ``questions``.
+    """
+
+    def __init__(self, questions: Sequence[Any]) -> None:
+        """
+        Args:
+            questions (Sequence[Any]): The questions, as loaded from the bank file.
+        """
+        self.questions = questions
+        self._by_category: Dict[str, Sequence[int]] = {}
+        prebuilt = getattr(questions, 'category_index', None)
+        if prebuilt is not None:
+            # Compiled packs ship their category index.
+            self._by_category = prebuilt()
+        else:
+            # Compact and lazy stores answer category lookups without decoding a record.
+            category_of = getattr(questions, 'category', None)
+            for qid in range(len(questions)):
+                category = category_of(qid) if category_of else questions[qid].get('category')
+                self._by_category.setdefault(UNCATEGORIZED if category is None else category,
+                                             []).append(qid)
+        self._categories = sorted(self._by_category)
+        self._lookup = {cat.lower(): cat for cat in self._categories}
+        # Set once questions are removed by a reload; until then every id is live
+        self._all: Optional[List[int]] = None
+
+    @classmethod
+    def from_file(cls, filename: str, lazy_threshold: int = LAZY_LOAD_THRESHOLD) -> "QuestionBank":
+        """
+        Loads a question bank from a JSON file.
+
+        A compiled question pack next to the file (see question_pack.py) is
+        memory-mapped if it is up to date. Otherwise, small banks are parsed into
+        a compact QuestionStore and banks larger than ``lazy_threshold`` bytes are
+        opened as a LazyQuestionFile, so startup only costs loading (or, the first
+        time, building) the byte-offset index.
+
+        Args:
+            filename (str): The path to the questions JSON file.
+            lazy_threshold (int): Size in bytes above which the bank is loaded lazily.
+
+        Returns:
+            QuestionBank: The indexed bank (empty if the file is missing or corrupt).
+        """
+        pack = QuestionPack.open(pack_path_for(filename), source=filename)
+        if pack is not None:
+            return cls(pack)
+        if os.path.exists(filename) and os.path.getsize(filename) > lazy_threshold:
+            lazy = LazyQuestionFile.open(filename)
+            if lazy is not None:
+                try:
+                    # Indexing the categories scans the rest of the file
+                    return cls(lazy)
+                except ValueError as e:
+                    lazy.close()
+                    print(f"Error indexing '{filename}': {e}. Falling back to a full load.")
+        return cls(QuestionStore.from_file(filename))
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __getitem__(self, qid: int) -> Any:
+        return self.questions[qid]
+
+    @property
+    def categories(self) -> List[str]:
+        """
+        The sorted list of unique categories. Do not modify the returned list.
+        """
+        return self._categories
+
+    def resolve_category(self, name: str) -> Optional[str]:
+        """
+        Maps a case-insensitive category name to its canonical spelling.
+
+        Returns:
+            Optional[str]: The category as stored in the bank, or None if unknown.
+        """
+        return self._lookup.get(name.strip().lower())
+
+    def question_ids(self, category: Optional[str] = None) -> Sequence[int]:
+        """
+        Returns the ids of the questions in a category.
+
+        Args:
+            category (Optional[str]): The category, or None / "All" for every question.
+
+        Returns:
+            Sequence[int]: The matching question ids.
+        """
+        if category is None or category == ALL_CATEGORIES:
+            return range(len(self.questions)) if self._all is None else self._all
+        return self._by_category.get(category, [])
+
+    def filter(self, category: Optional[str] = None) -> List[Any]:
+        """
+        Returns a new list with the questions of a category.
+        """
+        if category is None or category == ALL_CATEGORIES:
+            if self._all is not None:
+                return [self.questions[qid] for qid in self._all]
+            return list(self.questions)
+        return [self.questions[qid] for qid in self._by_category.get(category, [])]
+
+    def count(self, category: Optional[str] = None) -> int:
+        """
+        Returns the number of questions in a category.
+        """
+        return len(self.question_ids(category))
+
+    def random_id(self, category: Optional[str] = None, rng: Any = random) -> Optional[int]:
+        """
+        Draws a random question id from a category in constant time.
+
+        Returns:
+            Optional[int]: The drawn question id, or None if the category is empty.
+        """
+        ids = self.question_ids(category)
+        if not ids:
+            return None
+        return ids[rng.randrange(len(ids))]
+
+    @property
+    def edited(self) -> bool:
+        """
+        Whether questions were changed after loading, so ids may no longer match
+        positions in the bank file.
+        """
+        return isinstance(self.questions, EditableQuestions)
+
+    def _ids_for_update(self, category: str) -> List[int]:
+        ids = self._by_category.get(category)
+        if ids is None:
+            ids = self._by_category[category] = []
+            bisect.insort(self._categories, category)
+            self._lookup[category.lower()] = category
+        elif not isinstance(ids, list):
+            # Packs ship read-only id arrays
+            ids = self._by_category[category] = list(ids)
+        return ids
+
+    def _index(self, qid: int, category: str) -> bool:
+        ids = self._ids_for_update(category)
+        bisect.insort(ids, qid)
+        return len(ids) == 1
+
+    def _unindex(self, qid: int, category: str) -> bool:
+        ids = self._ids_for_update(category)
+        i = bisect.bisect_left(ids, qid)
+        if i < len(ids) and ids[i] == qid:
+            del ids[i]
+        if ids:
+            return False
+        del self._by_category[category]
+        self._categories.remove(category)
+        self._lookup.pop(category.lower(), None)
+        return True
+
+    @staticmethod
+    def _category_name(category: Optional[str]) -> str:
+        return UNCATEGORIZED if category is None else category
+
+    @classmethod
+    def _category_of(cls, q: Any) -> str:
+        return cls._category_name(q.get('category') if hasattr(q, 'get') else None)
+
+    def apply_changes(self, added: Sequence[Tuple[int, Any]] = (), updated: Sequence[Tuple[int, Any]] = (),
+                      removed: Sequence[int] = (), base: Optional[Sequence[Any]] = None,
+                      positions: Optional[array] = None) -> BankChanges:
+        """
+        Applies a diff of the bank file (see bank_watcher.py) in place, updating
+        the category index by difference instead of rebuilding it.
+
+        Args:
+            added (Sequence[Tuple[int, Any]]): New ``(qid, record)`` pairs; the ids
+                must continue the id sequence.
+            updated (Sequence[Tuple[int, Any]]): ``(qid, record)`` of changed questions.
+            removed (Sequence[int]): Ids of removed questions.
+            base (Optional[Sequence[Any]]): A new source for a lazily loaded bank,
+                re-indexed on the changed file.
+            positions (Optional[array]): Each id's record in ``base`` (-1 for none).
+
+        Returns:
+            BankChanges: The applied changes, with the records they replaced (None
+                after a rebase, when the old records are gone with the old file).
+        """
+        if not isinstance(self.questions, EditableQuestions):
+            self.questions = EditableQuestions(self.questions)
+        questions = self.questions
+        old_categories = {qid: questions.category(qid) for qid in removed}
+        old_categories.update((qid, questions.category(qid)) for qid, _q in updated)
+        if base is None:
+            old_updated = [(qid, questions[qid], q) for qid, q in updated]
+            old_removed = [(qid, questions[qid]) for qid in removed]
+        else:
+            # The old source maps the file that was just rewritten, so the replaced
+            # records cannot be read any more; only their categories are known
+            old_updated = [(qid, None, q) for qid, q in updated]
+            old_removed = [(qid, None) for qid in removed]
+            for qid in removed:
+                questions.set(qid, {'category': old_categories[qid]})
+            questions.rebase(base, positions)
+        for qid, q in updated:
+            questions.set(qid, q)
+        added_ids = []
+        for qid, q in added:
+            if qid != len(questions):
+                raise ValueError(f"Added question id {qid} does not follow id {len(questions) - 1}")
+            added_ids.append(questions.append(q))
+
+        categories_added: List[str] = []
+        categories_removed: List[str] = []
+        touched: Set[str] = set()
+
+        def index(qid: int, category: str) -> None:
+            touched.add(category)
+            if self._index(qid, category):
+                categories_added.append(category)
+
+        def unindex(qid: int, category: str) -> None:
+            touched.add(category)
+            if self._unindex(qid, category):
+                categories_removed.append(category)
+
+        for qid, _old in old_removed:
+            unindex(qid, self._category_name(old_categories[qid]))
+        for qid, _old, new in old_updated:
+            old_category = self._category_name(old_categories[qid])
+            new_category = self._category_of(new)
+            if old_category != new_category:
+                unindex(qid, old_category)
+                index(qid, new_category)
+        for qid in added_ids:
+            index(qid, self._category_of(questions[qid]))
+
+        if removed and self._all is None:
+            self._all = list(range(len(questions) - len(added_ids)))
+        if self._all is not None:
+            for qid, _old in old_removed:
+                i = bisect.bisect_left(self._all, qid)
+                if i < len(self._all) and self._all[i] == qid:
+                    del self._all[i]
+            self._all.extend(added_ids)
+
+        # A category removed and re-added in the same diff is neither
+        return BankChanges(added_ids, old_updated, old_removed,
+                           [c for c in categories_added if c in self._by_category and c not in categories_removed],
+                           [c for c in categories_removed if c not in self._by_category],
+                           touched)
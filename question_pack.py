@@ -0,0 +1,332 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+from data_manager import DataManager
+from question_store import UNCATEGORIZED, ColumnarQuestions, QuestionStore
+
+PACK_MAGIC = b'QPAK'
+PACK_VERSION = 1
+PACK_EXTENSION = '.qpak'
+NO_STRING = 0xFFFFFFFF
+
+# magic, version, flags, record count, category count, option count, option ref count,
+# category index count, source size, source mtime_ns, then section offsets:
+# records, options, option refs, category index, index ids, string pool, extras (offset, length)
+_HEADER = struct.Struct('<4sHHIIIIIQq8Q')
+_HEADER_SIZE = (_HEADER.size + 7) // 8 * 8
+# Fixed-width record: question (offset, length), first option ref, category id,
+# option count, correct answer index, padding. Five 32-bit words.
+_RECORD = struct.Struct('<IIIiBb2x')
+_RECORD_WORDS = _RECORD.size // 4
+_STRING_REF = struct.Struct('<II')
+_INDEX_ENTRY = struct.Struct('<IIII')
+
+
+def pack_path_for(filename: str) -> str:
+    """
+    Returns the compiled pack path that belongs to a questions JSON file.
+    """
+    return os.path.splitext(filename)[0] + PACK_EXTENSION
+
+
+class _StringPool:
+    """
+    Accumulates de-duplicated UTF-8 strings for the pack's string pool.
+    """
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self._lookup: Dict[str, int] = {}
+
+    def add(self, text: str) -> tuple:
+        encoded = text.encode('utf-8')
+        offset = self._lookup.get(text)
+        if offset is None:
+            offset = self._lookup[text] = len(self.data)
+            self.data += encoded
+        return offset, len(encoded)
+
+
+def compile_pack(source: str, destination: Optional[str] = None) -> Optional[str]:
+    """
+    Compiles a questions JSON file into a binary question pack.
+
+    Args:
+        source (str): The path to the questions JSON file.
+        destination (Optional[str]): The pack path. Defaults to ``pack_path_for(source)``.
+
+    Returns:
+        Optional[str]: The path of the written pack, or None on failure.
+    """
+    destination = destination or pack_path_for(source)
+    if not os.path.exists(source):
+        print(f"Error: File '{source}' not found.")
+        return None
+    stat = os.stat(source)
+    questions = DataManager.load_json(source, default=None)
+    if not isinstance(questions, list) or not all(isinstance(q, dict) for q in questions):
+        print(f"Error: '{source}' is not a JSON list of questions; no pack written.")
+        return None
+    store = QuestionStore.from_questions(questions)
+    count = len(store)
+
+    pool = _StringPool()
+    categories = bytearray()
+    for category in store.category_table:
+        categories += _STRING_REF.pack(*pool.add(category))
+
+    records = bytearray()
+    option_table = bytearray()
+    option_ids: Dict[str, int] = {}
+    refs = bytearray()
+    ref_count = 0
+    by_category: Dict[str, List[int]] = {}
+    extras: Dict[str, Any] = {}
+    no_options: List[int] = []
+
+    for qid in range(count):
+        text = store.question_text(qid)
+        q_off, q_len = pool.add(text) if isinstance(text, str) else (NO_STRING, 0)
+        options = store.options(qid)
+        for option in options:
+            oid = option_ids.get(option)
+            if oid is None:
+                oid = option_ids[option] = len(option_ids)
+                option_table += _STRING_REF.pack(*pool.add(option))
+            refs += struct.pack('<I', oid)
+        if len(options) > 255:
+            print(f"Error: question {qid} in '{source}' has more than 255 options.")
+            return None
+        records += _RECORD.pack(q_off, q_len, ref_count, store.category_id(qid),
+                                len(options), store.correct_index(qid))
+        ref_count += len(options)
+
+        category = store.category(qid)
+        by_category.setdefault(UNCATEGORIZED if category is None else category, []).append(qid)
+        if store.extras(qid):
+            extras[str(qid)] = store.extras(qid)
+        if not store.has_options(qid):
+            no_options.append(qid)
+
+    index_entries = bytearray()
+    index_ids = bytearray()
+    position = 0
+    for category in sorted(by_category):
+        ids = by_category[category]
+        index_entries += _INDEX_ENTRY.pack(*pool.add(category), position, len(ids))
+        index_ids += struct.pack(f'<{len(ids)}I', *ids)
+        position += len(ids)
+
+    extras_blob = json.dumps({"extras": extras, "no_options": no_options}).encode('utf-8') \
+        if extras or no_options else b''
+
+    sections = [bytes(categories), bytes(records), bytes(option_table), bytes(refs),
+                bytes(index_entries), bytes(index_ids), bytes(pool.data), extras_blob]
+    offsets = []
+    position = _HEADER_SIZE
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+        position += -position % 8
+
+    header = _HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, count, len(store.category_table),
+                          len(option_ids), ref_count, len(by_category), stat.st_size, stat.st_mtime_ns,
+                          *offsets[1:7], offsets[7], len(extras_blob))
+    tmp_name = f"{destination}.tmp"
+    try:
+        with open(tmp_name, 'wb') as f:
+            f.write(header.ljust(_HEADER_SIZE, b'\0'))
+            for offset, section in zip(offsets, sections):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(section)
+        os.replace(tmp_name, destination)
+    except OSError as e:
+        print(f"Error writing question pack '{destination}': {e}")
+        return None
+    return destination
+
+
+class QuestionPack(ColumnarQuestions):
+    """
+    Zero-copy reader for a compiled question pack.
+
+    The pack is memory-mapped and every section is exposed as a ``memoryview``
+    cast to 32-bit words; strings are only decoded when a field is read.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Args:
+            filename (str): The path to the compiled pack.
+
+        Raises:
+            OSError: If the file cannot be opened or mapped.
+            ValueError: If the file is not a supported question pack.
+        """
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"'{filename}' is empty")
+        self._view = memoryview(self._mm)
+        try:
+            fields = _HEADER.unpack_from(self._view)
+        except struct.error:
+            self.close()
+            raise ValueError(f"'{filename}' is truncated")
+        (magic, version, _flags, self._count, category_count, option_count, ref_count, index_count,
+         self.source_size, self.source_mtime_ns, records_off, options_off, refs_off, index_off,
+         index_ids_off, pool_off, self._extras_off, self._extras_len) = fields
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"'{filename}' is not a version {PACK_VERSION} question pack")
+
+        view = self._view
+        self._records = view[records_off:records_off + self._count * _RECORD.size].cast('I')
+        self._record_ints = self._records.cast('B').cast('i')
+        self._record_bytes = self._records.cast('B').cast('b')
+        self._option_refs_table = view[options_off:options_off + option_count * 8].cast('I')
+        self._refs = view[refs_off:refs_off + ref_count * 4].cast('I')
+        self._index = view[index_off:index_off + index_count * _INDEX_ENTRY.size].cast('I')
+        self._index_ids = view[index_ids_off:index_ids_off + self._count * 4].cast('I')
+        self._pool = view[pool_off:]
+        self._extras_cache: Optional[Dict[str, Any]] = None
+
+        category_refs = view[_HEADER_SIZE:_HEADER_SIZE + category_count * 8].cast('I')
+        self.category_table = [self._string(category_refs[2 * i], category_refs[2 * i + 1])
+                               for i in range(category_count)]
+        category_refs.release()
+
+    @classmethod
+    def open(cls, filename: str, source: Optional[str] = None) -> Optional["QuestionPack"]:
+        """
+        Opens a pack if it exists, is valid, and is not stale.
+
+        Args:
+            filename (str): The path to the compiled pack.
+            source (Optional[str]): The JSON file the pack was compiled from. If it
+                                    exists and its size or mtime differ from the
+                                    ones recorded in the pack, the pack is stale.
+
+        Returns:
+            Optional[QuestionPack]: The opened pack, or None if it should not be used.
+        """
+        if not os.path.exists(filename):
+            return None
+        try:
+            pack = cls(filename)
+        except (OSError, ValueError) as e:
+            print(f"Error reading question pack '{filename}': {e}")
+            return None
+        if source and os.path.exists(source):
+            stat = os.stat(source)
+            if stat.st_size != pack.source_size or stat.st_mtime_ns != pack.source_mtime_ns:
+                print(f"Info: Question pack '{filename}' is stale. Loading '{source}' instead.")
+                pack.close()
+                return None
+        return pack
+
+    def _string(self, offset: int, length: int) -> str:
+        return str(self._pool[offset:offset + length], 'utf-8')
+
+    def __len__(self) -> int:
+        return self._count
+
+    def question_text(self, qid: int) -> Optional[str]:
+        word = qid * _RECORD_WORDS
+        offset = self._records[word]
+        return None if offset == NO_STRING else self._string(offset, self._records[word + 1])
+
+    def category_id(self, qid: int) -> int:
+        return self._record_ints[qid * _RECORD_WORDS + 3]
+
+    def category(self, qid: int) -> Optional[str]:
+        cid = self._record_ints[qid * _RECORD_WORDS + 3]
+        return self.category_table[cid] if cid >= 0 else None
+
+    def options(self, qid: int) -> List[str]:
+        start = self._records[qid * _RECORD_WORDS + 2]
+        count = self._record_bytes[qid * _RECORD.size + 16] & 0xFF
+        table, refs = self._option_refs_table, self._refs
+        return [self._string(table[2 * ref], table[2 * ref + 1]) for ref in refs[start:start + count]]
+
+    def correct_index(self, qid: int) -> int:
+        return self._record_bytes[qid * _RECORD.size + 17]
+
+    def _extras_blob(self) -> Dict[str, Any]:
+        if self._extras_cache is None:
+            if self._extras_len:
+                raw = self._view[self._extras_off:self._extras_off + self._extras_len]
+                self._extras_cache = json.loads(str(raw, 'utf-8'))
+                self._extras_cache["no_options"] = set(self._extras_cache["no_options"])
+            else:
+                self._extras_cache = {"extras": {}, "no_options": set()}
+        return self._extras_cache
+
+    def extras(self, qid: int) -> Optional[Dict[str, Any]]:
+        if not self._extras_len:
+            return None
+        return self._extras_blob()["extras"].get(str(qid))
+
+    def has_options(self, qid: int) -> bool:
+        return not self._extras_len or qid not in self._extras_blob()["no_options"]
+
+    def category_index(self) -> Dict[str, Sequence[int]]:
+        """
+        Returns the precompiled category -> question ids index as zero-copy views.
+        """
+        index: Dict[str, Sequence[int]] = {}
+        entries = self._index
+        for i in range(0, len(entries), 4):
+            name = self._string(entries[i], entries[i + 1])
+            start, count = entries[i + 2], entries[i + 3]
+            index[name] = self._index_ids[start:start + count]
+        return index
+
+    def close(self) -> None:
+        """
+        Releases all views and unmaps the pack.
+        """
+        for name in ('_records', '_record_ints', '_record_bytes', '_option_refs_table',
+                     '_refs', '_index', '_index_ids', '_pool', '_view'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # Views handed out by category_index() are still alive; the mapping is
+            # released together with the last of them.
+            pass
+        self._file.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile question banks into binary question packs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compile_parser = subparsers.add_parser("compile", help="compile JSON question banks")
+    compile_parser.add_argument("sources", nargs="+", help="questions JSON files to compile")
+    compile_parser.add_argument("-o", "--output", help="output path (only with a single source)")
+    args = parser.parse_args(argv)
+
+    if args.output and len(args.sources) > 1:
+        parser.error("--output can only be used with a single source")
+
+    failed = False
+    for source in args.sources:
+        written = compile_pack(source, args.output)
+        if written:
+            print(f"Compiled '{source}' -> '{written}'")
+        else:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
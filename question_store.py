@@ -0,0 +1,301 @@
+import hashlib
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+from data_manager import DataManager
+
+RECORD_KEYS = ("category", "question", "options", "correct_answer")
+# Category index entry of questions without a category
+UNCATEGORIZED = 'Uncategorized'
+
+
+def answer_index(letter: Any) -> int:
+    """
+    Converts an answer letter ('A', 'B', ...) to a zero-based option index.
+
+    Returns:
+        int: The option index, or -1 if the value is not a single letter A-Z.
+    """
+    if isinstance(letter, str) and len(letter) == 1 and 'A' <= letter <= 'Z':
+        return ord(letter) - ord('A')
+    return -1
+
+
+def answer_letter(index: int) -> str:
+    """
+    Converts a zero-based option index back to its answer letter.
+    """
+    return chr(ord('A') + index) if index >= 0 else ''
+
+
+def question_key(q: Any) -> str:
+    """
+    Returns a stable identifier for a question, derived from its text.
+
+    Question ids are positions in the bank and change when the file is edited;
+    state that outlives a session (e.g. review schedules) is keyed by this instead.
+    """
+    text = q.get('question') or ''
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class QuestionRecord:
+    """
+    A lightweight, read-only view of one question in a compact store.
+
+    Supports the dict-style access existing callers use (``q['question']``,
+    ``q.get('category', ...)``) without materialising a dict per question.
+    """
+
+    __slots__ = ("_store", "id")
+
+    def __init__(self, store: Any, qid: int) -> None:
+        self._store = store
+        self.id = qid
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._store.field(self.id, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._store.field(self.id, key)
+        return default if value is None else value
+
+    def __contains__(self, key: str) -> bool:
+        return self._store.field(self.id, key) is not None
+
+    def keys(self) -> List[str]:
+        return [key for key in self._store.field_names(self.id) if key in self]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    @property
+    def correct_index(self) -> int:
+        return self._store.correct_index(self.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Materialises the record as a plain dict, e.g. for saving back to JSON.
+        """
+        return {key: self[key] for key in self.keys()}
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, QuestionRecord):
+            return self._store is other._store and self.id == other.id
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self.id))
+
+    def __repr__(self) -> str:
+        return f"QuestionRecord({self.id}, {self.get('question', '')[:40]!r})"
+
+
+class ColumnarQuestions(ABC):
+    """
+    Base class for column-oriented question sources.
+
+    Subclasses provide the per-column accessors (``question_text``, ``category``,
+    ``options``, ``correct_index``) plus ``extras`` and ``has_options``; this class
+    maps them onto the JSON bank schema and hands out QuestionRecord views.
+    """
+
+    category_table: List[str]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __getitem__(self, qid: int) -> QuestionRecord:
+        count = len(self)
+        if qid < 0:
+            qid += count
+        if not 0 <= qid < count:
+            raise IndexError("question id out of range")
+        return QuestionRecord(self, qid)
+
+    def __iter__(self) -> Iterator[QuestionRecord]:
+        for qid in range(len(self)):
+            yield QuestionRecord(self, qid)
+
+    def extras(self, qid: int) -> Optional[Dict[str, Any]]:
+        return None
+
+    def has_options(self, qid: int) -> bool:
+        return True
+
+    def field_names(self, qid: int) -> List[str]:
+        extras = self.extras(qid)
+        return list(RECORD_KEYS) + ([key for key in extras if key not in RECORD_KEYS] if extras else [])
+
+    def field(self, qid: int, key: str) -> Any:
+        """
+        Returns one field of a question in the JSON bank schema, or None if absent.
+        """
+        extras = self.extras(qid)
+        if extras and key in extras:
+            return extras[key]
+        if key == 'question':
+            return self.question_text(qid)
+        if key == 'category':
+            return self.category(qid)
+        if key == 'options':
+            return self.options(qid) if self.has_options(qid) else None
+        if key == 'correct_answer':
+            index = self.correct_index(qid)
+            return answer_letter(index) if index >= 0 else None
+        return None
+
+    @abstractmethod
+    def question_text(self, qid: int) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def category(self, qid: int) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def options(self, qid: int) -> List[str]:
+        ...
+
+    @abstractmethod
+    def correct_index(self, qid: int) -> int:
+        ...
+
+
+class QuestionStore(ColumnarQuestions):
+    """
+    Column-oriented, memory-efficient storage for a question bank.
+
+    Instead of one dict and one option list per question, the store keeps:
+    - question texts in a single list,
+    - category ids in an ``array`` pointing into a table of interned category names,
+    - the correct answer as a small int (0 for 'A', 1 for 'B', ...),
+    - options as references into one shared, de-duplicated string table.
+    Fields outside the standard schema are kept per record in ``_extras``.
+    """
+
+    def __init__(self) -> None:
+        self._texts: List[Optional[str]] = []
+        self._category_ids = array('i')
+        self._correct = array('b')
+        self._option_offsets = array('I', [0])
+        self._option_refs = array('I')
+        self._option_table: List[str] = []
+        self._option_lookup: Dict[str, int] = {}
+        self.category_table: List[str] = []
+        self._category_lookup: Dict[str, int] = {}
+        self._extras: Dict[int, Dict[str, Any]] = {}
+        self._no_options: Set[int] = set()
+
+    @classmethod
+    def from_questions(cls, questions: Sequence[Dict[str, Any]]) -> "QuestionStore":
+        """
+        Builds a store from a list of question dicts.
+        """
+        store = cls()
+        for q in questions:
+            store.append(q)
+        return store
+
+    @classmethod
+    def from_file(cls, filename: str) -> "QuestionStore":
+        """
+        Loads a questions JSON file into a compact store.
+
+        Args:
+            filename (str): The path to the questions JSON file.
+
+        Returns:
+            QuestionStore: The store (empty if the file is missing or corrupt).
+        """
+        return cls.from_questions(DataManager.load_json(filename, default=[]) or [])
+
+    def _category_id(self, category: str) -> int:
+        cid = self._category_lookup.get(category)
+        if cid is None:
+            cid = len(self.category_table)
+            self.category_table.append(sys.intern(category))
+            self._category_lookup[category] = cid
+        return cid
+
+    def _option_id(self, option: str) -> int:
+        oid = self._option_lookup.get(option)
+        if oid is None:
+            oid = len(self._option_table)
+            self._option_table.append(option)
+            self._option_lookup[option] = oid
+        return oid
+
+    def append(self, q: Dict[str, Any]) -> int:
+        """
+        Adds a question to the store.
+
+        Args:
+            q (Dict[str, Any]): The question in the JSON bank schema.
+
+        Returns:
+            int: The id of the new question.
+        """
+        qid = len(self._texts)
+        extras = {key: value for key, value in q.items() if key not in RECORD_KEYS}
+
+        category = q.get('category')
+        if isinstance(category, str):
+            self._category_ids.append(self._category_id(category))
+        else:
+            self._category_ids.append(-1)
+            if category is not None:
+                extras['category'] = category
+
+        self._texts.append(q.get('question'))
+
+        options = q.get('options')
+        if isinstance(options, list) and all(isinstance(o, str) for o in options):
+            self._option_refs.extend(self._option_id(o) for o in options)
+        elif options is not None:
+            extras['options'] = options
+        else:
+            self._no_options.add(qid)
+        self._option_offsets.append(len(self._option_refs))
+
+        correct = q.get('correct_answer')
+        index = answer_index(correct)
+        self._correct.append(index)
+        if index < 0 and correct is not None:
+            extras['correct_answer'] = correct
+
+        if extras:
+            self._extras[qid] = extras
+        return qid
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def category(self, qid: int) -> Optional[str]:
+        cid = self._category_ids[qid]
+        return self.category_table[cid] if cid >= 0 else None
+
+    def category_id(self, qid: int) -> int:
+        return self._category_ids[qid]
+
+    def question_text(self, qid: int) -> Optional[str]:
+        return self._texts[qid]
+
+    def options(self, qid: int) -> List[str]:
+        table = self._option_table
+        refs = self._option_refs[self._option_offsets[qid]:self._option_offsets[qid + 1]]
+        return [table[ref] for ref in refs]
+
+    def correct_index(self, qid: int) -> int:
+        return self._correct[qid]
+
+    def extras(self, qid: int) -> Optional[Dict[str, Any]]:
+        return self._extras.get(qid)
+
+    def has_options(self, qid: int) -> bool:
+        return qid not in self._no_options
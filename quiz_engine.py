@@ -0,0 +1,216 @@
+import argparse
+import csv
+import sys
+from operator import eq
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+from question_bank import QuestionBank
+from question_store import answer_index, question_key
+
+try:
+    import numpy as np
+except ImportError:  # Optional: batch grading falls back to pure Python.
+    np = None
+
+# Byte used for "no answer" in encoded answer sheets; never matches a key.
+UNANSWERED = ord('-')
+
+
+class AnswerResult(NamedTuple):
+    question_id: int
+    answer: str
+    correct_answer: str
+    is_correct: bool
+    category: str
+
+
+class BatchResult(NamedTuple):
+    scores: List[int]
+    question_correct: List[int]
+    question_count: int
+
+
+class QuizEngine:
+    """
+    Headless quiz logic shared by the terminal and GUI front-ends.
+
+    ``submit(question_id, answer)`` and ``grade_batch`` are pure graders and can
+    be used offline without any front-end. ``record`` takes a graded answer into
+    the analytics store, the review scheduler, the attempt history and the
+    session counts.
+    """
+
+    def __init__(self, bank: QuestionBank, analytics: Optional[Any] = None,
+                 scheduler: Optional[Any] = None, history: Optional[Any] = None,
+                 sampler: Optional[Any] = None) -> None:
+        """
+        Args:
+            bank (QuestionBank): The question bank answers refer to.
+            analytics (Optional[Any]): Analytics backend (AnalyticsLog / SQLiteAnalyticsStore).
+            scheduler (Optional[Any]): A ReviewScheduler to update after each answer.
+            history (Optional[Any]): An AttemptHistory to append each attempt to.
+            sampler (Optional[Any]): A WeakAreaSampler whose weights follow each answer.
+        """
+        self.bank = bank
+        self.analytics = analytics
+        self.scheduler = scheduler
+        self.history = history
+        self.sampler = sampler
+        self.session: Dict[str, Any] = {"correct": 0, "total": 0}
+        self._answer_key: Optional[bytes] = None
+
+    @property
+    def answer_key(self) -> bytes:
+        """
+        The correct answer letter of every question as one bytes object, indexed by
+        question id (built on first use).
+        """
+        if self._answer_key is None:
+            questions = self.bank.questions
+            correct_index = getattr(questions, 'correct_index', None)
+            key = bytearray(len(questions))
+            for qid in range(len(questions)):
+                index = correct_index(qid) if correct_index else answer_index(questions[qid].get('correct_answer'))
+                key[qid] = ord('A') + index if index >= 0 else 0
+            self._answer_key = bytes(key)
+        return self._answer_key
+
+    def bank_changed(self) -> None:
+        """
+        Drops the cached answer key after questions were added or changed.
+        """
+        self._answer_key = None
+
+    def submit(self, question_id: int, answer: str) -> AnswerResult:
+        """
+        Grades an answer without recording it.
+
+        Args:
+            question_id (int): The answered question id.
+            answer (str): The chosen option letter.
+
+        Returns:
+            AnswerResult: The outcome, including the correct letter and category.
+        """
+        q = self.bank[question_id]
+        correct_answer = q.get('correct_answer', '')
+        answer = answer.strip().upper()
+        return AnswerResult(question_id, answer, correct_answer,
+                            answer == correct_answer, q.get('category', 'General'))
+
+    def record(self, result: AnswerResult, response_ms: int = 0, timestamp: Optional[float] = None) -> None:
+        """
+        Records a graded answer in analytics, the scheduler, the attempt history,
+        the weak-area sampler and the session.
+
+        Args:
+            result (AnswerResult): The answer, as graded by ``submit``.
+            response_ms (int): Time the user took to answer, in milliseconds (0 if unknown).
+            timestamp (Optional[float]): Unix time of the answer, for answers recorded
+                                         after the fact. Defaults to now.
+        """
+        question_id = result.question_id
+        key = question_key(self.bank[question_id])
+        if self.analytics is not None:
+            self.analytics.record_answer(result.category, result.is_correct, key)
+        if self.history is not None:
+            self.history.record(key, result.category, answer_index(result.answer),
+                                result.is_correct, response_ms, timestamp)
+        if self.scheduler is not None:
+            self.scheduler.record(question_id, result.is_correct, timestamp)
+        if self.sampler is not None:
+            self.sampler.record(question_id, result.is_correct)
+
+        self.session["total"] += 1
+        if result.is_correct:
+            self.session["correct"] += 1
+
+    def grade_batch(self, answers: Sequence[str], question_ids: Optional[Sequence[int]] = None) -> BatchResult:
+        """
+        Grades many answer sheets at once against the precomputed answer key.
+
+        Each sheet is a string of option letters, one per question in
+        ``question_ids`` ("-" or any other non-matching character for no answer).
+        With NumPy installed all sheets are compared as one uint8 matrix;
+        otherwise each sheet is compared bytewise in C via ``map``.
+
+        Args:
+            answers (Sequence[str]): The answer sheets.
+            question_ids (Optional[Sequence[int]]): The question asked at each
+                position. Defaults to every question in bank order.
+
+        Returns:
+            BatchResult: Per-sheet scores and per-question correct counts.
+        """
+        key = self.answer_key
+        if question_ids is not None:
+            key = bytes(key[qid] for qid in question_ids)
+        width = len(key)
+        sheets = [sheet.upper().encode('ascii', 'replace')[:width].ljust(width, bytes([UNANSWERED]))
+                  for sheet in answers]
+
+        if np is not None and sheets:
+            matrix = np.frombuffer(b''.join(sheets), dtype=np.uint8).reshape(len(sheets), width)
+            hits = matrix == np.frombuffer(key, dtype=np.uint8)
+            return BatchResult(hits.sum(axis=1).tolist(), hits.sum(axis=0).tolist(), width)
+
+        scores = [sum(map(eq, sheet, key)) for sheet in sheets]
+        question_correct = [0] * width
+        for position, column in enumerate(zip(*sheets)):
+            question_correct[position] = bytes(column).count(key[position])
+        return BatchResult(scores, question_correct, width)
+
+
+def question_id_list(value: str) -> List[int]:
+    """argparse type for a comma-separated list of question ids."""
+    try:
+        ids = [int(qid) for qid in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated question ids, not {value}")
+    negative = [qid for qid in ids if qid < 0]
+    if negative:
+        raise argparse.ArgumentTypeError(f"question ids cannot be negative: {negative[0]}")
+    return ids
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Grade exported answer sheets offline.")
+    parser.add_argument("answers", help="CSV file with rows of: sheet id, answer letters")
+    parser.add_argument("--questions", default="questions.json", help="question bank the sheets refer to")
+    parser.add_argument("--ids", type=question_id_list, default=None,
+                        help="comma-separated question ids asked, in sheet order (default: whole bank)")
+    parser.add_argument("-o", "--output", default=None, help="write scores as CSV here instead of stdout")
+    args = parser.parse_args(argv)
+
+    bank = QuestionBank.from_file(args.questions)
+    if not len(bank):
+        print("No questions data available.")
+        return 1
+    question_ids = args.ids
+    unknown = [qid for qid in question_ids or () if qid >= len(bank)]
+    if unknown:
+        parser.error(f"argument --ids: no question {unknown[0]} in '{args.questions}' "
+                     f"({len(bank)} questions, ids 0-{len(bank) - 1})")
+
+    try:
+        with open(args.answers, newline='') as f:
+            rows = [row for row in csv.reader(f) if row]
+    except IOError as e:
+        print(f"Error reading file '{args.answers}': {e}")
+        return 1
+
+    result = QuizEngine(bank).grade_batch([row[1] if len(row) > 1 else '' for row in rows], question_ids)
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(out)
+        writer.writerow(["sheet", "score", "total", "percent"])
+        for row, score in zip(rows, result.scores):
+            writer.writerow([row[0], score, result.question_count,
+                             f"{score / result.question_count * 100:.1f}" if result.question_count else "0.0"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
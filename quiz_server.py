@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import signal
+import sys
+from http import HTTPStatus
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+import instrumentation
+from persistence import PersistenceWorker
+from question_bank import ALL_CATEGORIES, QuestionBank
+from question_store import answer_index
+from quiz_engine import QuizEngine
+from sqlite_store import SQLiteAnalyticsStore, is_sqlite_path
+
+QUESTIONS_FILE = 'questions.json'
+SERVER_ANALYTICS = 'server_analytics.db'
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+# Buffered answers per user that trigger a write, and the longest any answer waits (s)
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+# Request limits
+MAX_HEADER_LINES = 100
+MAX_BODY_BYTES = 64 * 1024
+IDLE_TIMEOUT = 30.0
+_USER_NAME = re.compile(r'^[A-Za-z0-9_.@-]{1,64}$')
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Learner:
+    """
+    One learner's state: their analytics store, a QuizEngine recording into it,
+    the question they were given and have not answered yet (the only one they
+    can answer) and the last question they were given.
+    """
+
+    def __init__(self, name: str, bank: QuestionBank, store: Any) -> None:
+        self.name = name
+        self.store = store
+        self.engine = QuizEngine(bank, store)
+        self.current_qid: Optional[int] = None
+        self.last_qid: Optional[int] = None
+        self.dirty = False
+
+
+class QuizServer:
+    """
+    Serves one question bank to many learners over HTTP/JSON with asyncio.
+
+    Endpoints (all responses are JSON):
+
+    * ``GET /question?user=NAME[&category=CAT]`` - draws a question (without its answer).
+    * ``POST /answer`` with ``{"user", "question_id", "answer"}`` - grades and records
+      the answer to the question last drawn by the user, once.
+    * ``GET /stats?user=NAME`` - lifetime and session statistics.
+    * ``GET /categories`` - the bank's categories with question counts.
+
+    Grading and analytics run in memory on the event loop, through the same
+    QuizEngine and SQLite analytics store as the front-ends. Each learner has a
+    store on the multi-user database; their answers are buffered and written in
+    batches by one PersistenceWorker thread, at the latest every
+    ``flush_interval`` seconds, so disk I/O never blocks a request.
+    """
+
+    def __init__(self, bank: QuestionBank, analytics_path: str = SERVER_ANALYTICS,
+                 flush_interval: float = FLUSH_INTERVAL, batch_size: int = BATCH_SIZE,
+                 rng: Any = random) -> None:
+        """
+        Args:
+            bank (QuestionBank): The questions to serve.
+            analytics_path (str): The multi-user SQLite analytics database.
+            flush_interval (float): Maximum seconds an answer stays buffered in memory.
+            batch_size (int): Buffered answers per learner that trigger a write.
+            rng (Any): Random source for drawing questions.
+        """
+        self.bank = bank
+        self.analytics_path = analytics_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.rng = rng
+        self.writer = PersistenceWorker()
+        self.learners: Dict[str, Learner] = {}
+        self.counters = {"requests": 0, "answers": 0, "errors": 0, "flushes": 0}
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._handlers: Set[asyncio.Task] = set()
+        self._routes = {
+            ("GET", "/question"): self.next_question,
+            ("POST", "/answer"): self.submit_answer,
+            ("GET", "/stats"): self.stats,
+            ("GET", "/categories"): self.categories,
+        }
+
+    # Learners
+
+    def learner(self, name: Any) -> Learner:
+        if not isinstance(name, str) or not _USER_NAME.match(name):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'user' must be 1-64 letters, digits or _.@-")
+        learner = self.learners.get(name)
+        if learner is None:
+            store = SQLiteAnalyticsStore(self.analytics_path, user=name, batch_size=self.batch_size,
+                                         writer=self.writer)
+            store.load()
+            learner = self.learners[name] = Learner(name, self.bank, store)
+        return learner
+
+    def flush(self) -> int:
+        """
+        Hands every learner's buffered answers to the writer thread.
+
+        Returns:
+            int: The number of learners flushed.
+        """
+        flushed = 0
+        for learner in self.learners.values():
+            if learner.dirty:
+                learner.store.sync()
+                learner.dirty = False
+                flushed += 1
+        if flushed:
+            self.counters["flushes"] += 1
+        return flushed
+
+    async def flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def close(self) -> None:
+        """
+        Writes everything buffered and stops the writer thread.
+        """
+        for learner in self.learners.values():
+            learner.store.close()
+        self.writer.close()
+
+    # Endpoints
+
+    def next_question(self, query: Dict[str, str], body: Any) -> Dict[str, Any]:
+        learner = self.learner(query.get("user"))
+        category = query.get("category") or ALL_CATEGORIES
+        if category != ALL_CATEGORIES:
+            category = self.bank.resolve_category(category)
+            if category is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown category: {query.get('category')}")
+        ids = self.bank.question_ids(category)
+        if not ids:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "No questions available.")
+        i = self.rng.randrange(len(ids))
+        if ids[i] == learner.last_qid and len(ids) > 1:
+            i = (i + 1 + self.rng.randrange(len(ids) - 1)) % len(ids)
+        qid = learner.current_qid = learner.last_qid = ids[i]
+        q = self.bank[qid]
+        return {"question_id": qid, "category": q.get("category", "General"),
+                "question": q.get("question", ""), "options": list(q.get("options", []))}
+
+    def submit_answer(self, query: Dict[str, str], body: Any) -> Dict[str, Any]:
+        if not isinstance(body, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Expected a JSON object body.")
+        learner = self.learner(body.get("user"))
+        qid = body.get("question_id")
+        if isinstance(qid, bool) or not isinstance(qid, int) or not 0 <= qid < len(self.bank):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'question_id' must be a question id.")
+        if qid != learner.current_qid:
+            raise HTTPError(HTTPStatus.CONFLICT, "'question_id' is not the question you were given, "
+                                                 "or it was already answered.")
+        answer = str(body.get("answer", "")).strip().upper()
+        options = self.bank[qid].get("options", [])
+        if not 0 <= answer_index(answer) < len(options):
+            raise HTTPError(HTTPStatus.BAD_REQUEST,
+                            f"'answer' must be one of the option letters A-{chr(ord('A') + len(options) - 1)}.")
+        learner.current_qid = None
+        result = learner.engine.submit(qid, answer)
+        learner.engine.record(result)
+        learner.dirty = True
+        self.counters["answers"] += 1
+        cat_stats = learner.store.data["performance"][result.category]
+        return {"correct": result.is_correct, "correct_answer": result.correct_answer,
+                "category": result.category, "streak": learner.store.data.get("streak", 0),
+                "category_correct": cat_stats["correct"], "category_total": cat_stats["total"]}
+
+    def stats(self, query: Dict[str, str], body: Any) -> Dict[str, Any]:
+        learner = self.learner(query.get("user"))
+        data = learner.store.data
+        performance = data.get("performance", {})
+        correct = sum(stats.get("correct", 0) for stats in performance.values())
+        total = sum(stats.get("total", 0) for stats in performance.values())
+        session = learner.engine.session
+        return {"user": learner.name, "streak": data.get("streak", 0),
+                "correct": correct, "total": total,
+                "accuracy": correct / total * 100 if total else 0.0,
+                "performance": performance,
+                "session": {"correct": session["correct"], "total": session["total"]}}
+
+    def categories(self, query: Dict[str, str], body: Any) -> Dict[str, Any]:
+        return {"categories": {cat: self.bank.count(cat) for cat in self.bank.categories}}
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, Dict[str, Any]]:
+        """
+        Routes one request to its endpoint.
+
+        Returns:
+            Tuple[HTTPStatus, Dict[str, Any]]: The status and JSON payload.
+        """
+        self.counters["requests"] += 1
+        url = urlsplit(target)
+        handler = self._routes.get((method, url.path))
+        try:
+            if handler is None:
+                if any(path == url.path for _method, path in self._routes):
+                    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {url.path}")
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"No endpoint {url.path}")
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                payload = json.loads(body) if body else None
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body is not valid JSON.")
+            with instrumentation.span(f"QuizServer{url.path}"):
+                return HTTPStatus.OK, handler(query, payload)
+        except HTTPError as e:
+            self.counters["errors"] += 1
+            return e.status, {"error": e.message}
+        except Exception as e:
+            # A failing handler (e.g. a database error) must not take the connection down
+            self.counters["errors"] += 1
+            print(f"Error handling {method} {url.path}: {e!r}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+
+    # HTTP
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves HTTP/1.1 requests on one connection, keeping it alive between requests.
+        """
+        self._connections.add(writer)
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line."}, False)
+                    break
+                method, target, version = parts
+                headers: Dict[str, str] = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _sep, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                else:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {"error": "Too many headers."}, False)
+                    break
+
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length."}, False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large."},
+                                        False)
+                    break
+                body = await reader.readexactly(length) if length > 0 else b''
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+
+                status, payload = self.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._handlers.discard(asyncio.current_task())
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: Dict[str, Any],
+                       keep_alive: bool) -> None:
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    ready: Optional[asyncio.Event] = None) -> None:
+        """
+        Serves until cancelled (or SIGINT / SIGTERM), then writes everything buffered.
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        flusher = asyncio.create_task(self.flush_periodically())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+        address = server.sockets[0].getsockname()
+        print(f"Serving {len(self.bank)} questions on http://{address[0]}:{address[1]} "
+              f"(analytics: {self.analytics_path})", flush=True)
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            flusher.cancel()
+            server.close()
+            # Closing the connections ends the idle handlers cleanly instead of
+            # leaving them to be cancelled mid-read when the loop shuts down.
+            for connection in list(self._connections):
+                connection.close()
+            if self._handlers:
+                await asyncio.wait(list(self._handlers), timeout=IDLE_TIMEOUT)
+            self.close()
+            print(f"Stopped after {self.counters['requests']} requests, {self.counters['answers']} answers "
+                  f"from {len(self.learners)} learners.", flush=True)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a question bank to many learners over HTTP/JSON.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--questions", default=QUESTIONS_FILE, help="question bank to serve")
+    parser.add_argument("--analytics", default=SERVER_ANALYTICS,
+                        help="multi-user analytics database (default: %(default)s)")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                        help="seconds answers may stay buffered in memory (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true", help="print per-endpoint latency percentiles on exit")
+    args = parser.parse_args(argv)
+    if args.profile:
+        instrumentation.enable(output=None)
+
+    if not is_sqlite_path(args.analytics):
+        print(f"Error: '{args.analytics}' is not a SQLite database (.db); the server stores many learners.")
+        return 1
+    bank = QuestionBank.from_file(args.questions)
+    if not len(bank):
+        print("No questions data available.")
+        return 1
+    server = QuizServer(bank, args.analytics, flush_interval=args.flush_interval)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
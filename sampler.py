@@ -0,0 +1,217 @@
+import random
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from question_bank import ALL_CATEGORIES, UNCATEGORIZED, QuestionBank
+from question_store import question_key
+
+# Weights never drop to zero, so mastered material still comes up occasionally.
+MIN_WEIGHT = 0.05
+
+
+def error_weight(wrong: int, total: int) -> float:
+    """
+    Smoothed error rate used as a sampling weight: 0.5 for unseen material,
+    tending to the observed error rate as attempts accumulate.
+    """
+    return max(MIN_WEIGHT, (wrong + 1) / (total + 2))
+
+
+class FenwickTree:
+    """
+    Binary indexed tree over non-negative float weights.
+
+    Changing one weight and drawing an index with probability proportional to
+    its weight are both O(log n).
+    """
+
+    def __init__(self, weights: Iterable[float]) -> None:
+        self._build(array('d', weights))
+
+    def _build(self, weights: array) -> None:
+        self.weights = weights
+        n = len(self.weights)
+        self._tree = array('d', [0.0]) * (n + 1)
+        self._tree[1:] = self.weights
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self._top = 1 << n.bit_length() >> 1 if n else 0
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def total(self) -> float:
+        total, i = 0.0, len(self.weights)
+        while i:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, index: int, weight: float) -> None:
+        """
+        Sets the weight at ``index``.
+        """
+        delta = weight - self.weights[index]
+        self.weights[index] = weight
+        n = len(self.weights)
+        i = index + 1
+        while i <= n:
+            self._tree[i] += delta
+            i += i & -i
+        self._updates += 1
+        if self._updates > 4 * n + 64:
+            # Repeated float deltas drift; rebuild from the exact weights now and then.
+            self._build(self.weights)
+
+    def find(self, target: float) -> int:
+        """
+        Returns the index whose cumulative weight range contains ``target``,
+        for ``0 <= target < total()``.
+        """
+        pos, step, n = 0, self._top, len(self.weights)
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            step >>= 1
+        # Rounding can land past the end or on a zero weight; step back to a live one.
+        pos = min(pos, n - 1)
+        while pos > 0 and self.weights[pos] <= 0.0:
+            pos -= 1
+        return pos
+
+    def sample(self, rng: Any = random) -> Optional[int]:
+        total = self.total()
+        if total <= 0.0:
+            return None
+        return self.find(rng.random() * total)
+
+
+class WeakAreaSampler:
+    """
+    Draws questions in proportion to how often they, and their category, are
+    answered wrongly.
+
+    Sampling is two-level: a Fenwick tree over categories, weighted by the
+    category's error rate times the total weight of its questions, and one
+    Fenwick tree per category over its questions' own error rates. Recording
+    an answer updates one leaf in each tree, O(log n), instead of rebuilding
+    the weights.
+    """
+
+    def __init__(self, bank: QuestionBank, performance: Optional[Dict[str, Dict[str, int]]] = None,
+                 history: Optional[Any] = None, rng: Any = random) -> None:
+        """
+        Args:
+            bank (QuestionBank): The question bank to draw from.
+            performance (Optional[Dict[str, Dict[str, int]]]): Per-category
+                ``{"correct", "total"}`` counters (analytics "performance").
+            history (Optional[Any]): An AttemptHistory supplying per-question counts.
+            rng (Any): Random source.
+        """
+        self.bank = bank
+        self._rng = rng
+        self._categories: List[str] = list(bank.categories)
+        self._category_index = {cat: i for i, cat in enumerate(self._categories)}
+        self._ids: Dict[str, Sequence[int]] = {}
+        self._position: Dict[int, int] = {}
+        self._question_counts: Dict[int, List[int]] = {}
+        self._category_counts: List[List[int]] = []
+        self._trees: List[FenwickTree] = []
+
+        performance = performance or {}
+        seed_history = history is not None and len(history) > 0
+        for cat in self._categories:
+            ids = bank.question_ids(cat)
+            self._ids[cat] = ids
+            weights = []
+            for position, qid in enumerate(ids):
+                self._position[qid] = position
+                wrong, total = 0, 0
+                if seed_history:
+                    correct, total = history.question_counts(question_key(bank[qid]))
+                    wrong = total - correct
+                    if total:
+                        self._question_counts[qid] = [wrong, total]
+                weights.append(error_weight(wrong, total))
+            self._trees.append(FenwickTree(weights))
+            stats = performance.get(cat, {})
+            total = stats.get("total", 0)
+            self._category_counts.append([total - stats.get("correct", 0), total])
+
+        self._top = FenwickTree(self._category_weight(i) for i in range(len(self._categories)))
+
+    def _category_weight(self, index: int) -> float:
+        wrong, total = self._category_counts[index]
+        return error_weight(wrong, total) * self._trees[index].total()
+
+    def _category_of(self, qid: int) -> Optional[int]:
+        category = self.bank[qid].get('category')
+        return self._category_index.get(UNCATEGORIZED if category is None else category)
+
+    def question_weight(self, qid: int) -> float:
+        index = self._category_of(qid)
+        return self._trees[index].weights[self._position[qid]] if index is not None else 0.0
+
+    def category_weight(self, category: str) -> float:
+        """
+        The category's error factor (not including its questions' weights).
+        """
+        index = self._category_index.get(category)
+        return error_weight(*self._category_counts[index]) if index is not None else 0.0
+
+    def sample(self, category: Optional[str] = None, exclude: Optional[int] = None) -> Optional[int]:
+        """
+        Draws a question id, weighted towards weak categories and questions.
+
+        Args:
+            category (Optional[str]): Restricts the draw to a category (None / "All" for any).
+            exclude (Optional[int]): A question id to avoid, e.g. the one just shown.
+                                     It is still returned if it is the only candidate.
+
+        Returns:
+            Optional[int]: The question id, or None if there is nothing to draw.
+        """
+        if category == ALL_CATEGORIES:
+            category = None
+        if category is not None and category not in self._category_index:
+            return None
+
+        held = None
+        if exclude is not None and exclude in self._position:
+            held = (self._category_of(exclude), self.question_weight(exclude))
+            if held[0] is not None:
+                self._set_weight(held[0], self._position[exclude], 0.0)
+        try:
+            if category is None:
+                index = self._top.sample(self._rng)
+            else:
+                index = self._category_index[category]
+            local = self._trees[index].sample(self._rng) if index is not None else None
+            qid = self._ids[self._categories[index]][local] if local is not None else None
+        finally:
+            if held is not None and held[0] is not None:
+                self._set_weight(held[0], self._position[exclude], held[1])
+        return exclude if qid is None and held is not None else qid
+
+    def _set_weight(self, index: int, position: int, weight: float) -> None:
+        self._trees[index].update(position, weight)
+        self._top.update(index, self._category_weight(index))
+
+    def record(self, qid: int, is_correct: bool) -> None:
+        """
+        Updates the question's and its category's weights after an answer. O(log n).
+        """
+        index = self._category_of(qid)
+        if index is None:
+            return
+        counts = self._question_counts.setdefault(qid, [0, 0])
+        counts[0] += not is_correct
+        counts[1] += 1
+        category_counts = self._category_counts[index]
+        category_counts[0] += not is_correct
+        category_counts[1] += 1
+        self._set_weight(index, self._position[qid], error_weight(*counts))
@@ -0,0 +1,244 @@
+import heapq
+import random
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+from data_manager import DataManager
+from question_bank import ALL_CATEGORIES, UNCATEGORIZED, BankChanges, QuestionBank
+from question_store import question_key
+
+DAY = 86400.0
+# A lapsed card is shown again after this many seconds (Leitner box 0).
+RELEARN_DELAY = 600.0
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# Answer quality on the SM-2 0-5 scale for a right / wrong multiple-choice answer.
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+
+class ReviewState:
+    """
+    SM-2 scheduling state of one question.
+    """
+
+    __slots__ = ("ease", "interval", "reps", "due", "lapses")
+
+    def __init__(self, ease: float = DEFAULT_EASE, interval: float = 0.0, reps: int = 0,
+                 due: float = 0.0, lapses: int = 0) -> None:
+        self.ease = ease
+        self.interval = interval
+        self.reps = reps
+        self.due = due
+        self.lapses = lapses
+
+    def to_list(self) -> List[float]:
+        return [round(self.ease, 4), self.interval, self.reps, self.due, self.lapses]
+
+
+class ReviewScheduler:
+    """
+    Spaced-repetition scheduler (SM-2 with a short relearning step for lapses).
+
+    Due times live in min-heaps of ``(due, tiebreak, qid)``: one over the whole bank
+    and one per category. Answering pushes a fresh entry; superseded entries are
+    skipped lazily when they reach the top, so picking the next due question is
+    O(log n) amortised and recording an answer is O(1) plus one heap push per heap.
+    Questions that were never reviewed are due immediately, in random order.
+    """
+
+    def __init__(self, bank: QuestionBank, filename: Optional[str] = None, rng: Any = random,
+                 writer: Optional[Any] = None) -> None:
+        """
+        Args:
+            bank (QuestionBank): The question bank to schedule.
+            filename (Optional[str]): The JSON file scheduler state is persisted to.
+            rng (Any): Random source used to order unseen questions.
+            writer (Optional[Any]): A PersistenceWorker to save through. Defaults to
+                                    writing on the calling thread.
+        """
+        self.bank = bank
+        self.filename = filename
+        self.writer = writer
+        self.states: Dict[int, ReviewState] = {}
+        self._rng = rng
+        self._heaps: Dict[Optional[str], List[Tuple[float, float, int]]] = {}
+        # Ids removed from the bank by a reload; their heap entries are skipped
+        self._retired: Set[int] = set()
+        self._stale = 0
+        self._dirty = False
+        if filename:
+            self._load(filename)
+        self._build_heaps()
+
+    def _load(self, filename: str) -> None:
+        data = DataManager.load_json(filename, default=None)
+        if not data:
+            return
+        items = data.get("items", {})
+        if not items:
+            return
+        # Each state is saved with the id it had; only those records are decoded
+        unresolved = {}
+        for key, saved in items.items():
+            qid = saved[5] if len(saved) > 5 else -1
+            if 0 <= qid < len(self.bank) and question_key(self.bank[qid]) == key:
+                self.states[qid] = ReviewState(*saved[:5])
+            else:
+                unresolved[key] = saved
+        if not unresolved:
+            return
+        # Files from before ids were saved, or a bank edited since: look the rest up
+        for qid in range(len(self.bank)):
+            if qid in self.states:
+                continue
+            saved = unresolved.pop(question_key(self.bank[qid]), None)
+            if saved:
+                self.states[qid] = ReviewState(*saved[:5])
+                if not unresolved:
+                    return
+
+    def _due(self, qid: int) -> float:
+        state = self.states.get(qid)
+        return state.due if state else 0.0
+
+    def _build_heaps(self) -> None:
+        """
+        Builds the global and per-category heaps in O(n).
+        """
+        rand = self._rng.random
+        heap = [(self._due(qid), rand(), qid) for qid in self.bank.question_ids()]
+        heapq.heapify(heap)
+        self._heaps = {None: heap}
+        for category in self.bank.categories:
+            cat_heap = [(self._due(qid), rand(), qid) for qid in self.bank.question_ids(category)]
+            heapq.heapify(cat_heap)
+            self._heaps[category] = cat_heap
+        self._stale = 0
+
+    def _heap_for(self, category: Optional[str]) -> List[Tuple[float, float, int]]:
+        if category == ALL_CATEGORIES:
+            category = None
+        return self._heaps.get(category, [])
+
+    def _is_current(self, entry: Tuple[float, float, int]) -> bool:
+        return entry[0] == self._due(entry[2]) and entry[2] not in self._retired
+
+    def apply_changes(self, changes: BankChanges) -> None:
+        """
+        Follows a bank reload: new questions are pushed as due now, removed ones
+        retired, and only the heaps of categories that gained or lost questions
+        are rebuilt. Review states of removed questions are kept for saving.
+        """
+        rand = self._rng.random
+        for qid, _old in changes.removed:
+            self._retired.add(qid)
+        for qid in changes.added:
+            heapq.heappush(self._heaps.setdefault(None, []), (self._due(qid), rand(), qid))
+        for category in changes.categories_removed:
+            self._heaps.pop(category, None)
+        for category in changes.touched:
+            if category in changes.categories_removed:
+                continue
+            cat_heap = [(self._due(qid), rand(), qid) for qid in self.bank.question_ids(category)]
+            heapq.heapify(cat_heap)
+            self._heaps[category] = cat_heap
+
+    def next_due(self, category: Optional[str] = None, exclude: Optional[int] = None) -> Optional[int]:
+        """
+        Returns the question that is due soonest, without removing it.
+
+        Args:
+            category (Optional[str]): Restricts the pick to a category (None / "All" for any).
+            exclude (Optional[int]): A question id to skip, e.g. the one just shown.
+
+        Returns:
+            Optional[int]: The question id, or None if the category is empty.
+        """
+        heap = self._heap_for(category)
+        held = None
+        while heap:
+            entry = heap[0]
+            if not self._is_current(entry):
+                heapq.heappop(heap)
+                self._stale -= 1
+                continue
+            if entry[2] == exclude and held is None:
+                held = heapq.heappop(heap)
+                continue
+            break
+        qid = heap[0][2] if heap else None
+        if held is not None:
+            heapq.heappush(heap, held)
+            if qid is None:
+                qid = held[2]
+        return qid
+
+    def due_count(self, category: Optional[str] = None, now: Optional[float] = None) -> int:
+        """
+        Counts questions that are due now. This is a linear scan, meant for reports.
+        """
+        now = time.time() if now is None else now
+        return sum(1 for qid in self.bank.question_ids(category) if self._due(qid) <= now)
+
+    def record(self, qid: int, is_correct: bool, now: Optional[float] = None) -> ReviewState:
+        """
+        Updates a question's schedule after an answer.
+
+        Args:
+            qid (int): The answered question id.
+            is_correct (bool): Whether the answer was correct.
+            now (Optional[float]): The answer time as a Unix timestamp. Defaults to now.
+
+        Returns:
+            ReviewState: The question's updated state.
+        """
+        now = time.time() if now is None else now
+        state = self.states.get(qid)
+        if state is None:
+            state = self.states[qid] = ReviewState()
+
+        quality = QUALITY_CORRECT if is_correct else QUALITY_WRONG
+        if quality >= 3:
+            state.reps += 1
+            if state.reps == 1:
+                state.interval = 1.0
+            elif state.reps == 2:
+                state.interval = 6.0
+            else:
+                state.interval = round(state.interval * state.ease, 2)
+            state.due = now + state.interval * DAY
+        else:
+            state.reps = 0
+            state.interval = 0.0
+            state.lapses += 1
+            state.due = now + RELEARN_DELAY
+        state.ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+
+        entry = (state.due, self._rng.random(), qid)
+        heapq.heappush(self._heaps[None], entry)
+        category = self.bank[qid].get('category')
+        category_heap = self._heaps.get(UNCATEGORIZED if category is None else category)
+        if category_heap is not None:
+            heapq.heappush(category_heap, entry)
+        self._stale += 2
+        self._dirty = True
+
+        # Superseded entries are dropped lazily; rebuild if they start to dominate.
+        if self._stale > 2 * len(self.bank) + 64:
+            self._build_heaps()
+        return state
+
+    def save(self) -> None:
+        """
+        Persists the state of every reviewed question, keyed by question_key,
+        with its question id so loading does not have to look the key up.
+        """
+        if not self.filename or not self._dirty:
+            return
+        items = {question_key(self.bank[qid]): state.to_list() + [qid] for qid, state in self.states.items()}
+        data = {"version": 1, "items": items}
+        if self.writer is not None:
+            self.writer.save_json(self.filename, data, indent=None)
+            self._dirty = False
+        elif DataManager.save_json_atomic(self.filename, data, indent=None):
+            self._dirty = False
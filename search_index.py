@@ -0,0 +1,497 @@
+import bisect
+import heapq
+import math
+import os
+import re
+import struct
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SEARCH_MAGIC = b'QSRX'
+SEARCH_VERSION = 1
+# magic, version, source mtime_ns, source size, documents, terms, postings, vocabulary bytes
+_SEARCH_HEADER = struct.Struct('<4sIqQIIQQ')
+SEARCH_EXTENSION = '.sidx'
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Vocabulary terms a prefix may expand to.
+MAX_PREFIX_TERMS = 64
+# Terms whose score-ordered postings are kept between queries.
+MAX_CACHED_TERMS = 256
+_WORD = re.compile(r'[a-z0-9]+')
+# Words that appear in nearly every question carry no signal and only slow queries down.
+STOPWORDS = frozenset("""
+    a an and are as at be by can do does for from how in is it its of on or should that the
+    this to what when which will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased alphanumeric words of at least two characters, without stopwords.
+    """
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def document_text(q: Any) -> str:
+    """
+    The searchable text of a question: its text and its options.
+    """
+    options = q.get('options') or []
+    return ' '.join([q.get('question') or ''] + [option for option in options if isinstance(option, str)])
+
+
+def search_path_for(filename: str) -> str:
+    return f"{filename}{SEARCH_EXTENSION}"
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over question text and options with BM25 ranking.
+
+    Each term maps to parallel arrays of question ids and term frequencies,
+    kept in descending score order so a top-k query reads only the head of
+    each list. The last word of a query also matches as a prefix ("glac" finds
+    "glacier"), through a binary search over the sorted vocabulary. The index
+    is built once per bank and cached in a ``<bank>.sidx`` sidecar keyed by the
+    bank file's mtime and size; add / remove / update keep it current when
+    questions change without a rebuild.
+    """
+
+    def __init__(self) -> None:
+        self._term_ids: Dict[str, int] = {}
+        self._vocab: List[str] = []
+        self._docs: List[array] = []
+        self._tfs: List[array] = []
+        self._lengths = array('I')
+        self._live = 0
+        self._total_length = 0
+        self._sorted_vocab: Optional[List[str]] = None
+        self._norms: Optional[array] = None
+        # Per-term BM25 scores (without idf) matching the postings order, once ranked
+        self._impacts: Optional[List[array]] = None
+        self._ranked_cache: Dict[int, Tuple[array, array]] = {}
+        self._impact_cache: Dict[int, Dict[int, float]] = {}
+
+    def __len__(self) -> int:
+        return self._live
+
+    @classmethod
+    def build(cls, questions: Iterable[Any]) -> "SearchIndex":
+        """
+        Indexes every question; a question's id is its position.
+        """
+        index = cls()
+        for qid, q in enumerate(questions):
+            index.add(qid, q)
+        return index
+
+    @classmethod
+    def for_bank(cls, bank: Any, filename: Optional[str] = None) -> "SearchIndex":
+        """
+        Loads the sidecar index of a bank file if it is current, otherwise builds
+        the index from the bank and saves the sidecar.
+
+        Args:
+            bank (Any): The QuestionBank (or sequence of questions) to index.
+            filename (Optional[str]): The bank's JSON file. None skips the sidecar.
+
+        Returns:
+            SearchIndex: The index.
+        """
+        if getattr(bank, 'edited', False):
+            # Ids of a reloaded bank no longer match positions in its file
+            filename = None
+        if filename:
+            index = cls.load(search_path_for(filename), filename)
+            if index is not None and len(index._lengths) == len(bank):
+                return index
+        question_ids = bank.question_ids() if hasattr(bank, 'question_ids') else range(len(bank))
+        index = cls()
+        for qid in question_ids:
+            index.add(qid, bank[qid])
+        if filename:
+            index.save(search_path_for(filename), filename)
+        return index
+
+    # Updates
+
+    def add(self, qid: int, q: Any) -> None:
+        """
+        Indexes a question under ``qid`` (which must not be indexed already).
+        """
+        counts: Dict[str, int] = {}
+        for token in tokenize(document_text(q)):
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            tid = self._term_ids.get(term)
+            if tid is None:
+                tid = self._term_ids[term] = len(self._vocab)
+                self._vocab.append(term)
+                self._docs.append(array('I'))
+                self._tfs.append(array('H'))
+                self._sorted_vocab = None
+            self._docs[tid].append(qid)
+            self._tfs[tid].append(min(tf, 0xFFFF))
+        if qid >= len(self._lengths):
+            self._lengths.extend([0] * (qid + 1 - len(self._lengths)))
+        length = sum(counts.values())
+        self._lengths[qid] = length
+        self._total_length += length
+        self._live += 1
+        self._changed()
+
+    def remove(self, qid: int, q: Any) -> None:
+        """
+        Removes a question, given the record it was indexed with (None if it is
+        not known any more: every posting list is searched then).
+        """
+        if qid >= len(self._lengths):
+            return
+        if q is None:
+            tids = range(len(self._docs))
+        else:
+            tids = [self._term_ids.get(term) for term in set(tokenize(document_text(q)))]
+        for tid in tids:
+            if tid is None:
+                continue
+            docs = self._docs[tid]
+            try:
+                position = docs.index(qid)
+            except ValueError:
+                continue
+            del docs[position]
+            del self._tfs[tid][position]
+        self._total_length -= self._lengths[qid]
+        self._lengths[qid] = 0
+        self._live -= 1
+        self._changed()
+
+    def _changed(self) -> None:
+        # Length normalisation and cached score orders depend on every document.
+        self._norms = None
+        self._impacts = None
+        self._ranked_cache.clear()
+        self._impact_cache.clear()
+
+    def update(self, qid: int, old: Any, new: Any) -> None:
+        """
+        Re-indexes a question whose text or options changed.
+        """
+        self.remove(qid, old)
+        self.add(qid, new)
+
+    # Queries
+
+    def _expand(self, prefix: str) -> List[str]:
+        if self._sorted_vocab is None:
+            self._sorted_vocab = sorted(self._vocab)
+        vocab = self._sorted_vocab
+        start = bisect.bisect_left(vocab, prefix)
+        end = bisect.bisect_left(vocab, prefix + '\uffff', start)
+        return vocab[start:min(end, start + MAX_PREFIX_TERMS)]
+
+    def _query_terms(self, query: str, prefix: bool) -> List[List[int]]:
+        # Term ids per query word (several for a prefix), skipping words with no postings.
+        tokens = tokenize(query)
+        groups = []
+        for position, token in enumerate(tokens):
+            if prefix and position == len(tokens) - 1:
+                terms = self._expand(token)
+            else:
+                terms = [token] if token in self._term_ids else []
+            tids = [tid for tid in map(self._term_ids.__getitem__, terms) if self._docs[tid]]
+            if tids:
+                groups.append(tids)
+        return groups
+
+    def _doc_norms(self) -> array:
+        # k1 * (1 - b + b * len / avg_len) per document, cached until the next change.
+        if self._norms is None:
+            avg = self._total_length / self._live if self._live else 1.0
+            self._norms = array('d', (K1 * (1 - B + B * length / avg) for length in self._lengths))
+        return self._norms
+
+    def _idf(self, tid: int) -> float:
+        df = len(self._docs[tid])
+        return math.log(1 + (self._live - df + 0.5) / (df + 0.5))
+
+    def _rank(self, tid: int) -> Tuple[array, array, array]:
+        norms = self._doc_norms()
+        docs, tfs = self._docs[tid], self._tfs[tid]
+        impacts = [(K1 + 1) * tf / (tf + norms[qid]) for qid, tf in zip(docs, tfs)]
+        order = sorted(range(len(docs)), key=lambda i: (-impacts[i], docs[i]))
+        return (array('I', [docs[i] for i in order]), array('H', [tfs[i] for i in order]),
+                array('d', [impacts[i] for i in order]))
+
+    def rank_postings(self) -> None:
+        """
+        Reorders every posting list by descending score, so top-k queries can
+        stop early without sorting at query time. Done before saving; adding or
+        removing a question invalidates the order until the next call.
+        """
+        if self._impacts is not None:
+            return
+        impacts = []
+        for tid in range(len(self._vocab)):
+            self._docs[tid], self._tfs[tid], ranked = self._rank(tid)
+            impacts.append(ranked)
+        self._impacts = impacts
+        self._ranked_cache.clear()
+
+    def _sort_vocabulary(self) -> None:
+        # Renumbers terms alphabetically, so a loaded index needs no sort for prefix lookups.
+        if self._sorted_vocab is self._vocab:
+            return
+        order = sorted(range(len(self._vocab)), key=self._vocab.__getitem__)
+        self._vocab = [self._vocab[tid] for tid in order]
+        self._docs = [self._docs[tid] for tid in order]
+        self._tfs = [self._tfs[tid] for tid in order]
+        if self._impacts is not None:
+            self._impacts = [self._impacts[tid] for tid in order]
+        self._term_ids = {term: tid for tid, term in enumerate(self._vocab)}
+        self._sorted_vocab = self._vocab
+        self._ranked_cache.clear()
+        self._impact_cache.clear()
+
+    def _ranked(self, tid: int) -> Tuple[array, array]:
+        """
+        A term's postings ordered by descending BM25 term score, without the idf
+        factor: the stored order when ranked, otherwise sorted on first use and
+        cached until the index changes.
+        """
+        if self._impacts is not None:
+            return self._docs[tid], self._impacts[tid]
+        ranked = self._ranked_cache.get(tid)
+        if ranked is None:
+            docs, _tfs, impacts = self._rank(tid)
+            ranked = (docs, impacts)
+            if len(self._ranked_cache) >= MAX_CACHED_TERMS:
+                self._ranked_cache.clear()
+            self._ranked_cache[tid] = ranked
+        return ranked
+
+    def _impact(self, tid: int) -> Dict[int, float]:
+        # Random access to a term's scores, used to complete a document's score.
+        impact = self._impact_cache.get(tid)
+        if impact is None:
+            docs, impacts = self._ranked(tid)
+            impact = dict(zip(docs, map(self._idf(tid).__mul__, impacts)))
+            if len(self._impact_cache) >= MAX_CACHED_TERMS:
+                self._impact_cache.clear()
+            self._impact_cache[tid] = impact
+        return impact
+
+    def scores(self, query: str, prefix: bool = True) -> Dict[int, float]:
+        """
+        BM25 scores of every question matching any query word.
+
+        Args:
+            query (str): The search text.
+            prefix (bool): Also match the last query word as a prefix.
+
+        Returns:
+            Dict[int, float]: Score per question id.
+        """
+        totals: Dict[int, float] = {}
+        for tids in self._query_terms(query, prefix):
+            # A document matching several expansions of one word counts its best match.
+            best: Dict[int, float] = {}
+            for tid in tids:
+                for qid, score in self._impact(tid).items():
+                    if score > best.get(qid, 0.0):
+                        best[qid] = score
+            for qid, score in best.items():
+                totals[qid] = totals.get(qid, 0.0) + score
+        return totals
+
+    def search(self, query: str, limit: Optional[int] = 20, prefix: bool = True,
+               allowed: Optional[Any] = None) -> List[int]:
+        """
+        Returns question ids matching any query word, best first.
+
+        Top-k queries walk the postings in score order and stop as soon as no
+        unseen question can beat the k-th best (Fagin's threshold algorithm), so
+        common words cost about k lookups instead of a pass over their postings.
+
+        Args:
+            query (str): The search text.
+            limit (Optional[int]): Maximum results; None ranks every match.
+            prefix (bool): Also match the last query word as a prefix.
+            allowed (Optional[Any]): A container of question ids to restrict results
+                                     to, e.g. one category's ids.
+
+        Returns:
+            List[int]: Question ids ordered by descending BM25 score.
+        """
+        groups = self._query_terms(query, prefix)
+        if not groups or limit is not None and limit <= 0:
+            return []
+        if limit is None:
+            items: Iterable[Tuple[int, float]] = self.scores(query, prefix).items()
+            if allowed is not None:
+                items = [(qid, score) for qid, score in items if qid in allowed]
+            return [qid for qid, _score in sorted(items, key=lambda item: (-item[1], item[0]))]
+
+        # One score-ordered stream per query word; merging a prefix's expansions
+        # yields each question first with its best score.
+        streams = []
+        for tids in groups:
+            ranked = []
+            for tid in tids:
+                docs, impacts = self._ranked(tid)
+                ranked.append(zip(map((-self._idf(tid)).__mul__, impacts), docs))
+            streams.append(heapq.merge(*ranked) if len(ranked) > 1 else ranked[0])
+
+        single = len(streams) == 1
+        impacts = [] if single else [[self._impact(tid) for tid in tids] for tids in groups]
+        seen = set()
+        results: List[Tuple[float, int]] = []  # min-heap of (score, -qid)
+        frontier = [0.0] * len(streams)
+        live = list(range(len(streams)))
+        while live:
+            for stream_index in list(live):
+                entry = next(streams[stream_index], None)
+                if entry is None:
+                    live.remove(stream_index)
+                    frontier[stream_index] = 0.0
+                    continue
+                negative, qid = entry
+                frontier[stream_index] = -negative
+                if qid in seen:
+                    continue
+                seen.add(qid)
+                if allowed is not None and qid not in allowed:
+                    continue
+                if single:
+                    score = -negative
+                else:
+                    score = sum(max(impact.get(qid, 0.0) for impact in group) for group in impacts)
+                if len(results) < limit:
+                    heapq.heappush(results, (score, -qid))
+                elif (score, -qid) > results[0]:
+                    heapq.heapreplace(results, (score, -qid))
+            if len(results) == limit and results[0][0] >= sum(frontier):
+                break
+        return [-negative_qid for _score, negative_qid in sorted(results, reverse=True)]
+
+    def matches(self, query: str, prefix: bool = True, allowed: Optional[Any] = None) -> List[int]:
+        """
+        Returns the ids of the questions containing every query word, unranked.
+
+        This is the cheap lookup behind topic drills: a one-word query is a copy
+        of its postings.
+
+        Args:
+            query (str): The search text.
+            prefix (bool): Also match the last query word as a prefix.
+            allowed (Optional[Any]): A container of question ids to restrict results to.
+
+        Returns:
+            List[int]: Matching question ids, in no particular order.
+        """
+        tokens = tokenize(query)
+        groups = self._query_terms(query, prefix)
+        if not groups or len(groups) < len(tokens):
+            return []
+        if len(groups) == 1 and len(groups[0]) == 1:
+            ids: Iterable[int] = self._docs[groups[0][0]]
+        else:
+            # Start from the rarest word and probe the others' cached score maps.
+            groups.sort(key=lambda tids: sum(len(self._docs[tid]) for tid in tids))
+            matched = set().union(*(self._docs[tid] for tid in groups[0]))
+            for tids in groups[1:]:
+                if not matched:
+                    break
+                found = [self._impact(tid) for tid in tids]
+                matched = {qid for qid in matched if any(qid in impact for impact in found)}
+            ids = matched
+        if allowed is not None:
+            return [qid for qid in ids if qid in allowed]
+        return list(ids)
+
+    # Persistence
+
+    def save(self, filename: str, source: str) -> None:
+        """
+        Writes the index to a sidecar file tagged with the source file's mtime and size.
+        """
+        try:
+            stat = os.stat(source)
+        except OSError as e:
+            print(f"Error saving search index '{filename}': {e}")
+            return
+        self.rank_postings()
+        self._sort_vocabulary()
+        vocab = '\n'.join(self._vocab).encode('utf-8')
+        offsets = array('Q', [0])
+        for docs in self._docs:
+            offsets.append(offsets[-1] + len(docs))
+        tmp_name = f"{filename}.tmp"
+        try:
+            with open(tmp_name, 'wb') as f:
+                f.write(_SEARCH_HEADER.pack(SEARCH_MAGIC, SEARCH_VERSION, stat.st_mtime_ns, stat.st_size,
+                                            len(self._lengths), len(self._vocab), offsets[-1], len(vocab)))
+                f.write(vocab)
+                offsets.tofile(f)
+                for docs in self._docs:
+                    docs.tofile(f)
+                for tfs in self._tfs:
+                    tfs.tofile(f)
+                for impacts in self._impacts:
+                    impacts.tofile(f)
+                self._lengths.tofile(f)
+            os.replace(tmp_name, filename)
+        except OSError as e:
+            print(f"Error saving search index '{filename}': {e}")
+
+    @classmethod
+    def load(cls, filename: str, source: str) -> Optional["SearchIndex"]:
+        """
+        Loads a sidecar index, or returns None if it is missing, corrupt or older
+        than the source file.
+        """
+        try:
+            stat = os.stat(source)
+            with open(filename, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return None
+        try:
+            (magic, version, mtime_ns, size, doc_count, term_count,
+             postings, vocab_size) = _SEARCH_HEADER.unpack_from(raw)
+        except struct.error:
+            return None
+        if (magic != SEARCH_MAGIC or version != SEARCH_VERSION
+                or mtime_ns != stat.st_mtime_ns or size != stat.st_size):
+            return None
+
+        view = memoryview(raw)
+        pos = _SEARCH_HEADER.size
+        index = cls()
+        index._vocab = bytes(view[pos:pos + vocab_size]).decode('utf-8').split('\n') if term_count else []
+        pos += vocab_size
+
+        def take(code: str, count: int) -> array:
+            nonlocal pos
+            column = array(code)
+            column.frombytes(view[pos:pos + count * column.itemsize])
+            pos += count * column.itemsize
+            return column
+
+        offsets = take('Q', term_count + 1)
+        docs = take('I', postings)
+        tfs = take('H', postings)
+        impacts = take('d', postings)
+        index._lengths = take('I', doc_count)
+        if len(index._vocab) != term_count or len(index._lengths) != doc_count:
+            return None
+        index._term_ids = {term: tid for tid, term in enumerate(index._vocab)}
+        index._sorted_vocab = index._vocab
+        index._docs = [docs[offsets[i]:offsets[i + 1]] for i in range(term_count)]
+        index._tfs = [tfs[offsets[i]:offsets[i + 1]] for i in range(term_count)]
+        index._impacts = [impacts[offsets[i]:offsets[i + 1]] for i in range(term_count)]
+        index._live = doc_count
+        index._total_length = sum(index._lengths)
+        return index
@@ -0,0 +1,365 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from analytics_log import AnalyticsLog
+from data_manager import DataManager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_SUFFIX = ".lock"
+JOURNAL_SUFFIX = ".delta"
+# Windows locks byte ranges; lock one far past any journal content so reads still work.
+_WINDOWS_LOCK_OFFSET = 1 << 40
+
+
+def lock_file(fd: int, blocking: bool = True) -> bool:
+    """
+    Takes an exclusive advisory lock on an open file.
+
+    Args:
+        fd (int): The file descriptor.
+        blocking (bool): Wait for the lock instead of giving up.
+
+    Returns:
+        bool: True if the lock was taken, False if ``blocking`` is False and
+              another process holds it.
+    """
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        else:
+            os.lseek(fd, _WINDOWS_LOCK_OFFSET, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        if blocking:
+            raise
+        return False
+
+
+def unlock_file(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, _WINDOWS_LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def journal_path(filename: str, writer_id: str) -> str:
+    return f"{filename}.{writer_id}{JOURNAL_SUFFIX}"
+
+
+class SharedAnalyticsLog(AnalyticsLog):
+    """
+    Analytics backend that several processes can write at the same time.
+
+    Each process appends its answers to its own journal,
+    ``<filename>.<writer id>.delta``, and never rewrites the snapshot with its
+    in-memory totals. Instead, every ``merge_every`` answers (and on close) it
+    takes an exclusive lock on ``<filename>.lock``, re-reads the snapshot, adds
+    every journal's answers that the snapshot does not contain yet, and writes
+    it back atomically. The snapshot keeps a version vector,
+    ``merged`` (writer id -> last merged sequence number), so each answer is
+    counted exactly once whichever process merges it.
+
+    Merge semantics:
+
+    * ``correct`` / ``total`` are grow-only counters: merged answers are added,
+      so concurrent sessions never overwrite each other's counts.
+    * ``streak`` is the run of correct answers across all sessions in answer
+      time order. Merged answers older than the newest answer already in the
+      snapshot (``streak_at``) still count towards ``correct`` / ``total`` but
+      no longer change the streak.
+    * A reset (``compact`` with a new dict) replaces the counters and discards
+      every answer journaled before it, from all sessions.
+
+    A process holds a lock on its own journal while it runs. A journal whose
+    lock is free belongs to a session that exited without closing; the next
+    merge adopts its answers and deletes it.
+
+    ``data`` is this process's view: the snapshot as of the last merge it saw,
+    plus its own answers since. ``refresh()`` picks up other sessions' merges.
+    """
+
+    def __init__(self, filename: str, fsync_every: int = 32, fsync_interval: float = 2.0,
+                 merge_every: int = 32, writer: Optional[Any] = None) -> None:
+        """
+        Args:
+            filename (str): The path to the analytics snapshot JSON file.
+            fsync_every (int): Number of journaled answers per fsync batch.
+            fsync_interval (float): Maximum seconds between fsyncs while answering.
+            merge_every (int): Number of answers that triggers a merge into the snapshot.
+            writer (Optional[Any]): A PersistenceWorker to run file I/O on. Defaults
+                                    to writing on the calling thread.
+        """
+        super().__init__(filename, fsync_every=fsync_every, fsync_interval=fsync_interval,
+                         compact_every=merge_every, writer=writer)
+        self.writer_id = uuid.uuid4().hex[:16]
+        self.log_filename = journal_path(filename, self.writer_id)
+        self.lock_filename = f"{filename}{LOCK_SUFFIX}"
+        # Own answers not yet seen in a merged snapshot: (seq, category, is_correct)
+        self._unmerged: List[Tuple[int, str, bool]] = []
+        self._latest: Optional[Dict[str, Any]] = None
+        self._latest_lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def apply_merged(data: Dict[str, Any], records: Iterable[Tuple[float, str, int, str, bool]]) -> None:
+        """
+        Adds journaled answers to a snapshot in place, in answer time order.
+
+        Args:
+            data (Dict[str, Any]): The analytics snapshot.
+            records (Iterable[Tuple[float, str, int, str, bool]]): ``(time, writer id,
+                seq, category, is_correct)`` tuples.
+        """
+        performance = data.setdefault("performance", {})
+        streak = data.get("streak", 0)
+        streak_at = data.get("streak_at", 0.0)
+        for answered_at, _writer_id, _seq, category, is_correct in sorted(records):
+            cat_stats = performance.get(category)
+            if cat_stats is None:
+                cat_stats = performance[category] = {"correct": 0, "total": 0}
+            cat_stats["total"] += 1
+            if is_correct:
+                cat_stats["correct"] += 1
+            if answered_at >= streak_at:
+                streak = streak + 1 if is_correct else 0
+                streak_at = answered_at
+        data["streak"] = streak
+        data["streak_at"] = streak_at
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Opens this process's journal, merges any journals left behind by sessions
+        that did not close, and loads the merged snapshot.
+
+        Returns:
+            Dict[str, Any]: The analytics data.
+        """
+        self.data = self._merge()
+        self.stats.load(self.data.get("performance", {}))
+        self.seq = 0
+        self._unmerged = []
+        with self._latest_lock:
+            self._latest = None
+        return self.data
+
+    def refresh(self) -> bool:
+        """
+        Adopts the snapshot from the most recent merge, which includes other
+        sessions' answers, into ``data`` (in place). Call on the owning thread.
+
+        Returns:
+            bool: True if ``data`` changed.
+        """
+        with self._latest_lock:
+            latest, self._latest = self._latest, None
+        if latest is None:
+            return False
+        done = latest.get("merged", {}).get(self.writer_id, 0)
+        self._unmerged = [record for record in self._unmerged if record[0] > done]
+        for _seq, category, is_correct in self._unmerged:
+            self.apply_answer(latest, category, is_correct)
+        self.data.clear()
+        self.data.update(latest)
+        self.stats.load(self.data.get("performance", {}))
+        return True
+
+    def _open_log(self):
+        if self._log is None:
+            self._log = open(self.log_filename, 'a')
+            # Held for the life of the session: a free lock marks an abandoned journal.
+            lock_file(self._log.fileno(), blocking=False)
+        return self._log
+
+    def record_answer(self, category: str, is_correct: bool, question_key: Optional[str] = None) -> None:
+        """
+        Applies an answer to the in-memory analytics and appends it to this
+        process's journal.
+
+        Args:
+            category (str): The category of the answered question.
+            is_correct (bool): Whether the answer was correct.
+            question_key (Optional[str]): Stable question identifier, kept in the journal.
+        """
+        self.apply_answer(self.data, category, is_correct)
+        self.stats.record(category, is_correct)
+        self.seq += 1
+        self._unmerged.append((self.seq, category, is_correct))
+        record = {"s": self.seq, "c": category, "ok": int(is_correct), "t": round(time.time(), 6)}
+        if question_key is not None:
+            record["q"] = question_key
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self._io(lambda: self._append(line))
+
+        self._unsynced += 1
+        self._since_compact += 1
+        if self._since_compact >= self.compact_every:
+            self.compact()
+        elif (self._unsynced >= self.fsync_every
+              or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+    def compact(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Merges journaled answers into the snapshot.
+
+        Args:
+            data (Optional[Dict[str, Any]]): Replacement analytics data. Passing
+                ``data`` itself only adds its (empty) categories to the snapshot;
+                any other dict is a reset.
+        """
+        reset = None
+        if data is not None and data is not self.data:
+            self.data = data
+            self._unmerged = []
+            reset = json.loads(json.dumps(data))
+        if data is not None:
+            self.stats.load(self.data.get("performance", {}))
+        categories = list(self.data.get("performance", {}))
+        if reset is None:
+            # Later merges cover everything earlier ones would have, so they coalesce.
+            self._io(lambda: self._merge(categories=categories), key=self.lock_filename)
+        else:
+            self._io(lambda: self._merge(reset=reset, categories=categories))
+        # Journal fsyncs stay due: a coalesced merge may run before the latest appends.
+        self._since_compact = 0
+
+    def close(self) -> None:
+        """
+        Merges the remaining answers and removes this process's journal.
+        """
+        self._io(lambda: self._merge(final=True))
+        self._since_compact = 0
+        self._unsynced = 0
+
+    def _journals(self) -> List[Tuple[str, str]]:
+        directory = os.path.dirname(self.filename) or '.'
+        prefix = f"{os.path.basename(self.filename)}."
+        journals = []
+        try:
+            names = os.listdir(directory)
+        except OSError as e:
+            print(f"Error listing analytics journals in '{directory}': {e}")
+            return journals
+        for name in names:
+            if name.startswith(prefix) and name.endswith(JOURNAL_SUFFIX):
+                writer_id = name[len(prefix):-len(JOURNAL_SUFFIX)]
+                journals.append((writer_id, os.path.join(directory, name)))
+        return journals
+
+    @staticmethod
+    def _read_journal(path: str, writer_id: str, after: int) -> Tuple[List[Tuple[float, str, int, str, bool]], int]:
+        """
+        Reads the complete records of a journal newer than ``after``.
+
+        Returns:
+            Tuple[List[...], int]: The records and the last sequence number read.
+        """
+        records = []
+        last = after
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        # Being appended right now; the next merge picks it up.
+                        break
+                    try:
+                        record = json.loads(line)
+                        seq = record["s"]
+                        if seq > after:
+                            records.append((record.get("t", 0.0), writer_id, seq, record["c"], bool(record["ok"])))
+                            last = max(last, seq)
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # A torn line from a crash mid-append; nothing after it is valid.
+                        break
+        except OSError as e:
+            print(f"Error reading analytics journal '{path}': {e}")
+        return records, last
+
+    def _merge(self, reset: Optional[Dict[str, Any]] = None, categories: Iterable[str] = (),
+               final: bool = False) -> Dict[str, Any]:
+        """
+        Merges every journal into the snapshot under the snapshot lock. Runs on
+        the writer thread when there is one.
+
+        Returns:
+            Dict[str, Any]: The merged snapshot.
+        """
+        if self._closed:
+            return self.data
+        with open(self.lock_filename, 'a') as lock:
+            lock_file(lock.fileno())
+            try:
+                if self._log is not None:
+                    self._log.flush()
+                else:
+                    self._open_log()
+                disk = DataManager.load_analytics(self.filename)
+                data = reset if reset is not None else disk
+                merged = dict(disk.get("merged", {}))
+                records: List[Tuple[float, str, int, str, bool]] = []
+                abandoned = []
+                live = set()
+                for writer_id, path in self._journals():
+                    handle = None
+                    if writer_id != self.writer_id:
+                        handle = open(path, 'a')
+                        if lock_file(handle.fileno(), blocking=False):
+                            abandoned.append((path, handle))
+                        else:
+                            handle.close()
+                            live.add(writer_id)
+                    elif not final:
+                        live.add(writer_id)
+                    found, last = self._read_journal(path, writer_id, merged.get(writer_id, 0))
+                    merged[writer_id] = last
+                    if reset is None:
+                        records.extend(found)
+
+                changed = bool(records) or reset is not None
+                self.apply_merged(data, records)
+                performance = data.setdefault("performance", {})
+                for category in categories:
+                    if category not in performance:
+                        performance[category] = {"correct": 0, "total": 0}
+                        changed = True
+                vector = {writer_id: seq for writer_id, seq in merged.items() if writer_id in live}
+                changed = changed or vector != disk.get("merged", {})
+                data["merged"] = vector
+                data.setdefault("streak", 0)
+
+                if changed and not DataManager.save_json_atomic(self.filename, data):
+                    # Nothing is lost: every journal is still there.
+                    for _path, handle in abandoned:
+                        handle.close()
+                    return data
+                for path, handle in abandoned:
+                    handle.close()
+                    self._remove(path)
+                if final:
+                    self._close_log()
+                    self._remove(self.log_filename)
+                    self._closed = True
+                else:
+                    self._log.truncate(0)
+            finally:
+                unlock_file(lock.fileno())
+        with self._latest_lock:
+            self._latest = data
+        return data
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error removing analytics journal '{path}': {e}")
@@ -0,0 +1,346 @@
+import getpass
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from analytics_log import AnalyticsLog
+from stats_aggregator import StatsAggregator
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    streak INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    question_key TEXT,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_user_category ON attempts(user_id, category_id, answered_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_user_question ON attempts(user_id, question_key);
+CREATE TABLE IF NOT EXISTS category_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    correct INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, category_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_category_stats_category ON category_stats(category_id);
+CREATE TABLE IF NOT EXISTS question_stats (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    question_key TEXT NOT NULL,
+    correct INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    last_answered_at REAL,
+    PRIMARY KEY (user_id, question_key)
+) WITHOUT ROWID;
+"""
+
+
+def is_sqlite_path(filename: str) -> bool:
+    """
+    Whether an analytics path refers to a SQLite database rather than a JSON file.
+    """
+    return filename.lower().endswith(SQLITE_EXTENSIONS)
+
+
+def default_user() -> str:
+    """
+    Returns the analytics user name: ``QUIZ_USER`` if set, else the login name.
+    """
+    try:
+        return os.environ.get("QUIZ_USER") or getpass.getuser()
+    except (KeyError, OSError):
+        return "default"
+
+
+class SQLiteAnalyticsStore:
+    """
+    Multi-user analytics backend on top of the stdlib ``sqlite3`` module.
+
+    Every attempt is stored in ``attempts``; ``category_stats`` and
+    ``question_stats`` hold per-user aggregates kept up to date with UPSERTs, so
+    dashboards read indexed rows instead of loading a whole file. Answers are
+    buffered and written in one transaction per batch. The database runs in WAL
+    mode so readers on other machines' sessions are not blocked by writers.
+
+    The public methods mirror AnalyticsLog (load / record_answer / compact /
+    sync / close, and the ``stats`` aggregator), so the front-ends can use
+    either backend.
+    """
+
+    def __init__(self, filename: str, user: Optional[str] = None, batch_size: int = 32,
+                 writer: Optional[Any] = None, import_from: Optional[str] = None) -> None:
+        """
+        Args:
+            filename (str): The path to the SQLite database.
+            user (Optional[str]): The user whose analytics are read and written.
+                                  Defaults to default_user().
+            batch_size (int): Number of buffered answers that triggers a write.
+            writer (Optional[Any]): A PersistenceWorker to run writes on. Defaults
+                                    to writing on the calling thread.
+            import_from (Optional[str]): A legacy analytics JSON file imported for
+                                         the first user of a new database.
+        """
+        self.filename = filename
+        self.user = user or default_user()
+        self.batch_size = batch_size
+        self.writer = writer
+        self.import_from = import_from
+        self.data: Dict[str, Any] = {"streak": 0, "performance": {}}
+        self.stats = StatsAggregator()
+        self._pending: List[Tuple[str, Optional[str], int, float]] = []
+        self._lock = threading.Lock()
+        self._category_ids: Dict[str, int] = {}
+        self._conn = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+            fresh = self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+        self.user_id = self._user_id(self.user)
+        if fresh and import_from:
+            self.import_json(import_from)
+
+    def _user_id(self, name: str) -> int:
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", (name,))
+            return self._conn.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone()[0]
+
+    def _category_id(self, name: str) -> int:
+        # Caller holds self._lock.
+        cid = self._category_ids.get(name)
+        if cid is None:
+            self._conn.execute("INSERT OR IGNORE INTO categories (name) VALUES (?)", (name,))
+            cid = self._conn.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+            self._category_ids[name] = cid
+        return cid
+
+    def _transaction(self, work: Callable[[], None]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                work()
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _io(self, job: Callable[[], Any]) -> None:
+        if self.writer is not None:
+            self.writer.submit(job)
+        else:
+            job()
+
+    def import_json(self, filename: str) -> bool:
+        """
+        Imports a JSON analytics file (including its log tail and the legacy
+        ``total_attempted`` format, which load_analytics migrates into a
+        ``Legacy`` bucket) into this user's aggregates.
+
+        Returns:
+            bool: True if anything was imported.
+        """
+        if not os.path.exists(filename):
+            return False
+        data = AnalyticsLog(filename).load()
+        performance = data.get("performance", {})
+        if not performance and not data.get("streak"):
+            return False
+        print(f"Importing analytics from '{filename}' for user '{self.user}'...")
+
+        def work() -> None:
+            rows = [(self.user_id, self._category_id(cat), stats.get("correct", 0), stats.get("total", 0))
+                    for cat, stats in performance.items()]
+            self._conn.executemany(
+                "INSERT INTO category_stats (user_id, category_id, correct, total) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, category_id) DO UPDATE SET "
+                "correct = correct + excluded.correct, total = total + excluded.total", rows)
+            self._conn.execute("UPDATE users SET streak = ? WHERE id = ?", (data.get("streak", 0), self.user_id))
+
+        self._transaction(work)
+        return True
+
+    def load(self) -> Dict[str, Any]:
+        """
+        Loads this user's streak and per-category counters.
+
+        Returns:
+            Dict[str, Any]: Analytics in the ``{"streak", "performance"}`` format.
+        """
+        with self._lock:
+            streak = self._conn.execute("SELECT streak FROM users WHERE id = ?", (self.user_id,)).fetchone()[0]
+            rows = self._conn.execute(
+                "SELECT c.name, s.correct, s.total FROM category_stats s "
+                "JOIN categories c ON c.id = s.category_id WHERE s.user_id = ? ORDER BY c.id",
+                (self.user_id,)).fetchall()
+        self.data = {"streak": streak,
+                     "performance": {name: {"correct": correct, "total": total} for name, correct, total in rows}}
+        self.stats.load(self.data["performance"])
+        return self.data
+
+    def record_answer(self, category: str, is_correct: bool, question_key: Optional[str] = None) -> None:
+        """
+        Applies an answer to the in-memory analytics and buffers it for the database.
+
+        Args:
+            category (str): The category of the answered question.
+            is_correct (bool): Whether the answer was correct.
+            question_key (Optional[str]): Stable question identifier for per-question stats.
+        """
+        AnalyticsLog.apply_answer(self.data, category, is_correct)
+        self.stats.record(category, is_correct)
+        self._pending.append((category, question_key, int(is_correct), time.time()))
+        if len(self._pending) >= self.batch_size:
+            self.sync()
+
+    def sync(self) -> None:
+        """
+        Writes all buffered answers in a single transaction.
+        """
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        streak = self.data.get("streak", 0)
+        self._io(lambda: self._write_batch(batch, streak))
+
+    def _write_batch(self, batch: List[Tuple[str, Optional[str], int, float]], streak: int) -> None:
+        def work() -> None:
+            attempts = []
+            per_category: Dict[int, List[int]] = {}
+            per_question: Dict[str, List[float]] = {}
+            for category, key, correct, answered_at in batch:
+                cid = self._category_id(category)
+                attempts.append((self.user_id, cid, key, correct, answered_at))
+                counts = per_category.setdefault(cid, [0, 0])
+                counts[0] += correct
+                counts[1] += 1
+                if key is not None:
+                    q_counts = per_question.setdefault(key, [0, 0, answered_at])
+                    q_counts[0] += correct
+                    q_counts[1] += 1
+                    q_counts[2] = answered_at
+            self._conn.executemany(
+                "INSERT INTO attempts (user_id, category_id, question_key, correct, answered_at) "
+                "VALUES (?, ?, ?, ?, ?)", attempts)
+            self._conn.executemany(
+                "INSERT INTO category_stats (user_id, category_id, correct, total) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, category_id) DO UPDATE SET "
+                "correct = correct + excluded.correct, total = total + excluded.total",
+                [(self.user_id, cid, c, t) for cid, (c, t) in per_category.items()])
+            self._conn.executemany(
+                "INSERT INTO question_stats (user_id, question_key, correct, total, last_answered_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (user_id, question_key) DO UPDATE SET "
+                "correct = correct + excluded.correct, total = total + excluded.total, "
+                "last_answered_at = excluded.last_answered_at",
+                [(self.user_id, key, c, t, at) for key, (c, t, at) in per_question.items()])
+            self._conn.execute("UPDATE users SET streak = ? WHERE id = ?", (streak, self.user_id))
+
+        try:
+            self._transaction(work)
+        except sqlite3.Error as e:
+            print(f"Error writing analytics to '{self.filename}': {e}")
+
+    def compact(self, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Replaces this user's aggregates with ``data`` (e.g. after a reset). Raw
+        attempts are kept.
+        """
+        if data is not None:
+            self.data = data
+            self.stats.load(data.get("performance", {}))
+        self.sync()
+        streak = self.data.get("streak", 0)
+        rows = [(cat, stats.get("correct", 0), stats.get("total", 0))
+                for cat, stats in self.data.get("performance", {}).items()]
+        self._io(lambda: self._replace_aggregates(rows, streak))
+
+    def _replace_aggregates(self, rows: List[Tuple[str, int, int]], streak: int) -> None:
+        def work() -> None:
+            self._conn.execute("DELETE FROM category_stats WHERE user_id = ?", (self.user_id,))
+            self._conn.executemany(
+                "INSERT INTO category_stats (user_id, category_id, correct, total) VALUES (?, ?, ?, ?)",
+                [(self.user_id, self._category_id(cat), correct, total) for cat, correct, total in rows])
+            if not any(total for _cat, _correct, total in rows):
+                self._conn.execute("DELETE FROM question_stats WHERE user_id = ?", (self.user_id,))
+            self._conn.execute("UPDATE users SET streak = ? WHERE id = ?", (streak, self.user_id))
+
+        try:
+            self._transaction(work)
+        except sqlite3.Error as e:
+            print(f"Error writing analytics to '{self.filename}': {e}")
+
+    def add_categories(self, categories: Iterable[str]) -> List[str]:
+        """
+        Adds empty counters for the categories not in the analytics yet. Rows
+        another session already wrote are left alone, so counts only ever change
+        through the answer deltas.
+
+        Returns:
+            List[str]: The categories that were added.
+        """
+        performance = self.data.setdefault("performance", {})
+        added = [cat for cat in categories if cat not in performance]
+        if added:
+            for cat in added:
+                performance[cat] = {"correct": 0, "total": 0}
+            self.stats.load(performance)
+            self._io(lambda: self._insert_categories(added))
+        return added
+
+    def _insert_categories(self, categories: List[str]) -> None:
+        def work() -> None:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO category_stats (user_id, category_id, correct, total) VALUES (?, ?, 0, 0)",
+                [(self.user_id, self._category_id(cat)) for cat in categories])
+
+        try:
+            self._transaction(work)
+        except sqlite3.Error as e:
+            print(f"Error writing analytics to '{self.filename}': {e}")
+
+    def category_accuracy(self, user: Optional[str] = None) -> List[Tuple[str, int, int, float]]:
+        """
+        Returns per-category ``(category, correct, total, accuracy)`` rows, weakest first.
+
+        Args:
+            user (Optional[str]): A user name, or None for the whole team.
+        """
+        self.sync()
+        if self.writer is not None:
+            self.writer.flush()
+        query = ("SELECT c.name, SUM(s.correct), SUM(s.total) FROM category_stats s "
+                 "JOIN categories c ON c.id = s.category_id ")
+        params: Tuple[Any, ...] = ()
+        if user is not None:
+            query += "JOIN users u ON u.id = s.user_id WHERE u.name = ? "
+            params = (user,)
+        query += "GROUP BY s.category_id HAVING SUM(s.total) > 0"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        result = [(name, correct, total, correct / total) for name, correct, total in rows]
+        result.sort(key=lambda row: row[3])
+        return result
+
+    def close(self) -> None:
+        """
+        Writes buffered answers and closes the database connection.
+        """
+        self.sync()
+        self._io(self._close_connection)
+
+    def _close_connection(self) -> None:
+        with self._lock:
+            self._conn.close()
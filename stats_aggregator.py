@@ -0,0 +1,172 @@
+import heapq
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class StatsAggregator:
+    """
+    Analytics statistics maintained incrementally, answer by answer.
+
+    Owned by the analytics backends, which feed it every recorded answer and
+    every reload or reset of their data. It keeps per-category counters, the
+    lifetime totals, this session's score and mistakes per category, and the
+    strongest / weakest categories in lazily-invalidated heaps, so an answer
+    costs O(log k) instead of a rescan of every category. Derived views are
+    memoized until the next change. Ties go to the category seen first,
+    matching the order dashboard rows appear in.
+
+    The categories changed since the last ``take_dirty`` are tracked too, so
+    the Analytics tab redraws only those rows.
+    """
+
+    def __init__(self) -> None:
+        self.rows: Dict[str, Tuple[int, int]] = {}
+        self.total_correct = 0
+        self.total_attempted = 0
+        self.session_correct = 0
+        self.session_total = 0
+        self.session_mistakes: Dict[str, int] = {}
+        self._order: Dict[str, int] = {}
+        self._dirty: Dict[str, None] = {}
+        self._best: List[Tuple[float, int, str]] = []
+        self._worst: List[Tuple[float, int, str]] = []
+        self._version = 0
+        self._memo: Dict[str, Tuple[int, Any, Any]] = {}
+
+    @staticmethod
+    def percentage(correct: int, total: int) -> float:
+        return correct / total if total else 0.0
+
+    def update(self, category: str, correct: int, total: int) -> bool:
+        """
+        Sets a category's counters, marking its row dirty if they changed.
+
+        Returns:
+            bool: True if the row changed.
+        """
+        old = self.rows.get(category)
+        if old == (correct, total):
+            return False
+        if old is not None:
+            self.total_correct -= old[0]
+            self.total_attempted -= old[1]
+        else:
+            self._order[category] = len(self._order)
+        self.rows[category] = (correct, total)
+        self.total_correct += correct
+        self.total_attempted += total
+        self._dirty[category] = None
+        self._version += 1
+        if total:
+            pct = correct / total
+            order = self._order[category]
+            heapq.heappush(self._best, (-pct, order, category))
+            heapq.heappush(self._worst, (pct, order, category))
+        if len(self._best) > 4 * len(self.rows) + 64:
+            self._rebuild_heaps()
+        return True
+
+    def record(self, category: str, is_correct: bool) -> None:
+        """
+        Counts one answer, lifetime and for this session.
+        """
+        correct, total = self.rows.get(category, (0, 0))
+        self.update(category, correct + bool(is_correct), total + 1)
+        self.session_total += 1
+        if is_correct:
+            self.session_correct += 1
+        else:
+            self.session_mistakes[category] = self.session_mistakes.get(category, 0) + 1
+
+    def load(self, performance: Dict[str, Dict[str, int]]) -> None:
+        """
+        Diffs a whole ``performance`` dict against the counters, e.g. after a
+        reload, a reset or a merge. This session's counts are kept.
+
+        Categories that disappeared are reset to 0/0 so their rows get hidden.
+        """
+        for category in list(self.rows):
+            if category not in performance:
+                self.update(category, 0, 0)
+        for category, stats in performance.items():
+            self.update(category, stats.get("correct", 0), stats.get("total", 0))
+
+    def _rebuild_heaps(self) -> None:
+        self._best, self._worst = [], []
+        for category, (correct, total) in self.rows.items():
+            if total:
+                pct = correct / total
+                self._best.append((-pct, self._order[category], category))
+                self._worst.append((pct, self._order[category], category))
+        heapq.heapify(self._best)
+        heapq.heapify(self._worst)
+
+    def _memoized(self, name: str, build: Callable[[], Any], key: Any = None) -> Any:
+        # Every change, session counters included, goes through update() and bumps the version
+        cached = self._memo.get(name)
+        if cached is not None and cached[0] == self._version and cached[1] == key:
+            return cached[2]
+        value = build()
+        self._memo[name] = (self._version, key, value)
+        return value
+
+    def _top(self, heap: List[Tuple[float, int, str]], sign: float) -> Optional[Tuple[str, float]]:
+        while heap:
+            key, _order, category = heap[0]
+            correct, total = self.rows[category]
+            if total and key == sign * (correct / total):
+                return category, correct / total
+            heapq.heappop(heap)
+        return None
+
+    def strongest(self) -> Optional[Tuple[str, float]]:
+        """
+        Returns ``(category, fraction_correct)`` of the best category, or None.
+        """
+        return self._memoized("strongest", lambda: self._top(self._best, -1.0))
+
+    def weakest(self) -> Optional[Tuple[str, float]]:
+        """
+        Returns ``(category, fraction_correct)`` of the weakest category, or None.
+        """
+        return self._memoized("weakest", lambda: self._top(self._worst, 1.0))
+
+    @property
+    def accuracy(self) -> float:
+        """Lifetime fraction of correct answers."""
+        return self.percentage(self.total_correct, self.total_attempted)
+
+    @property
+    def session_accuracy(self) -> float:
+        return self.percentage(self.session_correct, self.session_total)
+
+    def mistakes_by_category(self) -> List[Tuple[str, int]]:
+        """
+        Returns this session's ``(category, mistakes)`` pairs, most mistakes first.
+        """
+        return self._memoized("mistakes", lambda: sorted(self.session_mistakes.items(),
+                                                         key=lambda item: (-item[1], item[0])))
+
+    def take_dirty(self) -> List[str]:
+        """
+        Returns the categories changed since the last call, in row order, and clears them.
+        """
+        dirty = sorted(self._dirty, key=self._order.__getitem__)
+        self._dirty.clear()
+        return dirty
+
+    def row_order(self, category: str) -> int:
+        return self._order[category]
+
+    def insights_text(self, streak: int) -> str:
+        """
+        Formats the streak / strongest / weakest summary shown under the rows.
+        """
+        def build() -> str:
+            strongest = self.strongest()
+            weakest = self.weakest()
+            best = f"{strongest[0]} ({strongest[1] * 100:.1f}%)" if strongest else "None"
+            worst = f"{weakest[0]} ({weakest[1] * 100:.1f}%)" if weakest else "None"
+            return (f"Current Streak: {streak} 🔥\n"
+                    f"Strongest Area: {best}\n"
+                    f"Area to Improve: {worst}")
+        return self._memoized("insights", build, streak)
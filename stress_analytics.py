@@ -0,0 +1,126 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional, Sequence
+from analytics_log import AnalyticsLog
+from data_manager import DataManager
+from persistence import PersistenceWorker
+from shared_analytics import JOURNAL_SUFFIX, SharedAnalyticsLog
+
+CATEGORIES = ["AWS", "Cloud", "Networking", "Security", "Databases"]
+
+
+def answer(filename: str, worker: int, answers: int, seed: int, backend: str, crash: bool) -> None:
+    """
+    One simulated session: records ``answers`` random answers, merging now and
+    then, and writes the counts it recorded to ``<filename>.expected<worker>``.
+    A crashing session exits right after its answers are durable, without closing.
+    """
+    rng = random.Random(seed * 1000 + worker)
+    writer = PersistenceWorker() if worker % 2 else None
+    if backend == "shared":
+        log = SharedAnalyticsLog(filename, merge_every=rng.randint(1, 16), fsync_every=8, writer=writer)
+    else:
+        log = AnalyticsLog(filename, compact_every=rng.randint(1, 16), fsync_every=8, writer=writer)
+    log.load()
+    counts = {cat: [0, 0] for cat in CATEGORIES}
+    for i in range(answers):
+        category = rng.choice(CATEGORIES)
+        is_correct = rng.random() < 0.7
+        log.record_answer(category, is_correct, f"q{worker}-{i}")
+        counts[category][0] += is_correct
+        counts[category][1] += 1
+        if rng.random() < 0.05:
+            time.sleep(rng.random() / 1000)
+    DataManager.save_json(f"{filename}.expected{worker}", counts)
+    if crash:
+        log.sync()
+        if writer is not None:
+            writer.flush()
+        os._exit(0)
+    log.close()
+    if writer is not None:
+        writer.close()
+
+
+def run(processes: int, answers: int, seed: int, backend: str, crashes: int, directory: str) -> int:
+    """
+    Runs the sessions concurrently and compares the merged analytics with the
+    answers they recorded.
+
+    Returns:
+        int: The number of lost (or duplicated) answer counts, plus leftover journals.
+    """
+    filename = os.path.join(directory, "analytics.json")
+    sessions = [multiprocessing.Process(target=answer, args=(filename, worker, answers, seed, backend,
+                                                             worker < crashes))
+                for worker in range(processes)]
+    start = time.perf_counter()
+    for session in sessions:
+        session.start()
+    for session in sessions:
+        session.join()
+    elapsed = time.perf_counter() - start
+
+    expected = {cat: [0, 0] for cat in CATEGORIES}
+    for worker in range(processes):
+        result = DataManager.load_json(f"{filename}.expected{worker}", {})
+        for cat, (correct, total) in result.items():
+            expected[cat][0] += correct
+            expected[cat][1] += total
+
+    if backend == "shared":
+        # A final session adopts the journals of the crashed ones.
+        final = SharedAnalyticsLog(filename)
+        data = final.load()
+        final.close()
+    else:
+        data = AnalyticsLog(filename).load()
+    performance = data.get("performance", {})
+
+    lost = 0
+    print(f"\n{'category':<12} {'expected':>17} {'stored':>17}")
+    for cat in CATEGORIES:
+        stats = performance.get(cat, {})
+        stored = (stats.get("correct", 0), stats.get("total", 0))
+        lost += abs(expected[cat][1] - stored[1]) + abs(expected[cat][0] - stored[0])
+        print(f"{cat:<12} {expected[cat][0]:>7}/{expected[cat][1]:<9} {stored[0]:>7}/{stored[1]:<9}")
+    total = sum(total for _correct, total in expected.values())
+    leftovers = [name for name in os.listdir(directory) if name.endswith(JOURNAL_SUFFIX)]
+    print(f"\n{processes} processes ({crashes} crashed) x {answers} answers = {total} answers "
+          f"in {elapsed:.2f}s, backend '{backend}'")
+    print(f"Streak: {data.get('streak', 0)}; leftover journals: {len(leftovers)}")
+    if lost:
+        print(f"FAIL: {lost} answer counts lost or duplicated")
+    else:
+        print("OK: no answers lost")
+    return lost + len(leftovers)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run many processes answering into one analytics file and check that no counts are lost.")
+    parser.add_argument("--processes", type=int, default=8, help="concurrent sessions")
+    parser.add_argument("--answers", type=int, default=500, help="answers per session")
+    parser.add_argument("--crashes", type=int, default=2, help="sessions that exit without closing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=["shared", "log"], default="shared",
+                        help="'log' runs the single-process AnalyticsLog to show what gets lost")
+    parser.add_argument("--dir", default=None, help="directory for the analytics files (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+        lost = run(args.processes, args.answers, args.seed, args.backend, args.crashes, args.dir)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            lost = run(args.processes, args.answers, args.seed, args.backend, args.crashes, directory)
+    return 1 if lost else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import json
+import os
+import random
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from attempt_history import CATEGORIES_FILE, COLUMN_TYPES, DEFAULT_CHUNK_SIZE, TAIL_FILE, encode_chunk
+
+CATEGORIES = ["Storage", "Compute", "Database", "Networking", "Security", "Analytics",
+              "Application Integration", "Management", "Migration", "Cost Management"]
+SERVICES = ["S3", "EC2", "RDS", "Lambda", "DynamoDB", "CloudFront", "Route 53", "IAM",
+            "SQS", "SNS", "Kinesis", "Glacier", "EBS", "EFS", "VPC", "CloudWatch"]
+
+
+def category_names(count: int) -> List[str]:
+    """
+    Returns ``count`` category names, starting with the real certification domains.
+    """
+    names = CATEGORIES[:count]
+    names.extend(f"Topic {i:05d}" for i in range(len(names), count))
+    return names
+
+
+def iter_questions(count: int, seed: int = 42,
+                   categories: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields a synthetic question bank in the questions.json schema.
+
+    Categories and options repeat the way they do in real certification banks.
+
+    Args:
+        count (int): Number of questions.
+        seed (int): Random seed; the same seed always yields the same bank.
+        categories (Optional[Sequence[str]]): Category names to draw from.
+                                              Defaults to CATEGORIES.
+    """
+    rng = random.Random(seed)
+    categories = CATEGORIES if categories is None else categories
+    for i in range(count):
+        services = rng.sample(SERVICES, 4)
+        yield {
+            "category": rng.choice(categories),
+            "question": f"Scenario {i}: which service best fits workload {rng.randrange(10**6)}?",
+            "options": [f"{letter}. {service}" for letter, service in zip("ABCD", services)],
+            "correct_answer": rng.choice("ABCD"),
+        }
+
+
+def generate_questions(count: int, seed: int = 42,
+                       categories: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Generates a synthetic question bank as a list of dicts.
+    """
+    return list(iter_questions(count, seed, categories))
+
+
+def write_bank(filename: str, count: int, seed: int = 42,
+               categories: Optional[Sequence[str]] = None) -> None:
+    """
+    Streams a synthetic question bank to a pretty-printed JSON file.
+    """
+    with open(filename, 'w') as f:
+        f.write('[\n')
+        for i, q in enumerate(iter_questions(count, seed, categories)):
+            if i:
+                f.write(',\n')
+            f.write(json.dumps(q, indent=2))
+        f.write('\n]\n')
+
+
+def generate_analytics(categories: Sequence[str], seed: int = 42) -> Dict[str, Any]:
+    """
+    Generates analytics in the current per-category format.
+    """
+    rng = random.Random(seed)
+    performance = {}
+    for category in categories:
+        total = rng.randrange(1, 500)
+        performance[category] = {"correct": rng.randrange(total + 1), "total": total}
+    return {"streak": rng.randrange(50), "performance": performance}
+
+
+def generate_legacy_analytics(seed: int = 42) -> Dict[str, Any]:
+    """
+    Generates analytics in the old single-counter format that load_analytics migrates.
+    """
+    rng = random.Random(seed)
+    total = rng.randrange(1, 10_000)
+    return {"total_attempted": total, "total_correct": rng.randrange(total + 1),
+            "streak": rng.randrange(50)}
+
+
+def write_attempt_history(directory: str, count: int, seed: int = 42,
+                          categories: Optional[Sequence[str]] = None, questions: int = 1000,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE, start_time: float = 1.7e9) -> None:
+    """
+    Writes a synthetic attempt history directory of ``count`` attempts, chunk
+    file by chunk file, without holding the history in memory.
+
+    Args:
+        directory (str): The history directory to create.
+        count (int): Number of attempts.
+        seed (int): Random seed.
+        categories (Optional[Sequence[str]]): Category names. Defaults to CATEGORIES.
+        questions (int): Number of distinct questions answered.
+        chunk_size (int): Attempts per chunk file.
+        start_time (float): Unix time of the first attempt.
+    """
+    rng = random.Random(seed)
+    categories = list(CATEGORIES if categories is None else categories)
+    keys = [rng.getrandbits(64) for _ in range(questions)]
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, CATEGORIES_FILE), 'w') as f:
+        json.dump(categories, f)
+    when = start_time
+    for start in range(0, count, chunk_size):
+        columns = [array(code) for code in COLUMN_TYPES]
+        key_col, time_col, cid_col, response_col, choice_col, correct_col = columns
+        for _ in range(min(chunk_size, count - start)):
+            question = rng.randrange(questions)
+            when += rng.expovariate(1 / 20.0)
+            key_col.append(keys[question])
+            time_col.append(when)
+            cid_col.append(question % len(categories))
+            response_col.append(int(rng.lognormvariate(9.5, 0.6)))
+            choice_col.append(rng.randrange(4))
+            correct_col.append(rng.random() < 0.7)
+        name = f"{start:012d}.chunk" if len(key_col) == chunk_size else TAIL_FILE
+        with open(os.path.join(directory, name), 'wb') as f:
+            f.write(encode_chunk(start, columns))